@@ -0,0 +1,218 @@
+"""Reader for compiled AMX Mod X plugins (``.amxx``).
+
+An ``.amxx`` file is a small container: a ``XXMA`` header, one entry per
+cell size (32/64-bit) and, for each entry, a zlib-compressed AMX image. The
+AMX header and its publics/natives/libraries/pubvars/tags tables plus the
+name table all sit before the code section, so only that prefix of the image
+is inflated; code and data are never decompressed. Decompression is resumed
+on demand, so asking for more of the image later does not start over.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import struct
+import sys
+import zlib
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+AMXX_MAGIC = 0x414D5858  # "XXMA"
+AMXX_VERSION = 0x0300
+AMX_MAGIC_32 = 0xF1E0
+AMX_MAGIC_64 = 0xF1E1
+
+_BIN_HEADER = struct.Struct("<IHB")
+_SECTION_ENTRY = struct.Struct("<biiii")
+_AMX_HEADER = struct.Struct("<iHbbhhiiiiiiiiiii")
+_FUNC_STUB = struct.Struct("<II")
+_NAME_MAX = 64
+_INFLATE_CHUNK = 4096
+
+
+class AmxxFormatError(ValueError):
+    """Raised when a file is not a readable ``.amxx`` container."""
+
+
+@dataclass(frozen=True)
+class AmxxSection:
+    """One compressed AMX image inside the container."""
+
+    cellsize: int
+    disksize: int
+    imagesize: int
+    memsize: int
+    offset: int
+
+
+@dataclass(frozen=True)
+class AmxHeader:
+    size: int
+    magic: int
+    file_version: int
+    amx_version: int
+    flags: int
+    defsize: int
+    cod: int
+    dat: int
+    hea: int
+    stp: int
+    cip: int
+    publics: int
+    natives: int
+    libraries: int
+    pubvars: int
+    tags: int
+    nametable: int
+
+
+class _LazyImage:
+    """Incrementally inflated AMX image."""
+
+    def __init__(self, compressed: bytes, total: int) -> None:
+        self._compressed = compressed
+        self._position = 0
+        self._inflater = zlib.decompressobj()
+        self._total = total
+        self.data = bytearray()
+
+    def ensure(self, length: int) -> bytes:
+        length = min(length, self._total)
+        while len(self.data) < length:
+            pending = self._inflater.unconsumed_tail
+            if not pending:
+                if self._position >= len(self._compressed):
+                    break
+                pending = self._compressed[self._position:self._position + _INFLATE_CHUNK]
+                self._position += len(pending)
+            chunk = self._inflater.decompress(pending, length - len(self.data))
+            self.data.extend(chunk)
+            if self._inflater.eof:
+                break
+        if len(self.data) < length:
+            raise AmxxFormatError("Imagen AMX truncada")
+        return bytes(self.data[:length])
+
+
+class AmxxFile:
+    """Lazy view of an ``.amxx`` plugin.
+
+    Opening only reads the container header and section table; the image of
+    the selected section is inflated when a table is first requested.
+    """
+
+    def __init__(self, path: Path, cellsize: int = 4) -> None:
+        self.path = Path(path)
+        raw = self.path.read_bytes()
+        if len(raw) < _BIN_HEADER.size:
+            raise AmxxFormatError(f"{self.path}: archivo demasiado corto")
+        magic, version, count = _BIN_HEADER.unpack_from(raw, 0)
+        if magic != AMXX_MAGIC:
+            raise AmxxFormatError(f"{self.path}: cabecera XXMA no encontrada")
+        if version != AMXX_VERSION:
+            raise AmxxFormatError(f"{self.path}: versión AMXX no soportada ({version:#x})")
+        self.sections: List[AmxxSection] = []
+        for index in range(count):
+            offset = _BIN_HEADER.size + index * _SECTION_ENTRY.size
+            if offset + _SECTION_ENTRY.size > len(raw):
+                raise AmxxFormatError(f"{self.path}: tabla de secciones truncada")
+            self.sections.append(AmxxSection(*_SECTION_ENTRY.unpack_from(raw, offset)))
+        if not self.sections:
+            raise AmxxFormatError(f"{self.path}: sin secciones")
+        self.section = next(
+            (section for section in self.sections if section.cellsize == cellsize), self.sections[0]
+        )
+        end = self.section.offset + self.section.disksize
+        if end > len(raw):
+            raise AmxxFormatError(f"{self.path}: sección comprimida truncada")
+        self._image = _LazyImage(raw[self.section.offset:end], self.section.imagesize)
+        self._header: Optional[AmxHeader] = None
+        self._tables: Dict[str, List[str]] = {}
+
+    @property
+    def header(self) -> AmxHeader:
+        if self._header is None:
+            header = AmxHeader(*_AMX_HEADER.unpack_from(self._image.ensure(_AMX_HEADER.size)))
+            if header.magic & 0xFFFF not in (AMX_MAGIC_32, AMX_MAGIC_64):
+                raise AmxxFormatError(f"{self.path}: cabecera AMX inválida")
+            if header.defsize != _FUNC_STUB.size:
+                raise AmxxFormatError(f"{self.path}: formato de tabla sin nametable no soportado")
+            self._header = header
+        return self._header
+
+    def bytes_inflated(self) -> int:
+        return len(self._image.data)
+
+    def _table(self, name: str, start: int, end: int) -> List[str]:
+        if name not in self._tables:
+            header = self.header
+            # Every table and the name table precede the code section.
+            prefix = self._image.ensure(max(header.cod, header.nametable))
+            names = []
+            for offset in range(start, end, header.defsize):
+                _, name_offset = _FUNC_STUB.unpack_from(prefix, offset)
+                terminator = prefix.find(b"\0", name_offset, name_offset + _NAME_MAX)
+                if terminator < 0:
+                    terminator = min(len(prefix), name_offset + _NAME_MAX)
+                names.append(prefix[name_offset:terminator].decode("latin-1"))
+            self._tables[name] = names
+        return self._tables[name]
+
+    def publics(self) -> List[str]:
+        return self._table("publics", self.header.publics, self.header.natives)
+
+    def natives(self) -> List[str]:
+        return self._table("natives", self.header.natives, self.header.libraries)
+
+    def libraries(self) -> List[str]:
+        return self._table("libraries", self.header.libraries, self.header.pubvars)
+
+    def pubvars(self) -> List[str]:
+        return self._table("pubvars", self.header.pubvars, self.header.tags)
+
+    def tags(self) -> List[str]:
+        return self._table("tags", self.header.tags, self.header.nametable)
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "file": str(self.path),
+            "sections": [asdict(section) for section in self.sections],
+            "cellsize": self.section.cellsize,
+            "code_size": self.header.dat - self.header.cod,
+            "data_size": self.header.hea - self.header.dat,
+            "stack_heap_size": self.header.stp - self.header.hea,
+            "publics": self.publics(),
+            "natives": self.natives(),
+            "libraries": self.libraries(),
+            "pubvars": self.pubvars(),
+            "bytes_inflated": self.bytes_inflated(),
+        }
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Lee las tablas de un plugin .amxx compilado")
+    parser.add_argument("paths", type=Path, nargs="+", help="Archivos .amxx o directorios")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    files: List[Path] = []
+    for path in args.paths:
+        files.extend(sorted(path.rglob("*.amxx")) if path.is_dir() else [path])
+    summaries = []
+    status = 0
+    for path in files:
+        try:
+            summaries.append(AmxxFile(path).summary())
+        except (OSError, zlib.error, struct.error, AmxxFormatError) as exc:
+            summaries.append({"file": str(path), "error": str(exc)})
+            status = 1
+    json.dump(summaries, sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write("\n")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+"""Benchmark the training pipeline across dataset sizes and core counts.
+
+Rows are synthesized from the real dataset (``dataset.parquet`` or
+``dataset.csv``, as found by :mod:`train_baseline`) so that every phase sees
+the same schema and label mix it does in production. Each phase is timed
+separately and the report is written to ``results/benchmark.json`` and
+``results/benchmark.png``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import train_baseline
+from train_baseline import RANDOM_SEED, RESULTS_DIR
+
+ROOT = Path(__file__).resolve().parent
+DEFAULT_SIZES = [500, 2000, 8000]
+DEFAULT_N_JOBS = [1, 2, 4]
+NUMERIC_JITTER_COLUMNS = [
+    "line_count",
+    "stat_health",
+    "stat_speed",
+    "stat_gravity",
+    "stat_armor",
+    "stat_knockback",
+]
+CV_SPLITS = 5
+# Every label keeps at least one row per fold, so rare labels still reach CV.
+MIN_ROWS_PER_LABEL = CV_SPLITS
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark train_baseline phases across dataset sizes and n_jobs values."
+    )
+    parser.add_argument(
+        "--seed-path",
+        type=Path,
+        default=None,
+        help="Dataset (CSV, Parquet or JSON records) used as templates for synthetic rows; "
+        "defaults to the dataset train_baseline would load.",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="Dataset sizes (rows) to benchmark.",
+    )
+    parser.add_argument(
+        "--n-jobs",
+        type=int,
+        nargs="+",
+        default=DEFAULT_N_JOBS,
+        help="n_jobs values used for the cross-validation and fit phases.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=("csv", "parquet"),
+        default="csv",
+        help="On-disk format used for the read_dataset phase.",
+    )
+    parser.add_argument(
+        "--n-estimators",
+        type=int,
+        default=200,
+        help="Number of trees used for the CV and fit phases.",
+    )
+    return parser.parse_args(argv)
+
+
+def load_seed_records(path: Path) -> List[dict]:
+    """Load template records from a dataset file or a JSON list of records."""
+    if path.suffix.lower() == ".json":
+        records = json.loads(path.read_text(encoding="utf-8"))
+    else:
+        frame = train_baseline.read_dataset(path)
+        for column in train_baseline.LIST_COLUMNS:
+            if column in frame:
+                frame[column] = frame[column].apply(train_baseline.parse_list_cell)
+        records = frame.to_dict(orient="records")
+    if not isinstance(records, list) or not records:
+        raise ValueError(f"No seed records found in {path}")
+    labels = pd.Series([record.get("entity_type") for record in records]).value_counts()
+    if len(labels) < 2:
+        raise ValueError(f"Seed records in {path} have a single entity_type; training would be trivial")
+    logging.info("Seed label mix: %s", labels.to_dict())
+    return records
+
+
+def synthesize_dataset(
+    seed_records: Sequence[dict], size: int, rng: np.random.Generator
+) -> pd.DataFrame:
+    """Build ``size`` rows by resampling seed records with numeric jitter.
+
+    Rows are drawn per entity type in the seed proportions, with at least
+    ``MIN_ROWS_PER_LABEL`` rows for each type. Every column of a row comes
+    from an independently drawn seed record of the same type, so rows are
+    new combinations of real values rather than copies of a few templates,
+    and tree size keeps growing with the row count as it does on real data.
+    """
+    by_label: dict = {}
+    for index, record in enumerate(seed_records):
+        by_label.setdefault(record.get("entity_type"), []).append(index)
+    labels = sorted(by_label, key=lambda label: len(by_label[label]), reverse=True)
+    shares = np.array([len(by_label[label]) for label in labels]) / len(seed_records)
+    counts = np.maximum(np.round(shares * size).astype(int), MIN_ROWS_PER_LABEL)
+    counts[0] = max(counts[0] - (counts.sum() - size), 1)
+    columns = list(dict.fromkeys(key for record in seed_records for key in record))
+    parts = []
+    for label, count in zip(labels, counts):
+        members = by_label[label]
+        parts.append(
+            pd.DataFrame(
+                {
+                    column: [seed_records[index].get(column) for index in rng.choice(members, size=count)]
+                    for column in columns
+                }
+            )
+        )
+    frame = pd.concat(parts, ignore_index=True)
+    frame = frame.iloc[rng.permutation(len(frame))].reset_index(drop=True)
+    frame["file"] = [f"{name}#{row}" for row, name in enumerate(frame["file"])]
+    for column in NUMERIC_JITTER_COLUMNS:
+        if column not in frame:
+            continue
+        values = pd.to_numeric(frame[column], errors="coerce")
+        noise = rng.normal(1.0, 0.05, size=len(frame))
+        frame[column] = values * noise
+    return frame
+
+
+def write_dataset(frame: pd.DataFrame, directory: Path, fmt: str) -> Path:
+    """Write a synthetic dataset in the same layout dataset_builder exports."""
+    if fmt == "parquet":
+        path = directory / "dataset.parquet"
+        frame.to_parquet(path, index=False)
+        return path
+
+    path = directory / "dataset.csv"
+    csv_frame = frame.copy()
+    for column in train_baseline.LIST_COLUMNS:
+        if column in csv_frame:
+            csv_frame[column] = csv_frame[column].apply(json.dumps)
+    csv_frame.to_csv(path, index=False)
+    return path
+
+
+def measure(func: Callable[[], object], trace_memory: bool) -> tuple[object, float, Optional[int]]:
+    """Run ``func`` and return its result, wall time and traced peak bytes."""
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func()
+    finally:
+        elapsed = time.perf_counter() - start
+        peak = None
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def phase_row(phase: str, size: int, n_jobs: Optional[int], seconds: float, peak: Optional[int]) -> dict:
+    return {
+        "phase": phase,
+        "rows": size,
+        "n_jobs": n_jobs,
+        "seconds": seconds,
+        "rows_per_second": size / seconds if seconds > 0 else None,
+        "peak_memory_mb": peak / (1024 * 1024) if peak is not None else None,
+    }
+
+
+def benchmark_size(
+    dataset_path: Path,
+    size: int,
+    n_jobs_values: Sequence[int],
+    n_estimators: int,
+) -> List[dict]:
+    """Time every training phase for one dataset size.
+
+    Data preparation phases do not depend on ``n_jobs`` and run once. Peak
+    memory is traced in a separate untimed pass so tracing overhead does not
+    distort the timings; it covers the main process only.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import StratifiedKFold, cross_val_score
+
+    rows: List[dict] = []
+
+    def prepare_phases(trace: bool) -> tuple[pd.DataFrame, pd.Series, List[tuple]]:
+        results = []
+        frame, seconds, peak = measure(lambda: train_baseline.read_dataset(dataset_path), trace)
+        results.append(("read_dataset", seconds, peak))
+        frame, seconds, peak = measure(lambda: train_baseline.ensure_list_columns(frame), trace)
+        results.append(("ensure_list_columns", seconds, peak))
+        frame = train_baseline.fill_missing_values(frame)
+        features, seconds, peak = measure(lambda: train_baseline.build_feature_columns(frame), trace)
+        results.append(("build_feature_columns", seconds, peak))
+        return features, frame["entity_type"].fillna("unknown"), results
+
+    features, labels, timed = prepare_phases(trace=False)
+    _, _, traced = prepare_phases(trace=True)
+    for (phase, seconds, _), (_, _, peak) in zip(timed, traced):
+        rows.append(phase_row(phase, size, None, seconds, peak))
+
+    folds = list(
+        StratifiedKFold(
+            n_splits=CV_SPLITS, shuffle=True, random_state=RANDOM_SEED
+        ).split(features, labels)
+    )
+
+    for index, n_jobs in enumerate(n_jobs_values):
+        outer_jobs, inner_jobs = train_baseline.resolve_parallelism(n_jobs, len(folds))
+
+        def run_cv() -> object:
+            return cross_val_score(
+                RandomForestClassifier(
+                    n_estimators=n_estimators,
+                    random_state=RANDOM_SEED,
+                    class_weight="balanced",
+                    n_jobs=inner_jobs,
+                ),
+                features,
+                labels,
+                scoring="accuracy",
+                cv=folds,
+                n_jobs=outer_jobs,
+            )
+
+        def run_fit() -> object:
+            return RandomForestClassifier(
+                n_estimators=n_estimators,
+                random_state=RANDOM_SEED,
+                class_weight="balanced",
+                n_jobs=n_jobs,
+            ).fit(features, labels)
+
+        for phase, func in (("cross_validation", run_cv), ("fit", run_fit)):
+            _, seconds, _ = measure(func, trace_memory=False)
+            peak = None
+            if index == 0:
+                _, _, peak = measure(func, trace_memory=True)
+            rows.append(phase_row(phase, size, n_jobs, seconds, peak))
+            logging.info(
+                "rows=%d n_jobs=%d %s: %.3fs", size, n_jobs, phase, seconds
+            )
+
+    return rows
+
+
+def plot_report(report: pd.DataFrame, plot_path: Path) -> None:
+    """Plot throughput per phase and training time per core count."""
+    from matplotlib import pyplot as plt
+
+    fig, (throughput_ax, scaling_ax) = plt.subplots(1, 2, figsize=(14, 5))
+
+    for phase, group in report.groupby("phase", sort=False):
+        series = group.groupby("rows")["rows_per_second"].max()
+        throughput_ax.plot(series.index, series.values, marker="o", label=phase)
+    throughput_ax.set_xscale("log")
+    throughput_ax.set_yscale("log")
+    throughput_ax.set_xlabel("Rows")
+    throughput_ax.set_ylabel("Rows per second (best n_jobs)")
+    throughput_ax.set_title("Phase throughput")
+    throughput_ax.legend()
+
+    parallel = report[report["n_jobs"].notna()]
+    for (phase, rows), group in parallel.groupby(["phase", "rows"]):
+        scaling_ax.plot(
+            group["n_jobs"], group["seconds"], marker="o", label=f"{phase} ({rows} rows)"
+        )
+    scaling_ax.set_xlabel("n_jobs")
+    scaling_ax.set_ylabel("Seconds")
+    scaling_ax.set_title("CV and fit scaling")
+    scaling_ax.legend(fontsize="small")
+
+    fig.tight_layout()
+    fig.savefig(plot_path, dpi=150)
+    plt.close(fig)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Run the benchmark and write the JSON report and plot."""
+    train_baseline.setup_logging()
+    args = parse_args(argv)
+    seed_path = args.seed_path or train_baseline.detect_dataset_path(
+        argparse.Namespace(dataset_path=None, no_parquet=False)
+    )
+    seed_records = load_seed_records(seed_path)
+    rng = np.random.default_rng(RANDOM_SEED)
+
+    rows: List[dict] = []
+    with tempfile.TemporaryDirectory(prefix="zp_benchmark_") as tmp_dir:
+        for size in sorted(args.sizes):
+            frame = synthesize_dataset(seed_records, size, rng)
+            dataset_path = write_dataset(frame, Path(tmp_dir), args.format)
+            logging.info("Benchmarking %d rows from %s", size, dataset_path.name)
+            rows.extend(benchmark_size(dataset_path, size, args.n_jobs, args.n_estimators))
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    report_path = RESULTS_DIR / "benchmark.json"
+    plot_path = RESULTS_DIR / "benchmark.png"
+    payload = {
+        "seed_path": str(seed_path),
+        "format": args.format,
+        "n_estimators": args.n_estimators,
+        "results": rows,
+    }
+    with report_path.open("w", encoding="utf-8") as handle:
+        json.dump(payload, handle, indent=2)
+    logging.info("Saved benchmark report to %s", report_path)
+
+    plot_report(pd.DataFrame(rows), plot_path)
+    logging.info("Saved benchmark plot to %s", plot_path)
+
+
+if __name__ == "__main__":
+    main()
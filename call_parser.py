@@ -0,0 +1,1998 @@
+"""Linear-time call-site extraction for Pawn sources.
+
+:func:`scan_calls` walks a script once, skipping comments, strings and
+character literals, and keeps a stack of open brackets so that every call is
+split into its top-level arguments however many lines it spans. Each
+:class:`CallSite` carries the function name, the raw and decoded arguments
+(string, character and numeric literals are decoded; anything else is kept
+as source text) and its 1-based line and column.
+
+On top of those calls, :func:`build_items` ports the item scan of
+``electron/smaParser.cjs``: register and supplemental calls, pseudo human
+classes, menu arrays, plugin markers, abilities and precached resources
+become items with the ids and shape the GUI stores in ``zpbuilder.json``.
+Defines the file leaves open are resolved from its include closure.
+``check_items`` diffs the result against the bundled pack.
+"""
+from __future__ import annotations
+
+import argparse
+import ast
+import bisect
+import hashlib
+import json
+import math
+import posixpath
+import re
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+ROOT = Path(__file__).resolve().parent
+INPUT_DIR = ROOT / "input"
+
+NOT_CALLS = frozenset(
+    {"if", "while", "for", "switch", "return", "sizeof", "tagof", "charsmax", "defined", "else", "do", "case", "assert"}
+)
+DECLARATION_KEYWORDS = frozenset({"public", "stock", "forward", "native", "static", "new", "const"})
+
+# An unterminated block comment runs to the end of the file (as in
+# scan_calls); matching it that way keeps the scan linear.
+_MASK_PATTERN = re.compile(r'"(?:[^"^\n]|\^.)*"|/\*.*?(?:\*/|\Z)|//[^\n]*', re.DOTALL)
+_INT_PATTERN = re.compile(r"^[+-]?(?:0x[0-9a-fA-F]+|0b[01]+|\d+)$")
+_FLOAT_PATTERN = re.compile(r"^[+-]?\d+\.\d*(?:e[+-]?\d+)?$", re.IGNORECASE)
+_TAG_PATTERN = re.compile(r"^[A-Za-z_]\w*:(?!:)")
+_IDENTIFIER_PATTERN = re.compile(r"^([A-Za-z_@]\w*)\s*(\[.*\])?$", re.DOTALL)
+_CONST_PATTERN = re.compile(
+    r"^[ \t]*(?:new\s+const|static\s+const|const|new)\s+(?:[A-Za-z_]\w*:)?([A-Za-z_]\w*)\s*((?:\[[^\]\n]*\])*)\s*=\s*",
+    re.MULTILINE,
+)
+_DEFINE_PATTERN = re.compile(r"^[ \t]*#define\s+([A-Za-z_]\w*)[ \t]+([^\n]+)$", re.MULTILINE)
+_BRACE_PATTERN = re.compile(r"[{}\"']")
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", '"': '"', "'": "'", "^": "^", "e": "\x1b"}
+
+
+@dataclass
+class CallSite:
+    """One call found in a script."""
+
+    name: str
+    args: List[object]
+    raw_args: List[str]
+    line: int
+    column: int
+    offset: int
+    end: int
+    assigned: Optional[str] = None
+
+
+def mask_comments(text: str) -> str:
+    """Blank out comments (keeping newlines) so offsets and lines stay valid."""
+
+    def _replace(match: re.Match) -> str:
+        token = match.group(0)
+        if token.startswith('"'):
+            return token
+        return re.sub(r"[^\n]", " ", token)
+
+    return _MASK_PATTERN.sub(_replace, text)
+
+
+def decode_string(raw: str) -> str:
+    """Decode a Pawn string literal body (``^`` is the escape character)."""
+
+    result: List[str] = []
+    index = 0
+    while index < len(raw):
+        char = raw[index]
+        if char == "^" and index + 1 < len(raw):
+            result.append(_ESCAPES.get(raw[index + 1], raw[index + 1]))
+            index += 2
+            continue
+        result.append(char)
+        index += 1
+    return "".join(result)
+
+
+def is_string_literal(raw: str) -> bool:
+    raw = raw.strip()
+    return len(raw) >= 2 and raw[0] == '"' and raw[-1] == '"'
+
+
+def decode_literal(raw: str) -> object:
+    """Decode string/char/number literals; other expressions come back as text."""
+
+    text = raw.strip()
+    if is_string_literal(text):
+        return decode_string(text[1:-1])
+    if len(text) >= 3 and text[0] == "'" and text[-1] == "'":
+        body = decode_string(text[1:-1])
+        return ord(body) if len(body) == 1 else text
+    untagged = _TAG_PATTERN.sub("", text, count=1)
+    if _INT_PATTERN.match(untagged):
+        return int(untagged, 0) if not re.match(r"^[+-]?0\d", untagged) else int(untagged, 10)
+    if _FLOAT_PATTERN.match(untagged):
+        return float(untagged)
+    return text
+
+
+def split_arguments(text: str) -> List[str]:
+    """Split a comma-separated argument or initializer list at depth zero."""
+
+    parts: List[str] = []
+    depth = 0
+    start = 0
+    index = 0
+    length = len(text)
+    while index < length:
+        char = text[index]
+        if char in "\"'":
+            index = _skip_quoted(text, index)
+            continue
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(text[start:index].strip())
+            start = index + 1
+        index += 1
+    tail = text[start:].strip()
+    if tail or parts:
+        parts.append(tail)
+    return parts
+
+
+def _skip_quoted(text: str, index: int) -> int:
+    quote = text[index]
+    index += 1
+    length = len(text)
+    while index < length and text[index] != quote and text[index] != "\n":
+        index += 2 if text[index] == "^" else 1
+    return index + 1
+
+
+def match_braces(text: str, *, skip_quotes: bool = True) -> Dict[int, int]:
+    """Map the offset of every ``{`` to the offset of its closing ``}``.
+
+    One pass for the whole text instead of a depth scan per block, which is
+    quadratic on files with many unterminated blocks. Unclosed braces map to
+    ``len(text)``. With ``skip_quotes`` braces inside string and character
+    literals are ignored.
+    """
+
+    closes: Dict[int, int] = {}
+    stack: List[int] = []
+    length = len(text)
+    match = _BRACE_PATTERN.search(text)
+    while match:
+        index = match.start()
+        char = text[index]
+        if char == "{":
+            stack.append(index)
+        elif char == "}":
+            if stack:
+                closes[stack.pop()] = index
+        elif skip_quotes:
+            match = _BRACE_PATTERN.search(text, _skip_quoted(text, index))
+            continue
+        match = _BRACE_PATTERN.search(text, index + 1)
+    closes.update(dict.fromkeys(stack, length))
+    return closes
+
+
+def _assigned_variable(text: str, offset: int) -> Optional[str]:
+    start = max(0, offset - 160)
+    snippet = text[start:offset]
+    cut = max(snippet.rfind(";"), snippet.rfind("\n"), snippet.rfind("{"))
+    match = re.search(r"([A-Za-z_]\w*)\s*(?:\[[^\]]*\])?\s*=\s*$", snippet[cut + 1:])
+    if not match or snippet[cut + 1:].rstrip().endswith("=="):
+        return None
+    return match.group(1)
+
+
+def _raw_argument(raw: str) -> str:
+    if "/*" in raw or "//" in raw:
+        raw = mask_comments(raw)
+    return raw.strip()
+
+
+def scan_calls(text: str, names: Optional[Iterable[str]] = None) -> List[CallSite]:
+    """Return every call (or every call to ``names``) in ``text``, in source order.
+
+    Pawn names are case-sensitive and are matched exactly. Declarations such
+    as ``public foo(id)`` are not reported as calls.
+    """
+
+    wanted = None if names is None else set(names)
+    calls: List[CallSite] = []
+    # Frame: [name or None, offset, line, column, arg_start, arg_spans]
+    stack: List[list] = []
+    length = len(text)
+    index = 0
+    line = 1
+    line_start = 0
+    previous_word = ""
+
+    while index < length:
+        char = text[index]
+        if char == "\n":
+            line += 1
+            line_start = index + 1
+            index += 1
+            continue
+        if char == "/" and index + 1 < length and text[index + 1] in "/*":
+            if text[index + 1] == "/":
+                newline = text.find("\n", index)
+                index = length if newline < 0 else newline
+                continue
+            close = text.find("*/", index + 2)
+            end = length if close < 0 else close + 2
+            newlines = text.count("\n", index, end)
+            if newlines:
+                line += newlines
+                line_start = text.rfind("\n", index, end) + 1
+            index = end
+            continue
+        if char == '"' or char == "'":
+            index = _skip_quoted(text, index)
+            continue
+        if char.isalpha() or char == "_" or char == "@":
+            end = index + 1
+            while end < length and (text[end].isalnum() or text[end] == "_"):
+                end += 1
+            word = text[index:end]
+            probe = end
+            while probe < length and text[probe] in " \t":
+                probe += 1
+            if (
+                probe < length
+                and text[probe] == "("
+                and word not in NOT_CALLS
+                and previous_word not in DECLARATION_KEYWORDS
+            ):
+                stack.append([word, index, line, index - line_start + 1, probe + 1, []])
+                previous_word = ""
+                index = probe + 1
+                continue
+            if not (end < length and text[end] == ":"):  # tags keep the keyword before them
+                previous_word = word
+            index = end
+            continue
+        if char.isdigit():
+            index += 1
+            while index < length and (text[index].isalnum() or text[index] == "."):
+                index += 1
+            continue
+        if char in "([{":
+            stack.append([None, index, line, 0, index + 1, None])
+        elif char in ")]}":
+            if stack:
+                frame = stack.pop()
+                name = frame[0]
+                if name is not None and char == ")":
+                    spans = frame[5]
+                    spans.append((frame[4], index))
+                    if wanted is None or name in wanted:
+                        raw_args = [_raw_argument(text[start:stop]) for start, stop in spans]
+                        if raw_args == [""]:
+                            raw_args = []
+                        calls.append(
+                            CallSite(
+                                name=name,
+                                args=[decode_literal(arg) for arg in raw_args],
+                                raw_args=raw_args,
+                                line=frame[2],
+                                column=frame[3],
+                                offset=frame[1],
+                                end=index + 1,
+                                assigned=_assigned_variable(text, frame[1]),
+                            )
+                        )
+        elif char == "," and stack and stack[-1][0] is not None:
+            frame = stack[-1]
+            frame[5].append((frame[4], index))
+            frame[4] = index + 1
+        if not char.isspace() and char != ":":
+            previous_word = ""
+        index += 1
+
+    calls.sort(key=lambda call: call.offset)
+    return calls
+
+
+def collect_constants(text: str) -> Dict[str, object]:
+    """Map ``new const``/``const``/``#define`` names to their decoded values.
+
+    Arrays become (flattened) lists; expressions that are not literals are
+    kept as text.
+    """
+
+    masked = mask_comments(text)
+    constants: Dict[str, object] = {}
+    closes: Optional[Dict[int, int]] = None
+    for match in _DEFINE_PATTERN.finditer(masked):
+        constants[match.group(1)] = decode_literal(match.group(2).strip())
+    for match in _CONST_PATTERN.finditer(masked):
+        start = match.end()
+        if start < len(masked) and masked[start] == "{":
+            if closes is None:
+                closes = match_braces(masked)
+            index = closes.get(start)
+            if index is None:  # inside a literal for a scan from the top; rescan locally
+                index = match_braces(masked[start:]).get(0, len(masked)) + start
+            constants[match.group(1)] = _flatten(masked[start:index + 1])
+        else:
+            stop = len(masked)
+            for terminator in (";", "\n"):
+                position = masked.find(terminator, start)
+                if 0 <= position < stop:
+                    stop = position
+            constants[match.group(1)] = decode_literal(masked[start:stop])
+    return constants
+
+
+def _flatten(initializer: str) -> List[object]:
+    body = initializer.strip()
+    if body.startswith("{"):
+        body = body[1:-1] if body.endswith("}") else body[1:]  # unterminated initializer
+    values: List[object] = []
+    for part in split_arguments(body):
+        if part.startswith("{"):
+            values.extend(_flatten(part))
+        elif part:
+            values.append(decode_literal(part))
+    return values
+
+
+# --------------------------------------------------------------------------
+# zpbuilder.json items
+# --------------------------------------------------------------------------
+# The resolution rules below (names, stats, lookup keys, defaults and ids)
+# follow electron/smaParser.cjs, so the items are the ones the GUI scan stores
+# in zpbuilder.json. Calls come from scan_calls and blocks from match_braces,
+# which keeps the whole build linear in the size of the script.
+VERSION_LABELS = {
+    "zp_5_0_8a": "Zombie Plague 5.0.8a",
+    "zp_4_3": "Zombie Plague 4.3",
+    "external_addon": "Addon externo",
+    "mixed": "Sintaxis combinada",
+    "unknown": "Versión desconocida",
+}
+
+# name -> (normalized function, item type, origin version, legacy)
+REGISTER_FUNCTIONS: Dict[str, tuple] = {}
+for _names, _normalized, _type, _origin, _legacy in (
+    (("zp_class_zombie_register",), "zp_class_zombie_register", "zombie_class", "zp_5_0_8a", False),
+    (("zp_register_zombie_class", "zp_register_class_zombie"), "zp_class_zombie_register", "zombie_class", "zp_4_3", True),
+    (("zp_class_human_register",), "zp_class_human_register", "human_class", "zp_5_0_8a", False),
+    (("zp_register_human_class", "zp_register_class_human"), "zp_class_human_register", "human_class", "zp_4_3", True),
+    (("zp_class_survivor_register",), "zp_class_survivor_register", "special_human_class", "zp_5_0_8a", False),
+    (("zp_register_survivor_class",), "zp_class_survivor_register", "special_human_class", "zp_4_3", True),
+    (("zp_class_sniper_register",), "zp_class_sniper_register", "special_human_class", "zp_5_0_8a", False),
+    (("zp_register_sniper_class",), "zp_class_sniper_register", "special_human_class", "zp_4_3", True),
+    (("zp_class_nemesis_register",), "zp_class_nemesis_register", "special_zombie_class", "zp_5_0_8a", False),
+    (("zp_register_nemesis_class",), "zp_class_nemesis_register", "special_zombie_class", "zp_4_3", True),
+    (("zp_class_assassin_register",), "zp_class_assassin_register", "special_zombie_class", "zp_5_0_8a", False),
+    (("zp_register_assassin_class",), "zp_class_assassin_register", "special_zombie_class", "zp_4_3", True),
+    (("zp_register_zombie_special_class",), "zp_register_zombie_special_class", "special_zombie_class", "zp_5_0_8a", False),
+    (("zp_register_human_special_class",), "zp_register_human_special_class", "special_human_class", "zp_5_0_8a", False),
+    (("zp_register_extra_item", "zp_register_item"), "zp_register_extra_item", "shop_item", "zp_5_0_8a", False),
+    (("zp_items_register",), "zp_items_register", "shop_item", "external_addon", False),
+    (("zp_weapon_register",), "zp_weapon_register", "weapon", "zp_5_0_8a", False),
+    (("zp_register_gamemode",), "zp_register_gamemode", "mode", "zp_5_0_8a", False),
+    (("zp_register_mode",), "zp_register_gamemode", "mode", "zp_4_3", True),
+):
+    for _name in _names:
+        REGISTER_FUNCTIONS[_name] = (_normalized, _type, _origin, _legacy)
+
+_ZOMBIES = ("zombie_class", "special_zombie_class")
+_HUMANS = ("human_class", "special_human_class")
+# name -> (kind, stat field, allowed item types); follow-up calls that take the class id first.
+SUPPLEMENTAL_FUNCTIONS: Dict[str, tuple] = {}
+for _names, _kind, _field, _types in (
+    (("zp_class_zombie_register_kb", "zp_register_zombie_class_kb"), "stat", "knockback", _ZOMBIES),
+    (("zp_class_zombie_register_model", "zp_register_zombie_class_model"), "models", None, _ZOMBIES),
+    (("zp_class_zombie_register_claw", "zp_register_zombie_class_claw"), "claws", None, _ZOMBIES),
+    (("zp_class_zombie_register_sound", "zp_register_zombie_class_sound"), "sounds", None, _ZOMBIES),
+    (("zp_class_human_register_model", "zp_register_human_class_model"), "models", None, _HUMANS),
+    (("zp_class_human_register_sound", "zp_register_human_class_sound"), "sounds", None, _HUMANS),
+    (("zp_class_survivor_register_model", "zp_register_survivor_class_model"), "models", None, ("special_human_class",)),
+    (("zp_class_survivor_register_sound", "zp_register_survivor_class_sound"), "sounds", None, ("special_human_class",)),
+    (("zp_class_sniper_register_model", "zp_register_sniper_class_model"), "models", None, ("special_human_class",)),
+    (("zp_class_sniper_register_sound", "zp_register_sniper_class_sound"), "sounds", None, ("special_human_class",)),
+    (("zp_class_nemesis_register_model", "zp_register_nemesis_class_model"), "models", None, ("special_zombie_class",)),
+    (("zp_class_nemesis_register_sound", "zp_register_nemesis_class_sound"), "sounds", None, ("special_zombie_class",)),
+    (("zp_class_assassin_register_model", "zp_register_assassin_class_model"), "models", None, ("special_zombie_class",)),
+    (("zp_class_assassin_register_sound", "zp_register_assassin_class_sound"), "sounds", None, ("special_zombie_class",)),
+    (("zp_class_survivor_register_sprite", "zp_register_survivor_class_sprite"), "sprites", None, ("special_human_class",)),
+    (("zp_class_sniper_register_sprite", "zp_register_sniper_class_sprite"), "sprites", None, ("special_human_class",)),
+    (("zp_class_nemesis_register_sprite", "zp_register_nemesis_class_sprite"), "sprites", None, ("special_zombie_class",)),
+    (("zp_class_assassin_register_sprite", "zp_register_assassin_class_sprite"), "sprites", None, ("special_zombie_class",)),
+):
+    for _name in _names:
+        SUPPLEMENTAL_FUNCTIONS[_name] = (_kind, _field, frozenset(_types))
+
+TYPE_STAT_FIELDS = {
+    "zombie_class": ("health", "speed", "gravity", "knockback"),
+    "human_class": ("health", "speed", "gravity", "armor"),
+    "special_zombie_class": ("health", "speed", "gravity", "knockback"),
+    "special_human_class": ("health", "speed", "gravity", "armor"),
+    "weapon": ("damage", "clip_capacity", "fire_rate", "reload_time", "cost"),
+    "shop_item": ("cost", "team", "unlimited"),
+}
+STAT_KEYWORDS = {
+    "health": ("health", "hp"),
+    "speed": ("speed", "velocity"),
+    "gravity": ("gravity", "grav"),
+    "knockback": ("knockback", "kb"),
+    "armor": ("armor", "armour", "arm"),
+    "damage": ("damage", "dmg"),
+    "clip_capacity": ("clip", "clipsize", "clip_capacity", "clipammo"),
+    "fire_rate": ("fire_rate", "firerate", "rate", "rof"),
+    "reload_time": ("reload", "reload_time"),
+    "cost": ("cost", "price"),
+    "team": ("team",),
+    "unlimited": ("unlimited", "limit", "stock"),
+}
+# Argument positions tried before the keyword search.
+FIELD_POSITIONS = {"shop_item": {"cost": 1, "team": 2, "unlimited": 3}}
+DEFAULTS = {
+    "zombie_class": {"health": 2000, "speed": 250, "gravity": 1.0, "knockback": 1.0},
+    "human_class": {"health": 100, "speed": 240, "gravity": 1.0, "armor": 0},
+    "special_zombie_class": {"health": 2000, "speed": 250, "gravity": 1.0, "knockback": 1.0},
+    "special_human_class": {"health": 100, "speed": 240, "gravity": 1.0, "armor": 0},
+    "shop_item": {"cost": 0, "team": 0, "unlimited": 0},
+}
+# Constants the GUI scan hardcodes. They win over the pack's own includes
+# (zombieplague.inc numbers the teams differently) so ids and stats match.
+HARDCODED_CONSTANTS: Dict[str, object] = {
+    "humanclass1_name": "Classic Human",
+    "humanclass2_name": "Raptor",
+    "zombieclass1_name": "Classic Zombie",
+    "zombieclass2_name": "Raptor Zombie",
+    "zombieclass3_name": "Light Zombie",
+    "zombieclass4_name": "Fat Zombie",
+    "zombieclass6_name": "Rage Zombie",
+    "ZP_TEAM_ZOMBIE": 2,
+    "ZP_TEAM_HUMAN": 1,
+    "ZP_TEAM_NEMESIS": 1 << 2,
+    "ZP_TEAM_SURVIVOR": 1 << 3,
+    "ZP_TEAM_SNIPER": 1 << 4,
+    "ZP_TEAM_ASSASSIN": 1 << 5,
+    "ZP_TEAM_ANY": 0,
+    "true": 1,
+    "false": 0,
+    "TRUE": 1,
+    "FALSE": 0,
+}
+ABILITY_EFFECTS = (
+    ("heal", re.compile(r"set_user_health\s*\(\s*id\s*,\s*([0-9]+)", re.IGNORECASE)),
+    ("armor_boost", re.compile(r"(cs_)?set_user_armor\s*\(\s*id\s*,\s*([0-9]+)", re.IGNORECASE)),
+    ("speed_boost", re.compile(r"set_user_maxspeed\s*\(\s*id\s*,\s*([0-9.]+)", re.IGNORECASE)),
+    ("low_gravity", re.compile(r"set_user_gravity\s*\(\s*id\s*,\s*([0-9.]+)", re.IGNORECASE)),
+    ("invisibility", re.compile(r"set_user_rendering\s*\(\s*id\s*,", re.IGNORECASE)),
+)
+PLUGIN_MARKERS = (
+    (re.compile(r"\[ZP\]\s*Class:\s*Nemesis", re.IGNORECASE), "special_zombie_class", "Nemesis"),
+    (re.compile(r"\[ZP\]\s*Class:\s*Assassin", re.IGNORECASE), "special_zombie_class", "Assassin"),
+    (re.compile(r"\[ZP\]\s*Class:\s*Survivor", re.IGNORECASE), "special_human_class", "Survivor"),
+    (re.compile(r"\[ZP\]\s*Class:\s*Sniper", re.IGNORECASE), "special_human_class", "Sniper"),
+)
+# Matched as name suffixes, like the GUI's unanchored patterns (fm_set_user_health counts too).
+PRECACHE_FUNCTIONS = ("precache_model", "precache_sound", "precache_generic")
+PSEUDO_STAT_FUNCTIONS = (("health", "set_user_health"), ("armor", "cs_set_user_armor"), ("gravity", "set_user_gravity"))
+RESOURCE_EXTENSIONS = {".mdl": "models", ".wav": "sounds", ".mp3": "sounds", ".spr": "sprites"}
+CLASS_TYPES = frozenset({"zombie_class", "human_class", "special_zombie_class", "special_human_class"})
+SPECIAL_NAMES = (("special_human_class", ("survivor", "sniper")), ("special_zombie_class", ("nemesis", "assassin")))
+SKIPPED_FILES = re.compile(r"(_api\.sma$|^amx_|^cs_)", re.IGNORECASE)
+
+_WORD_PATTERN = re.compile(r"^[A-Za-z_]\w*$")
+_NUMBER_PATTERNS = (
+    (re.compile(r"^[-+]?0x[0-9a-f]+$", re.IGNORECASE), lambda text: int(text, 16)),
+    (re.compile(r"^[-+]?\d+\.\d+(?:e[-+]?\d+)?$", re.IGNORECASE), float),
+    (re.compile(r"^[-+]?\d+$"), int),
+)
+_JS_NUMBER_PATTERN = re.compile(r"^[+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?$", re.IGNORECASE)
+_ARITHMETIC_PATTERN = re.compile(r"^[0-9+\-*/%().<>=!&|^~\s]+$")
+_TAGGED_PATTERN = re.compile(r"^(?:Float|_:Float|_:float|float|bool|Bool|_:bool|_:Bool):(.+)$")
+_NEW_PATTERN = re.compile(r"^new\s+[A-Za-z_]\w*\s*\((.*)\)$", re.IGNORECASE)
+_ACCESS_PATTERN = re.compile(r"^([A-Za-z_]\w*)(\[[^\]]+\])+$")
+_INCLUDE_PATTERN = re.compile(r"^[ \t]*#[ \t]*(?:try)?include[ \t]*[<\"]([^>\"\n]+)[>\"]", re.MULTILINE)
+_REGISTER_CVAR_PATTERN = re.compile(r"\b(\w+)\s*=\s*register_cvar\s*\(", re.IGNORECASE)
+_SET_PCVAR_PATTERN = re.compile(r"set_pcvar_(?:num|float)\s*\(", re.IGNORECASE)
+_GET_PCVAR_PATTERN = re.compile(r"get_pcvar_(?:num|float)\s*\(", re.IGNORECASE)
+_INDEX_PATTERN = re.compile(r"\[[^\]]*\]")
+_PARENTHESIZED_PATTERN = re.compile(r"\(.*?\)")
+_PSEUDO_CLASS_PATTERN = re.compile(r"public\s+class_(\d+)\s*\(\s*([A-Za-z_]\w*)\s*\)\s*\{", re.IGNORECASE)
+_MENU_SUFFIX_PATTERN = re.compile(
+    r"_(name|names|model|models|clawmodel|clawmodels|sound|sounds|sprite|sprites|info|desc|description"
+    r"|health|hp|speed|gravity|knockback|armor|cost|team|unlimited)$"
+)
+
+
+def normalize_name(name: object) -> str:
+    return re.sub(r"\s+", " ", str(name).strip().lower()) if name else ""
+
+
+def normalize_asset(value: object) -> Optional[str]:
+    """Lower-case a resource path and normalize it the way Node's path.normalize does."""
+
+    text = str(value).strip() if value is not None else ""
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        text = text[1:-1].strip()
+    if not text:
+        return None
+    lowered = text.lower()
+    normalized = posixpath.normpath(lowered)
+    if lowered.endswith("/") and normalized != "/":
+        normalized += "/"
+    return re.sub(r"/{2,}", "/", normalized.replace("\\", "/")).strip() or None
+
+
+def origin_file(path: Path, input_dir: Path = INPUT_DIR) -> str:
+    try:
+        relative = path.resolve().relative_to(input_dir.resolve()).as_posix()
+    except ValueError:
+        relative = path.name
+    return normalize_asset(relative) or relative
+
+
+def _truthy(value: object) -> bool:
+    return value is not None and value is not False and value != "" and not (
+        isinstance(value, (int, float)) and (value == 0 or value != value)
+    )
+
+
+def _format_number(value: object) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(int(value)) if isinstance(value, bool) else str(value)
+
+
+def _plain(value: object) -> object:
+    """Integral floats as ints, as they come out of the GUI's JSON."""
+
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    return value
+
+
+def _to_number(value: object) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str) and value.strip():
+        text = value.strip()
+        if re.match(r"^0x[0-9a-f]+$", text, re.IGNORECASE):
+            return int(text, 16)
+        if re.match(r"^[+-]?\d+$", text):
+            return int(text)
+        if _JS_NUMBER_PATTERN.match(text):
+            return float(text)
+    return None
+
+
+def _js_number(value: object) -> Optional[float]:
+    """``Number(value)``, with None for NaN and for undefined."""
+
+    if isinstance(value, str) and not value.strip():
+        return 0
+    if isinstance(value, list):
+        if not value:
+            return 0
+        return _js_number(value[0]) if len(value) == 1 and not isinstance(value[0], list) else None
+    return _to_number(value)
+
+
+def _parse_number(text: str) -> Optional[float]:
+    for pattern, convert in _NUMBER_PATTERNS:
+        if pattern.match(text):
+            return convert(text)
+    return None
+
+
+def _int32(value: object) -> int:
+    number = float(value)
+    if number != number or number in (float("inf"), float("-inf")):
+        return 0
+    number = int(number) & 0xFFFFFFFF
+    return number - (1 << 32) if number & 0x80000000 else number
+
+
+def _evaluate(expression: str) -> object:
+    """Evaluate a constant arithmetic expression with JavaScript semantics, or None."""
+
+    source = expression.replace("===", "==").replace("!==", "!=")
+    source = re.sub(r"!(?!=)", " not ", source).replace("&&", " and ").replace("||", " or ")
+    try:
+        return _evaluate_node(ast.parse(source.strip(), mode="eval").body)
+    except (SyntaxError, ValueError, TypeError, ArithmeticError, RecursionError, MemoryError):
+        return None
+
+
+_BINARY_OPERATORS = {
+    ast.Add: lambda a, b: a + b,
+    ast.Sub: lambda a, b: a - b,
+    ast.Mult: lambda a, b: a * b,
+    ast.Div: lambda a, b: a / b if b else (float("nan") if not a else math.copysign(float("inf"), a)),
+    ast.Mod: lambda a, b: math.fmod(a, b) if b else float("nan"),
+    ast.LShift: lambda a, b: _int32(_int32(a) << (_int32(b) & 31)),
+    ast.RShift: lambda a, b: _int32(a) >> (_int32(b) & 31),
+    ast.BitOr: lambda a, b: _int32(a) | _int32(b),
+    ast.BitAnd: lambda a, b: _int32(a) & _int32(b),
+    ast.BitXor: lambda a, b: _int32(a) ^ _int32(b),
+}
+_COMPARE_OPERATORS = {
+    ast.Eq: lambda a, b: a == b,
+    ast.NotEq: lambda a, b: a != b,
+    ast.Lt: lambda a, b: a < b,
+    ast.LtE: lambda a, b: a <= b,
+    ast.Gt: lambda a, b: a > b,
+    ast.GtE: lambda a, b: a >= b,
+}
+
+
+def _evaluate_node(node: ast.AST) -> object:
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.UnaryOp):
+        operand = _evaluate_node(node.operand)
+        if isinstance(node.op, ast.Not):
+            return not _truthy(operand)
+        if isinstance(node.op, ast.Invert):
+            return ~_int32(operand)
+        return -operand if isinstance(node.op, ast.USub) else +operand
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        return _BINARY_OPERATORS[type(node.op)](_evaluate_node(node.left), _evaluate_node(node.right))
+    if isinstance(node, ast.BoolOp):
+        value = _evaluate_node(node.values[0])
+        for operand in node.values[1:]:
+            if _truthy(value) != isinstance(node.op, ast.And):
+                break
+            value = _evaluate_node(operand)
+        return value
+    if isinstance(node, ast.Compare) and all(type(op) in _COMPARE_OPERATORS for op in node.ops):
+        value = _evaluate_node(node.left)
+        for op, comparator in zip(node.ops, node.comparators):
+            value = _COMPARE_OPERATORS[type(op)](value, _evaluate_node(comparator))
+        return value
+    raise ValueError(f"unsupported expression: {ast.dump(node)}")
+
+
+def _drop_closed(pattern: re.Pattern, text: str, close: str) -> str:
+    """``pattern.sub(" ", text)`` for a pattern whose matches end at ``close``.
+
+    Only the text up to the last ``close`` can hold a match. Cutting there
+    first means no attempt runs to the end of the text, so brackets left
+    open stay linear.
+    """
+
+    cut = text.rfind(close) + 1
+    return pattern.sub(" ", text[:cut]) + text[cut:]
+
+
+def _split_statements(text: str) -> List[str]:
+    """Split at ``;`` outside brackets, braces and strings (function bodies stay whole)."""
+
+    statements: List[str] = []
+    depth = 0
+    start = 0
+    index = 0
+    length = len(text)
+    while index < length:
+        char = text[index]
+        if char == '"' or char == "'":
+            index = _skip_quoted(text, index)
+            continue
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+        elif char == ";" and depth == 0:
+            statements.append(text[start:index + 1])
+            start = index + 1
+        index += 1
+    if text[start:].strip():
+        statements.append(text[start:])
+    return statements
+
+
+def _identifier(text: object) -> Optional[str]:
+    """Last identifier of a declaration or argument once tags, keywords and indexes are gone."""
+
+    if not text:
+        return None
+    cleaned = re.sub(r"\b(?:new|static|stock|const|enum)\b", " ", str(text), flags=re.IGNORECASE)
+    cleaned = re.sub(r"\b(?:Float|bool|char|String|Handle|any|Task|Array)\s*:", " ", cleaned, flags=re.IGNORECASE)
+    cleaned = re.sub(r"\b(?:Float|bool|char|String|Handle|any|Task|Array)\b", " ", cleaned, flags=re.IGNORECASE)
+    cleaned = re.sub(r"\b_:[A-Za-z0-9_]*:", " ", cleaned)
+    cleaned = re.sub(r"[*&]", " ", _drop_closed(_INDEX_PATTERN, cleaned, "]"))
+    parts = cleaned.strip().split()
+    return parts[-1] if parts else ""
+
+
+def _identifier_tokens(name: str) -> List[str]:
+    spaced = re.sub(r"([a-z])([A-Z])", r"\1_\2", name or "")
+    return [token for token in re.split(r"[^a-z0-9]+", spaced.lower()) if token]
+
+
+def _is_quoted(text: str) -> bool:
+    return len(text) >= 1 and (
+        (text.startswith('"') and text.endswith('"')) or (text.startswith("'") and text.endswith("'"))
+    )
+
+
+def _leading_literal(raw: str) -> Optional[str]:
+    """Undecoded body of the string literal ``raw`` starts with, if it is closed."""
+
+    if not raw or raw[0] not in "\"'":
+        return None
+    end = _skip_quoted(raw, 0)
+    return raw[1:end - 1] if 2 <= end <= len(raw) and raw[end - 1] == raw[0] else None
+
+
+def _flatten_strings(value: object) -> List[str]:
+    if isinstance(value, list):
+        return [item for entry in value for item in _flatten_strings(entry)]
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return [_format_number(value)]
+    return []
+
+
+def _add_unique(values: list, value: object) -> None:
+    if value not in values:
+        values.append(value)
+
+
+@dataclass
+class _Definition:
+    name: str
+    expr: str
+    kind: str
+    tokens: List[str]
+    alias: Optional[str] = None
+
+
+def _definition_kind(expr: str) -> str:
+    text = expr.strip()
+    if text.startswith("{"):
+        return "array"
+    if re.match(r'^".*"$', text) or re.match(r"^'.*'$", text):
+        return "string"
+    if re.match(r"^[+-]?(?:0x[0-9a-f]+|\d+\.\d+|\d+)$", text):
+        return "number"
+    return "expr"
+
+
+def _define_lines(masked: str) -> List[tuple]:
+    """``(name, expression)`` of every ``#define`` with a value, continuations joined."""
+
+    defines = []
+    lines = re.split(r"\r?\n", masked)
+    index = 0
+    while index < len(lines):
+        line = lines[index].strip()
+        index += 1
+        match = re.match(r"^#define\s+(\w+)(.*)$", line) if line.startswith("#define") else None
+        if not match:
+            continue
+        remainder = match.group(2)
+        parts = [re.sub(r"\\\s*$", "", remainder).strip()]
+        continued = re.search(r"\\\s*$", remainder) is not None
+        while continued and index < len(lines):
+            following = lines[index].strip()
+            index += 1
+            parts.append(re.sub(r"\\\s*$", "", following).strip())
+            continued = re.search(r"\\\s*$", following) is not None
+        expr = " ".join(part for part in parts if part).strip()
+        if expr:
+            defines.append((match.group(1), expr))
+    return defines
+
+
+class _Resolver:
+    """Definitions of one script and the resolution rules of the GUI scan.
+
+    ``included`` holds the ``#define`` values of the script's include closure;
+    they only answer identifiers the script and the hardcoded table leave open.
+    Every identifier is resolved at most once.
+    """
+
+    def __init__(self, masked: str, included: Optional[Dict[str, str]] = None) -> None:
+        self.definitions: Dict[str, _Definition] = {}
+        self.by_token: Dict[str, List[_Definition]] = {}
+        self.arrays: Dict[str, str] = {}
+        self.included = included or {}
+        self.variables: Dict[str, object] = {}
+        self._unresolved: set = set()
+        self._array_values: Dict[str, List[object]] = {}
+        self._resolving: set = set()
+        self._collect(masked)
+
+    def _define(self, name: str, expr: str, alias: Optional[str] = None) -> None:
+        expr = expr.strip()
+        entry = _Definition(name, expr, "alias" if alias else _definition_kind(expr), _identifier_tokens(name), alias)
+        self.definitions[name] = entry
+        for token in dict.fromkeys(entry.tokens):
+            self.by_token.setdefault(token, []).append(entry)
+        if entry.kind == "array":
+            self.arrays[name] = expr
+
+    def _collect(self, masked: str) -> None:
+        for name, expr in _define_lines(masked):
+            self._define(name, expr)
+
+        for statement in _split_statements(masked):
+            text = statement.strip()
+            if not text:
+                continue
+            match = _REGISTER_CVAR_PATTERN.search(text) if "register_cvar" in text.lower() else None
+            close = text.find(")", match.end()) if match else -1
+            if close >= 0:
+                parts = split_arguments(text[match.end():close])
+                self._define(match.group(1), parts[1] if len(parts) > 1 else "")
+                continue
+            assignment = self._set_pcvar(text)
+            if assignment is not None:
+                if assignment[0]:
+                    self._define(*assignment)
+                continue
+            equals = text.find("=")
+            if equals < 0:
+                continue
+            rhs = text[equals + 1:].strip()
+            if rhs.endswith(";"):
+                rhs = rhs[:-1]
+            name = _identifier(text[:equals].strip())
+            if not name:
+                continue
+            match = _GET_PCVAR_PATTERN.search(rhs)
+            close = rhs.find(")", match.end()) if match else -1
+            if match and close > match.end():
+                referenced = _identifier(rhs[match.end():close])
+                if referenced and referenced in self.definitions:
+                    self._define(name, referenced, alias=referenced)
+                    continue
+            self._define(name, rhs)
+
+        for line in re.split(r"\r?\n", masked):
+            text = line.strip()
+            if not re.match(r"^(?:new\s+)?const\b", text, re.IGNORECASE) or "=" not in text:
+                continue
+            equals = text.find("=")
+            lhs, rhs = text[:equals].strip(), text[equals + 1:].strip()
+            name = _identifier(lhs) if lhs and rhs else None
+            if not name or name in self.definitions:
+                continue
+            if rhs.endswith(";"):
+                rhs = rhs[:-1].strip()
+            self._define(name, rhs)
+
+    @staticmethod
+    def _set_pcvar(text: str) -> Optional[tuple]:
+        """``(name, value)`` of a ``set_pcvar_num/float(name, value)`` statement.
+
+        As in the GUI the value runs to the last ``)`` on the line of the
+        first comma; None when the statement has no such call.
+        """
+
+        match = _SET_PCVAR_PATTERN.search(text)
+        if not match:
+            return None
+        comma = text.find(",", match.end())
+        if comma <= match.end():
+            return None
+        newline = text.find("\n", comma)
+        close = text.rfind(")", comma + 1, len(text) if newline < 0 else newline)
+        if close < comma + 2:
+            return None
+        return _identifier(text[match.end():comma]), re.sub(r"\);?$", "", text[comma + 1:close]).strip()
+
+    def known(self, name: str) -> bool:
+        return bool(name) and (
+            name in HARDCODED_CONSTANTS or name in self.variables or name in self.definitions or name in self.arrays
+        )
+
+    def value(self, expression: object) -> object:
+        if expression is None or not isinstance(expression, str):
+            return expression
+        text = expression.strip()
+        if not text:
+            return None
+        if _WORD_PATTERN.match(text):
+            if text in self.variables:
+                return self.variables[text]
+            if text not in self.definitions and text in HARDCODED_CONSTANTS:
+                return HARDCODED_CONSTANTS[text]
+        return self.expression(text)
+
+    def identifier(self, name: Optional[str]) -> object:
+        if not name:
+            return None
+        if name in HARDCODED_CONSTANTS:
+            return HARDCODED_CONSTANTS[name]
+        if name in self.variables:
+            return self.variables[name]
+        entry = self.definitions.get(name)
+        if entry is None and name in self.included:
+            entry = _Definition(name, self.included[name], _definition_kind(self.included[name]), [])
+        if entry is None or name in self._resolving or name in self._unresolved:
+            return None
+        self._resolving.add(name)
+        try:
+            if entry.kind == "alias":
+                value = self.identifier(entry.alias)
+            elif entry.kind == "array":
+                value = self.array(entry.expr)
+            elif entry.kind == "string":
+                value = decode_string(entry.expr[1:-1])
+            else:
+                value = self.expression(entry.expr) if entry.expr else None
+        except RecursionError:
+            value = None
+        finally:
+            self._resolving.discard(name)
+        if value is not None:
+            self.variables[name] = value
+        elif not self._resolving:  # inside a cycle the answer depends on where it started
+            self._unresolved.add(name)
+        return value
+
+    def array(self, expr: str) -> List[object]:
+        if expr not in self._array_values:
+            parts = split_arguments(expr[1:-1])
+            if parts and not parts[-1]:  # "{a, b,}" has two elements
+                parts.pop()
+            self._array_values[expr] = [self.value(part) for part in parts]
+        return self._array_values[expr]
+
+    def expression(self, expression: object) -> object:
+        """Port of the GUI's parseExpression: literals, casts, arrays, lookups and arithmetic."""
+
+        if not expression or not isinstance(expression, str):
+            return None
+        text = expression.strip()
+        if not text:
+            return None
+        if text.startswith("{") and text.endswith("}"):
+            return self.array(text)
+        if _is_quoted(text):
+            parsed = decode_string(text[1:-1])
+            return ord(parsed) if text[0] == "'" and len(parsed) == 1 else parsed
+        match = _TAGGED_PATTERN.match(text)
+        if match:
+            return self.expression(match.group(1))
+        number = _parse_number(text)
+        if number is not None:
+            return number
+        if text.startswith("(") and text.endswith(")"):
+            inner = self.expression(text[1:-1])
+            if inner is not None:
+                return inner
+        match = _NEW_PATTERN.match(text)
+        if match:
+            args = split_arguments(match.group(1))
+            if not args:
+                return None
+            numeric = _to_number(self.value(args[0]))
+            if numeric is not None:
+                return numeric
+            literal = self.literal(args[0])
+            return literal if literal is not None else self.expression(args[0])
+        match = re.match(r"^(float|_:float)\s*\((.*)\)$", text, re.IGNORECASE)
+        if match:
+            inner = self.expression(match.group(2))
+            return None if inner is None else _js_number(inner)
+        match = re.match(r"^view_as<[^>]+>\s*\((.+)\)$", text, re.IGNORECASE)
+        if match:
+            return self.expression(match.group(1))
+        match = re.match(r"^get_pcvar_(?:num|float)\s*\((.+)\)$", text, re.IGNORECASE)
+        if match:
+            args = split_arguments(match.group(1))
+            name = _identifier(args[0]) if args else None
+            return self.identifier(name) if name else None
+        match = _ACCESS_PATTERN.match(text)
+        if match:
+            value = self.identifier(match.group(1))
+            for index_text in re.findall(r"\[([^\]]+)\]", text):
+                if value is None or not isinstance(value, list):
+                    return None
+                index = self.expression(index_text)
+                if not isinstance(index, (int, float)) or isinstance(index, bool):
+                    return None
+                value = value[int(index)] if float(index).is_integer() and 0 <= index < len(value) else None
+            return value
+        if _WORD_PATTERN.match(text):
+            return self.identifier(text)
+
+        def _substitute(match: re.Match) -> str:
+            value = self.identifier(match.group(0))
+            number = None if value is None else _js_number(value)
+            return match.group(0) if number is None else _format_number(number)
+
+        sanitized = re.sub(r"\b[A-Za-z_]\w*\b", _substitute, text)
+        if _ARITHMETIC_PATTERN.match(sanitized):
+            return _evaluate(sanitized)
+        return None
+
+    def literal(self, expr: object) -> Optional[float]:
+        """Port of the GUI's resolveLiteralValue: a number for ``expr`` or None."""
+
+        if expr is None:
+            return None
+        if not isinstance(expr, str):
+            return _to_number(expr)
+        text = expr.strip()
+        if not text or _is_quoted(text):
+            return None
+        resolved = self.value(text)
+        numeric = _to_number(resolved)
+        if numeric is not None:
+            return numeric
+        if isinstance(resolved, str) and resolved != text:
+            nested = self.literal(resolved)
+            if nested is not None:
+                return nested
+        match = _NEW_PATTERN.match(text)
+        if match:
+            args = split_arguments(match.group(1))
+            if args:
+                numeric = _to_number(self.value(args[0]))
+                return numeric if numeric is not None else self.literal(args[0])
+        text = re.sub(r"\b(?:new|const|stock|static)\b", " ", text, flags=re.IGNORECASE)
+        text = re.sub(
+            r"\b(?:Float|float|_:float|_:Float|bool|Bool|_:bool|_:Bool|char|Char|_:char|_:Char|Handle)\s*:", " ", text
+        )
+        text = text.rstrip(";").strip()
+        if not text or _is_quoted(text):
+            return None
+        number = _parse_number(text)
+        if number is not None:
+            return number
+        if _WORD_PATTERN.match(text):
+            numeric = _to_number(self.value(text))
+            if numeric is not None:
+                return numeric
+        if _ARITHMETIC_PATTERN.match(text):
+            return _to_number(_evaluate(text))
+        return None
+
+    def looks_dynamic(self, expr: str) -> bool:
+        text = expr.strip()
+        if not text:
+            return False
+        casts = {"float", "Float", "bool", "Bool", "_:float", "_:Float", "_:bool", "_:Bool", "view_as"}
+        match = re.search(r"\b([A-Za-z_]\w*)\s*\(", text)
+        if match and match.group(1) not in casts:
+            return True
+        if re.search(r"[+\-*/%]", text) and re.search(r"[A-Za-z_]", text):
+            for name in re.findall(r"[A-Za-z_]\w*", text):
+                if name not in casts and name != "new" and name != "sizeof" and not self.known(name):
+                    return True
+        if "%" in text:
+            return True
+        if "[" in text:
+            match = re.search(r"\b([A-Za-z_]\w*)\s*(?=\[)", text)
+            if match and not self.known(match.group(1)):
+                return True
+            for inner in re.findall(r"\[([^\]]+)\]", text[:text.rfind("]") + 1]):
+                if any(not self.known(name) for name in re.findall(r"[A-Za-z_]\w*", inner)):
+                    return True
+        return False
+
+    def meta(self, expr: object) -> tuple:
+        """Port of resolveExpressionMeta: ``(value, sources, dynamic)``."""
+
+        if expr is None:
+            return None, [], False
+        if not isinstance(expr, str):
+            return self.value(expr), ["symbolTable"], False
+        text = expr.strip()
+        if not text:
+            return None, [], False
+        if _is_quoted(text):
+            return decode_string(text[1:-1]), ["literal"], False
+        number = _parse_number(text)
+        if number is not None:
+            return number, ["literal"], False
+        dynamic = self.looks_dynamic(text)
+        if _WORD_PATTERN.match(text):
+            value = self.identifier(text)
+            if value is not None:
+                return value, ["symbolTable"], False
+            if not self.known(text):
+                return None, [], True
+        value = self.value(text)
+        if value is not None:
+            return value, ["symbolTable"], False
+        literal = self.literal(text)
+        if literal is not None:
+            return literal, ["literal"], False
+        return None, [], dynamic
+
+    def numeric(self, expr: object) -> tuple:
+        """``(number, sources, dynamic, had_value)`` for a stat expression."""
+
+        value, sources, dynamic = self.meta(expr)
+        number = _to_number(value)
+        if number is None and value is not None:
+            number = _to_number(self.literal(value))
+            if number is not None:
+                _add_unique(sources, "literal")
+        return number, sources, dynamic, value is not None
+
+    def strings(self, expr: object) -> tuple:
+        """Port of collectStringsFromExpression: ``(values, sources, dynamic)``."""
+
+        value, sources, dynamic = self.meta(expr)
+        sources = list(sources)
+        values: List[str] = []
+        for text in _flatten_strings(value):
+            if text.strip() or text == "":
+                _add_unique(values, text.strip())
+        if not values and isinstance(expr, str) and _is_quoted(expr.strip()):
+            values.append(decode_string(expr.strip()[1:-1]))
+            _add_unique(sources, "literal")
+        if not values:
+            name = _identifier(expr)
+            found = [text.strip() for text in _flatten_strings(self.identifier(name)) if text.strip()]
+            if isinstance(expr, str) and "[" in expr:
+                match = re.search(r"\b([A-Za-z_]\w*)\s*(?=\[)", expr)
+                base = match.group(1) if match else name
+                found += [text.strip() for text in _flatten_strings(self.identifier(base)) if text.strip()]
+                if base in self.arrays:
+                    found += [text.strip() for text in _flatten_strings(self.array(self.arrays[base])) if text.strip()]
+            for text in found:
+                _add_unique(values, text)
+                _add_unique(sources, "symbolTable")
+        return values, sources, dynamic
+
+
+@lru_cache(maxsize=None)
+def _include_file(path: Path) -> tuple:
+    """``(defines, included names)`` of one include file."""
+
+    try:
+        masked = mask_comments(path.read_text(encoding="utf-8", errors="replace"))
+    except OSError:
+        return (), ()
+    return tuple(_define_lines(masked)), tuple(_INCLUDE_PATTERN.findall(masked))
+
+
+@lru_cache(maxsize=None)
+def _include_dirs(directory: Path, input_dir: Path) -> tuple:
+    """``include`` folders next to ``directory`` and its parents, else any in the pack."""
+
+    dirs = [candidate for candidate in (directory, *directory.parents) if (candidate / "include").is_dir()]
+    found = [candidate / "include" for candidate in dirs]
+    if not found and input_dir.is_dir():
+        found = sorted(path for path in input_dir.rglob("include") if path.is_dir())
+    return (directory, *found)
+
+
+@lru_cache(maxsize=None)
+def _locate_include(name: str, search: tuple) -> Optional[Path]:
+    candidates = [name] if Path(name).suffix else [f"{name}.inc", name]
+    for directory in search:
+        for candidate in candidates:
+            if (directory / candidate).is_file():
+                return directory / candidate
+    return None
+
+
+def included_defines(path: Path, masked: str, input_dir: Path = INPUT_DIR) -> Dict[str, str]:
+    """``#define`` values of the include closure of a script, nearest include first."""
+
+    search = _include_dirs(path.resolve().parent, input_dir.resolve())
+    defines: Dict[str, str] = {}
+    pending = list(_INCLUDE_PATTERN.findall(masked))
+    seen = set()
+    while pending:
+        target = _locate_include(pending.pop(0).strip(), search)
+        if target is None or target in seen:
+            continue
+        seen.add(target)
+        file_defines, nested = _include_file(target)
+        for define, expr in file_defines:
+            defines.setdefault(define, expr)
+        pending.extend(nested)
+    return defines
+
+
+def detect_version(path: Path, text: str, calls: Iterable[CallSite]) -> Dict[str, object]:
+    """Origin version of a script from its file name, register calls and includes."""
+
+    lower = text.lower()
+    looks_addon = bool(re.search(r"zp_zclass_|zp_hclass_|zp_zombieclass_|zp_zombie_class_|zp_zclass", path.name.lower()))
+    looks_addon = looks_addon or "zp_zclass_" in lower
+    origins = {REGISTER_FUNCTIONS[call.name.lower()][2] for call in calls if call.name.lower() in REGISTER_FUNCTIONS}
+    legacy = "zp_4_3" in origins or re.search(r"#include\s*<\s*zombieplague", lower) is not None
+    modern = "zp_5_0_8a" in origins or re.search(r"#include\s*<\s*zp50_", lower) is not None
+
+    base = "zp_4_3" if legacy else "zp_5_0_8a" if modern else "unknown"
+    version = "external_addon" if looks_addon else "mixed" if legacy and modern else base
+    label = VERSION_LABELS.get(version, VERSION_LABELS["unknown"])
+    if version == "external_addon" and base != "unknown":
+        label = f"{label} ({VERSION_LABELS[base]})"
+    elif version == "mixed":
+        label = f"{label} (ZP 4.3 + ZP 5.0.8a)"
+    if version == "unknown":
+        version, label = "zp_5_0_8a", VERSION_LABELS["zp_5_0_8a"]
+    return {
+        "version": version,
+        "label": label,
+        "addon": looks_addon,
+        "base": version if base == "unknown" else base,
+    }
+
+
+def _calls_ending_with(calls: Iterable[CallSite], suffix: str) -> List[CallSite]:
+    return [call for call in calls if call.name.lower().endswith(suffix)]
+
+
+def _first_between(calls: List[CallSite], offsets: List[int], start: int, stop: int) -> Optional[CallSite]:
+    position = bisect.bisect_left(offsets, start)
+    return calls[position] if position < len(calls) and offsets[position] < stop else None
+
+
+def _prefixes(args: Iterable[str]) -> List[str]:
+    prefixes: List[str] = []
+    for arg in args:
+        name = _identifier(arg)
+        if not name:
+            continue
+        if "_" in name:
+            _add_unique(prefixes, name.split("_")[0].lower())
+        _add_unique(prefixes, name.lower())
+    return prefixes
+
+
+def _add_path(item: dict, kind: str, value: object) -> bool:
+    if item["type"] == "mode":
+        return False
+    normalized = normalize_asset(value)
+    key = normalized.replace("\\", "/").strip().lower() if normalized else ""
+    if not key or (kind, key) in item["_seen"]:
+        return False
+    item["_seen"].add((kind, key))
+    item["_paths"][kind].append(key)
+    return True
+
+
+def _mark(meta: dict, field: str, tag: str) -> None:
+    _add_unique(meta["resolvedFrom"].setdefault(field, []), tag)
+
+
+def _new_item(
+    item_type: str, name: str, file_base: str, origin_name: str, version: Dict[str, object], line: Optional[int], **meta
+) -> dict:
+    normalized_name = normalize_name(name)
+    item: Dict[str, object] = {
+        "id": "",
+        "type": item_type,
+        "name": name,
+        "fileName": file_base,
+        "enabled": True,
+        "source": "scan",
+        "stats": {},
+        "paths": {"models": [], "claws": [], "sounds": [], "sprites": []},
+        "abilities": [],
+        "meta": {
+            "originFile": origin_name,
+            "originVersion": version["version"],
+            "originLabel": version["label"],
+            "originIsAddon": version["addon"],
+            "originBaseVersion": version["base"],
+            "migrated": version["version"] != "zp_5_0_8a",
+            "registerLine": line,
+            "warnings": [],
+            "transformations": [],
+            "conflicts": [],
+            "bundle": file_base,
+            "normalizedName": normalized_name,
+            "extraCalls": [],
+            "resolvedFrom": {},
+            **meta,
+        },
+        # Build state, dropped before the item is returned.
+        "_paths": {"models": [], "claws": [], "sounds": [], "sprites": []},
+        "_seen": set(),
+        "_index": None,
+        "_prefixes": [],
+    }
+    for type_name, words in SPECIAL_NAMES:
+        if any(word in name.lower().strip() for word in words):
+            item["type"] = type_name
+    return item
+
+
+def _entity_name(args: List[str], resolver: _Resolver, fallback: str) -> tuple:
+    """``(value, token, resolved)`` like the GUI: hardcoded names first, then any resolvable argument."""
+
+    for arg in args:
+        name = _identifier(arg)
+        if name in HARDCODED_CONSTANTS:
+            return HARDCODED_CONSTANTS[name], name, True
+    for arg in args:
+        text = arg.strip()
+        if _WORD_PATTERN.match(text):
+            value = next((item for item in _flatten_strings(resolver.value(text)) if item), None)
+            if value:
+                return value, text, True
+        value = next((item for item in _flatten_strings(resolver.value(arg)) if item), None)
+        if value:
+            return value, None, True
+    return fallback, None, False
+
+
+def _register_stats(call: CallSite, item_type: str, normalized: str, resolver: _Resolver, prefixes: List[str]) -> tuple:
+    """``(stats, resolvedFrom, name override, warnings)`` of one register call."""
+
+    args = call.raw_args
+    if normalized == "zp_items_register" and item_type == "shop_item":
+        name = next((item.strip() for item in _flatten_strings(resolver.value(args[0] if args else None)) if item.strip()), None)
+        if not name and args and _is_quoted(args[0].strip()):
+            name = decode_string(args[0].strip()[1:-1]).strip() or None
+        cost = _to_number(resolver.value(args[1] if len(args) > 1 else None))
+        if cost is None:
+            cost = _to_number(resolver.literal(args[1] if len(args) > 1 else None))
+        resolved = {"team": ["fallback"], "unlimited": ["fallback"]}
+        if cost is None:
+            resolved = {"cost": ["fallback"], **resolved}
+        return {"cost": 0 if cost is None else cost, "team": 0, "unlimited": 0}, resolved, name, []
+
+    stats: Dict[str, object] = {}
+    resolved_from: Dict[str, List[str]] = {}
+    warnings: List[str] = []
+    positions = FIELD_POSITIONS.get(item_type, {})
+    for field in TYPE_STAT_FIELDS.get(item_type, ()):
+        keywords = STAT_KEYWORDS[field]
+        sources: List[str] = []
+        value = None
+        dynamic = False
+
+        def consider(expr: Optional[str]) -> bool:
+            nonlocal value, dynamic
+            if expr is None:
+                return False
+            number, found, is_dynamic, had_value = resolver.numeric(expr)
+            if number is not None:
+                value = number
+                sources.extend(tag for tag in found if tag not in sources)
+                return True
+            dynamic = dynamic or is_dynamic
+            if had_value:
+                sources.extend(tag for tag in found if tag not in sources)
+            return False
+
+        if field in positions and positions[field] < len(args):
+            consider(args[positions[field]])
+        if value is None:
+            for arg in args:
+                name = _identifier(arg)
+                if name and any(token in keywords for token in _identifier_tokens(name)) and consider(arg):
+                    break
+        if value is None:
+            found = _definition_value(resolver, keywords, prefixes)
+            if found is not None:
+                value = _to_number(found)
+                _add_unique(sources, "symbolTable")
+        if value is None:
+            if item_type == "shop_item" and field == "unlimited" and normalized == "zp_register_extra_item" and not dynamic:
+                warnings.append(f"No se pudo resolver el valor de {field} en {call.name} (línea {call.line})")
+            value = 0
+            _add_unique(sources, "fallback")
+        stats[field] = value
+        if sources:
+            resolved_from[field] = sources
+    return stats, resolved_from, None, warnings
+
+
+def _definition_value(resolver: _Resolver, keywords: Sequence[str], prefixes: List[str]) -> object:
+    """Value of the first definition named after a stat keyword, preferring the call's prefixes."""
+
+    for prefix in prefixes:
+        for keyword in keywords:
+            for entry in resolver.by_token.get(keyword, ()):
+                if prefix and not any(token == prefix or token.startswith(prefix) for token in entry.tokens):
+                    continue
+                value = resolver.identifier(entry.name)
+                if value is not None:
+                    return value
+    for keyword in keywords:
+        for entry in resolver.by_token.get(keyword, ()):
+            value = resolver.identifier(entry.name)
+            if value is not None:
+                return value
+    return None
+
+
+def _categorize(item: dict, value: str) -> None:
+    if item["type"] == "mode":
+        return
+    normalized = normalize_asset(value)
+    kind = RESOURCE_EXTENSIONS.get(posixpath.splitext(normalized)[1]) if normalized else None
+    if kind == "models" or (kind and item["type"] not in CLASS_TYPES):
+        _add_path(item, kind, normalized)
+
+
+def _lookup_key(value: object) -> Optional[str]:
+    if value is None:
+        return None
+    text = _format_number(value).strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        text = text[1:-1].strip()
+    return text.lower() or None
+
+
+def _lookup_name(value: object) -> Optional[str]:
+    key = _lookup_key(value)
+    return normalize_name(key) or None if key else None
+
+
+def _lookup_keys(item: dict, args: Optional[List[str]], resolver: _Resolver) -> None:
+    meta = item["meta"]
+    keys: List[str] = []
+    values = [meta.get("registerVar"), meta.get("displayNameToken"), meta["normalizedName"] or item["name"], item["name"]]
+    if args:
+        values += [_identifier(args[0]), args[0], *_flatten_strings(resolver.value(args[0]))]
+    for value in values:
+        for key in (_lookup_key(value), _lookup_name(value)):
+            if key:
+                _add_unique(keys, key)
+    meta["lookupKeys"] = keys
+
+
+class _Registry:
+    """Items of a script by variable, lookup key and name, for the supplemental calls.
+
+    A supplemental call goes to the first item (in registration order) of an
+    allowed type under the first key that has one, so each key only keeps
+    the first item of every type.
+    """
+
+    def __init__(self) -> None:
+        self.by_var: Dict[str, Dict[str, dict]] = {}
+        self.by_key: Dict[str, Dict[str, dict]] = {}
+        self.by_name: Dict[str, Dict[str, dict]] = {}
+        self.first: Dict[str, dict] = {}
+        self.order: Dict[int, int] = {}
+
+    @staticmethod
+    def _add(table: Dict[str, Dict[str, dict]], value: object, item: dict, normalizer) -> None:
+        key = normalizer(value) if value is not None else None
+        if key:
+            table.setdefault(str(key).lower(), {}).setdefault(item["type"], item)
+
+    def register(self, item: dict, args: Optional[List[str]]) -> None:
+        self.order.setdefault(id(item), len(self.order))
+        self.first.setdefault(item["type"], item)
+        meta = item["meta"]
+        self._add(self.by_var, meta.get("registerVar"), item, _lookup_key)
+        if args:
+            self._add(self.by_var, _identifier(args[0]), item, _lookup_key)
+            self._add(self.by_key, args[0], item, _lookup_key)
+            self._add(self.by_key, args[0], item, _lookup_name)
+        self._add(self.by_name, meta["normalizedName"] or normalize_name(item["name"]), item, _lookup_name)
+        for key in meta.get("lookupKeys", ()):
+            self._add(self.by_key, key, item, _lookup_key)
+            self._add(self.by_name, key, item, _lookup_name)
+
+    def _earliest(self, by_type: Dict[str, dict], allowed: frozenset) -> Optional[dict]:
+        found = [item for item_type, item in by_type.items() if item_type in allowed]
+        return min(found, key=lambda item: self.order[id(item)]) if found else None
+
+    def locate(self, args: List[str], allowed: frozenset, resolver: _Resolver) -> Optional[dict]:
+        name = _identifier(args[0])
+        candidates: List[str] = []
+        for value in (name, args[0], *_flatten_strings(resolver.value(args[0]))):
+            for key in (_lookup_key(value) if value else None, _lookup_name(value) if value else None):
+                if key:
+                    _add_unique(candidates, key)
+        tables = [self.by_var.get(name.lower(), {}) if name else {}]
+        tables += [self.by_key.get(key, {}) for key in candidates]
+        tables += [self.by_name.get(key, {}) for key in candidates]
+        for by_type in tables + [self.first]:
+            item = self._earliest(by_type, allowed)
+            if item is not None:
+                return item
+        return None
+
+
+def _add_conflict(target: dict, other: dict) -> None:
+    info = {"originFile": other["meta"].get("originFile") or target["meta"].get("originFile"),
+            "registerLine": other["meta"].get("registerLine")}
+    key = ("conflict", info["originFile"], info["registerLine"])
+    if key not in target["_seen"]:
+        target["_seen"].add(key)
+        target["meta"]["conflicts"].append(info)
+
+
+def _register(item: dict, args: Optional[List[str]], resolver: _Resolver, registry: _Registry, seen: Dict[str, dict]) -> None:
+    """Index an item and record a conflict with the first item of the same type and name.
+
+    The GUI keeps the first of such items, so that one lists every later
+    duplicate; the later ones list the first (the GUI lists them all, which
+    is quadratic and is dropped with them when the scan deduplicates).
+    """
+
+    _lookup_keys(item, args, resolver)
+    registry.register(item, args)
+    if not item["meta"]["normalizedName"]:
+        return
+    first = seen.setdefault(f"{item['type']}|{item['meta']['normalizedName']}", item)
+    if first is not item:
+        _add_conflict(first, item)
+        _add_conflict(item, first)
+
+
+def _pseudo_human_classes(path: Path, text: str, calls: List[CallSite], lines: List[int], resolver: _Resolver, build) -> List[dict]:
+    """Human classes of zp_hclass-style plugins, one ``public class_N(id)`` handler each."""
+
+    if not path.name.lower().endswith("zp_hclass.sma"):
+        return []
+    closes: Optional[Dict[int, int]] = None
+    setters = {field: _calls_ending_with(calls, function) for field, function in PSEUDO_STAT_FUNCTIONS}
+    setter_offsets = {field: [call.offset for call in found] for field, found in setters.items()}
+    names = [
+        (_calls_ending_with(calls, function), position, source)
+        for function, position, source in (("chat_color", 1, "chat_color"), ("client_print", 2, "print"))
+    ]
+    names = [
+        ([call for call in found if len(call.raw_args) > position and all(call.raw_args[:position])
+          and _leading_literal(call.raw_args[position]) is not None], position, source)
+        for found, position, source in names
+    ]
+    names = [(found, [call.offset for call in found], position, source) for found, position, source in names]
+
+    items = []
+    for match in _PSEUDO_CLASS_PATTERN.finditer(text):
+        if closes is None:
+            closes = match_braces(text)
+        brace = match.end() - 1
+        close = closes.get(brace, len(text))
+        if close >= len(text):  # unterminated handler
+            continue
+        name, source = None, None
+        for found, offsets, position, label in names:
+            call = _first_between(found, offsets, brace, close)
+            if call is not None:
+                name, source = _pseudo_name(_leading_literal(call.raw_args[position])), label
+                break
+        index = int(match.group(1))
+        item = build("human_class", name or f"Human Class {index}", bisect.bisect_right(lines, match.start()),
+                     registerFunction="pseudo_class", registerFunctionNormalized="pseudo_class",
+                     source="pseudo", pseudoIndex=index, **({"pseudoNameSource": source} if name else {}))
+        item["stats"] = {field: None for field in ("health", "speed", "gravity", "armor")}
+        for field, _ in PSEUDO_STAT_FUNCTIONS:
+            call = _first_between(setters[field], setter_offsets[field], brace, close)
+            if call is not None and len(call.raw_args) > 1 and call.raw_args[1]:
+                number = _to_number(resolver.value(call.raw_args[1]))
+                if number is None:
+                    number = _to_number(resolver.literal(call.raw_args[1]))
+                if number is not None:
+                    item["stats"][field] = number
+                    _mark(item["meta"], field, "pseudo")
+        item["_index"] = match.start()
+        items.append(item)
+    return items
+
+
+def _pseudo_name(raw: str) -> Optional[str]:
+    """Class name of a ``[ZP] ... class is: !gName !t(...)`` message, without colour codes."""
+
+    cleaned = _drop_closed(_INDEX_PATTERN, re.sub(r"\^.", "", re.sub(r"!.", "", raw)), "]").strip()
+    cleaned = re.sub(r"\s{2,}", " ", cleaned).strip()
+    cleaned = cleaned[cleaned.rfind(":") + 1:]
+    cleaned = "\n".join(_drop_closed(_PARENTHESIZED_PATTERN, line, ")") for line in cleaned.split("\n"))
+    return re.sub(r"\s{2,}", " ", cleaned.strip()).strip() or None
+
+
+def _menu_array_items(path: Path, text: str, lines: List[int], resolver: _Resolver, build) -> List[dict]:
+    """Items declared as parallel ``<base>_name``/``<base>_health``... arrays in menu plugins."""
+
+    if not resolver.arrays or not re.search(r"menu|admin|extra|array", path.name.lower()):
+        return []
+    groups: Dict[str, Dict[str, tuple]] = {}
+    for raw_name, expr in resolver.arrays.items():
+        lower = raw_name.lower()
+        match = _MENU_SUFFIX_PATTERN.search(lower)
+        base = lower[:match.start()] if match else ""
+        if not base:
+            continue
+        values = resolver.array(expr)
+        if values:
+            groups.setdefault(base, {})[match.group(1)] = (values, raw_name)
+
+    first_seen: Optional[Dict[str, int]] = None
+    items = []
+    for base, suffixes in groups.items():
+        item_type = _menu_type(base)
+        names = (suffixes.get("name") or suffixes.get("names") or ([], None))
+        if not item_type or not names[0]:
+            continue
+        if first_seen is None:  # first mention of every word, for the declaration line
+            first_seen = {}
+            for word in re.finditer(r"\w+", text.lower()):
+                first_seen.setdefault(word.group(0), word.start())
+        position = first_seen.get(names[1].lower())
+        line = bisect.bisect_right(lines, position) if position is not None else None
+        length = max(len(values) for values, _ in suffixes.values())
+        for index in range(length):
+            name = _menu_string(names[0], index)
+            if not name:
+                continue
+            description = _menu_string(
+                (suffixes.get("info") or suffixes.get("desc") or suffixes.get("description") or ([], None))[0], index
+            )
+            item = build(item_type, name, line, registerFunction="menu_array", registerFunctionNormalized="menu_array",
+                         source="menu-array", menuBase=base, menuIndex=index)
+            if description:
+                item["description"] = description
+            item["stats"] = {field: None for field in TYPE_STAT_FIELDS.get(item_type, ())}
+            item["_index"] = line if line is not None else len(text)
+            item["_prefixes"] = [item["meta"]["normalizedName"]] if item["meta"]["normalizedName"] else []
+            for field in TYPE_STAT_FIELDS.get(item["type"], ()):
+                for alias in ("health", "hp") if field == "health" else (field,):
+                    values = suffixes.get(alias, ([], None))[0]
+                    number = _to_number(values[index]) if index < len(values) else None
+                    if number is not None:
+                        item["stats"][field] = number
+                        _mark(item["meta"], field, "array")
+                        break
+            for kind, aliases in (("models", ("model", "models")), ("claws", ("clawmodel", "clawmodels")),
+                                  ("sounds", ("sound", "sounds")), ("sprites", ("sprite", "sprites"))):
+                values = next((suffixes[alias][0] for alias in aliases if alias in suffixes), [])
+                for value in _flatten_strings(values[index]) if index < len(values) else ():
+                    _add_path(item, kind, value)
+                    _mark(item["meta"], kind, "array")
+            items.append(item)
+    return items
+
+
+def _menu_type(base: str) -> Optional[str]:
+    if "mode" in base:
+        return "mode"
+    if "item" in base or "extra" in base:
+        return "shop_item"
+    if "hclass" in base or "humanclass" in base:
+        return "special_human_class" if "special" in base else "human_class"
+    if "zclass" in base or "zombieclass" in base:
+        return "special_zombie_class" if "special" in base else "zombie_class"
+    return None
+
+
+def _menu_string(values: List[object], index: int) -> Optional[str]:
+    strings = _flatten_strings(values[index]) if index < len(values) else []
+    return next((text.strip() for text in strings if text.strip()), None)
+
+
+def _apply_supplemental(call: CallSite, item: dict, resolver: _Resolver, warnings: List[str]) -> None:
+    kind, field, _ = SUPPLEMENTAL_FUNCTIONS[call.name.lower()]
+    args = call.raw_args
+    record: Dict[str, object] = {
+        "fn": call.name,
+        "args": list(args),
+        "kind": field if kind == "stat" else kind[:-1],
+        "line": call.line,
+        "resolved": False,
+        "resolvedFrom": [],
+        "resolvedValues": {},
+        "dynamic": False,
+    }
+    record["params"] = record["resolvedValues"]
+    sources: List[str] = []
+    if kind == "stat":
+        number, found, dynamic, _ = resolver.numeric(args[1] if len(args) > 1 else None)
+        sources.extend(found)
+        if number is not None:
+            item["stats"][field] = number
+            record["resolvedValues"][field] = number
+            record["resolved"] = True
+            for tag in ("default", "fallback"):
+                if tag in item["meta"]["resolvedFrom"].get(field, ()):
+                    item["meta"]["resolvedFrom"][field].remove(tag)
+            if not item["meta"]["resolvedFrom"].get(field, True):
+                del item["meta"]["resolvedFrom"][field]
+        else:
+            fallback = item["stats"].get(field)
+            if fallback is None:
+                fallback = DEFAULTS.get(item["type"], {}).get(field, 0)
+            item["stats"][field] = fallback
+            record["resolvedValues"][field] = fallback
+            _add_unique(sources, "fallback")
+            _mark(item["meta"], field, "fallback")
+            if (not dynamic and field == "unlimited" and item["type"] == "shop_item"
+                    and item["meta"].get("registerFunctionNormalized") == "zp_register_extra_item"):
+                warnings.append(f"No se pudo resolver el valor de {field} en {call.name} (línea {call.line})")
+        record["dynamic"] = bool(dynamic or not record["resolved"])
+    else:
+        added: List[str] = []
+        dynamic = False
+        if len(args) > 1:
+            values, found, dynamic = resolver.strings(args[1])
+            for tag in found:
+                _add_unique(sources, tag)
+            for value in values:
+                _add_path(item, kind, value)
+                normalized = normalize_asset(value)
+                if normalized and normalized.lower() not in added:
+                    added.append(normalized.lower())
+        record["resolvedValues"][kind] = added
+        record["resolved"] = bool(added)
+        record["dynamic"] = bool(dynamic or not added)
+    record["resolvedFrom"] = sources
+    item["meta"]["extraCalls"].append(record)
+
+
+def _plugin_markers(text: str, items: List[dict]) -> None:
+    """Special classes of plugins that only announce themselves in a ``[ZP] Class:`` message."""
+
+    for pattern, item_type, name in PLUGIN_MARKERS:
+        if not pattern.search(text):
+            continue
+        if any(item["type"] == item_type and str(item["name"]).lower() == name.lower() for item in items):
+            continue
+        base = next((item for item in items if item["meta"].get("source") != "plugin_marker"), None)
+        meta = base["meta"] if base else {}
+        file_name = base["fileName"] if base else "plugin_marker"
+        item = _new_item(item_type, name, file_name, meta.get("originFile") or file_name, {
+            "version": meta.get("originVersion") or "zp_5_0_8a",
+            "label": meta.get("originLabel") or VERSION_LABELS["zp_5_0_8a"],
+            "addon": bool(meta.get("originIsAddon")),
+            "base": meta.get("originBaseVersion") or meta.get("originVersion") or "zp_5_0_8a",
+        }, None, origin="zp_5_0_plugin", source="plugin_marker")
+        del item["meta"]["registerLine"]
+        item["meta"]["migrated"] = bool(meta.get("migrated"))
+        item["meta"]["bundle"] = meta.get("bundle") or file_name
+        item["source"] = "plugin_marker"
+        items.append(item)
+
+
+def _abilities(text: str, lines: List[int]) -> List[dict]:
+    return [
+        {
+            "type": "abilityDetected",
+            "fn": match.group(0).split("(")[0].strip(),
+            "args": [group for group in match.groups()],
+            "effect": effect,
+            "line": bisect.bisect_right(lines, match.start()),
+        }
+        for effect, pattern in ABILITY_EFFECTS
+        for match in pattern.finditer(text)
+    ]
+
+
+def _precached(calls: Iterable[CallSite], resolver: _Resolver) -> List[tuple]:
+    """``(offset, value)`` of every precached file."""
+
+    resources = []
+    for call in calls:
+        name = call.name.lower()
+        if call.raw_args and any(name.endswith(function) for function in PRECACHE_FUNCTIONS):
+            values = _flatten_strings(resolver.value(call.raw_args[0]))
+            resources.extend((call.offset, value) for value in values if value)
+    return resources
+
+
+def _assign_resources(items: List[dict], resources: List[tuple]) -> None:
+    """Give every precached file to the item whose names it mentions most, else the nearest one above it.
+
+    Ties go to the nearest item above the call, then to the first item.
+    Items are grouped by their name prefixes (which decide the score) and a
+    file only visits the groups that share a prefix with it; prefixes every
+    group has add the same to all scores and are left out.
+    """
+
+    groups: Dict[tuple, dict] = {}
+    placed: Dict[int, int] = {}
+    first = None
+    for order, item in enumerate(items):
+        if item["type"] == "mode":
+            continue
+        first = order if first is None else first
+        group = groups.setdefault(tuple(prefix for prefix in item["_prefixes"] if prefix),
+                                  {"first": order, "placed": {}})
+        if item["_index"] is not None:
+            group["placed"].setdefault(item["_index"], order)
+            placed.setdefault(item["_index"], order)
+    if first is None:
+        return
+    by_prefix: Dict[str, List[tuple]] = {}
+    for prefixes, group in groups.items():
+        group["positions"] = sorted(group["placed"])
+        group["orders"] = [group["placed"][position] for position in group["positions"]]
+        for prefix in prefixes:
+            by_prefix.setdefault(prefix, []).append(prefixes)
+    by_prefix = {prefix: keys for prefix, keys in by_prefix.items() if len(keys) < len(groups)}
+    sizes = sorted({len(prefix) for prefix in by_prefix})
+    positions = sorted(placed)
+    orders = [placed[position] for position in positions]
+
+    def nearest(positions: List[int], orders: List[int], first: int, offset: int) -> tuple:
+        above = bisect.bisect_right(positions, offset) - 1
+        return (-(offset - positions[above]), -orders[above]) if above >= 0 else (-float("inf"), -first)
+
+    for offset, value in resources:
+        normalized = normalize_asset(value)
+        kind = RESOURCE_EXTENSIONS.get(posixpath.splitext(normalized)[1]) if normalized else None
+        if not kind:
+            continue
+        mentioned = {
+            normalized[start:start + size] for size in sizes for start in range(len(normalized) - size + 1)
+        }.intersection(by_prefix)
+        scores: Dict[tuple, int] = {}
+        for prefix in mentioned:
+            for key in by_prefix[prefix]:
+                scores[key] = scores.get(key, 0) + 1
+        if scores:  # groups that mention more prefixes than the rest beat any other
+            best = max(
+                (score, *nearest(groups[key]["positions"], groups[key]["orders"], groups[key]["first"], offset))
+                for key, score in scores.items()
+            )[1:]
+        else:
+            best = nearest(positions, orders, first, offset)
+        _add_path(items[-best[1]], kind, normalized)
+
+
+def build_items(path: Path, text: str, input_dir: Path = INPUT_DIR) -> List[Dict[str, object]]:
+    """Build the ``zpbuilder.json`` items of one script, as the GUI scan does."""
+
+    masked = mask_comments(text)
+    resolver = _Resolver(masked, included_defines(path, masked, input_dir))
+    calls = scan_calls(text)
+    lines = [0] + [match.end() for match in re.finditer(r"\n", text)]
+    register_calls = [call for call in calls if call.name.lower() in REGISTER_FUNCTIONS]
+    version = detect_version(path, text, register_calls)
+    file_base = path.name[:-4] if path.name.endswith(".sma") else path.name
+    origin = origin_file(path, input_dir)
+
+    def build(item_type: str, name: str, line: Optional[int], **meta) -> dict:
+        return _new_item(item_type, name, file_base, origin, version, line, **meta)
+
+    items: List[dict] = []
+    file_warnings: List[str] = []
+    registry = _Registry()
+    seen: Dict[str, dict] = {}
+    for call in register_calls:
+        normalized, item_type, _, legacy = REGISTER_FUNCTIONS[call.name.lower()]
+        transformations = []
+        if legacy:
+            transformations.append(f"Sintaxis {call.name} migrada a {normalized} (línea {call.line})")
+        elif normalized != call.name:
+            transformations.append(f"Función {call.name} → {normalized} (línea {call.line})")
+
+        prefixes = _prefixes(call.raw_args)
+        value, token, resolved = _entity_name(call.raw_args, resolver, file_base)
+        raw_name = value if _truthy(value) else call.assigned or file_base
+        name = raw_name.strip() if isinstance(raw_name, str) else _format_number(raw_name)
+        stats, resolved_from, override, warnings = _register_stats(call, item_type, normalized, resolver, prefixes)
+        if override and override.strip() and (not resolved or not name):
+            name = override.strip()
+
+        extra = {"registerVar": call.assigned} if call.assigned else {}
+        if token:
+            extra["displayNameToken"] = token
+        item = build(item_type, name, call.line, registerFunction=call.name,
+                     registerFunctionNormalized=normalized, **extra)
+        item["stats"] = stats
+        item["meta"]["warnings"] = warnings
+        item["meta"]["transformations"] = transformations
+        item["meta"]["resolvedFrom"] = resolved_from
+        item["_index"] = call.offset
+        item["_prefixes"] = prefixes
+        for arg in call.raw_args:
+            for string in resolver.strings(arg)[0]:
+                _categorize(item, string)
+        _register(item, call.raw_args, resolver, registry, seen)
+        items.append(item)
+
+    pseudo = _pseudo_human_classes(path, text, calls, lines, resolver, build)
+    for item in pseudo + _menu_array_items(path, text, lines, resolver, build):
+        _register(item, None, resolver, registry, seen)
+        items.append(item)
+
+    for call in calls if items else ():
+        if call.name.lower() not in SUPPLEMENTAL_FUNCTIONS or not call.raw_args:
+            continue
+        item = registry.locate(call.raw_args, SUPPLEMENTAL_FUNCTIONS[call.name.lower()][2], resolver)
+        if item is None:
+            _add_unique(file_warnings, f"No se encontró entidad base para {call.name} en línea {call.line}")
+            continue
+        _apply_supplemental(call, item, resolver, item["meta"]["warnings"])
+
+    _plugin_markers(text, items)
+    abilities = _abilities(text, lines)
+    _assign_resources(items, _precached(calls, resolver))
+
+    for item in items:
+        meta = item["meta"]
+        meta["extraCalls"].extend(dict(entry, args=list(entry["args"])) for entry in abilities)
+        for warning in file_warnings:
+            _add_unique(meta["warnings"], warning)
+        applied = []
+        for field, default in DEFAULTS.get(item["type"], {}).items():
+            current = item["stats"].get(field)
+            if current is None or current != current or (
+                "fallback" in meta["resolvedFrom"].get(field, ()) and (current == 0 or current == "")
+            ):
+                item["stats"][field] = default
+                applied.append(field)
+                _mark(meta, field, "default")
+        if applied:
+            meta["extraCalls"].append({"type": "defaultApplied", "fields": applied})
+        meta["resolvedFrom"] = {field: tags for field, tags in meta["resolvedFrom"].items() if tags}
+        if not meta["resolvedFrom"]:
+            del meta["resolvedFrom"]
+        item["id"] = hashlib.sha1(f"{meta['originFile']}|{item['type']}|{meta['normalizedName']}".encode("utf-8")).hexdigest()
+        item["stats"] = {field: value for field, value in item["stats"].items() if value is not None}
+        item["paths"] = item.pop("_paths")
+        del item["_seen"], item["_index"], item["_prefixes"]
+    return _plain(items)
+
+
+def scan_items(paths: Iterable[Path], input_dir: Path = INPUT_DIR) -> List[Dict[str, object]]:
+    """Items of every script, deduplicated by type and name like the GUI scan."""
+
+    by_key: Dict[str, Dict[str, object]] = {}
+    for path in paths:
+        if SKIPPED_FILES.search(path.name):
+            continue
+        text = path.read_text(encoding="utf-8", errors="replace")
+        for item in build_items(path, text, input_dir):
+            key = f"{item['type']}|{normalize_name(item['meta']['normalizedName'] or item['name'])}"
+            existing = by_key.get(key)
+            if existing is None:
+                by_key[key] = item
+            else:
+                existing["meta"]["conflicts"].append(
+                    {"originFile": item["meta"]["originFile"], "registerLine": item["meta"].get("registerLine")}
+                )
+    return list(by_key.values())
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Extrae llamadas e items de zpbuilder.json desde archivos .sma")
+    parser.add_argument("paths", type=Path, nargs="*", default=[INPUT_DIR], help="Archivos .sma o directorios")
+    parser.add_argument("--calls", nargs="*", default=None, help="Lista las llamadas a estas funciones (todas si se omite el valor)")
+    parser.add_argument("--input-dir", type=Path, default=INPUT_DIR, help="Raíz usada para originFile")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    files: List[Path] = []
+    for path in args.paths:
+        files.extend(sorted(path.rglob("*.sma")) if path.is_dir() else [path])
+
+    if args.calls is not None:
+        from dataclasses import asdict
+
+        report = {
+            str(path): [
+                asdict(call)
+                for call in scan_calls(path.read_text(encoding="utf-8", errors="ignore"), args.calls or None)
+            ]
+            for path in files
+        }
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+    else:
+        json.dump({"items": scan_items(files, args.input_dir)}, sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
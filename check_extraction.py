@@ -0,0 +1,213 @@
+"""Throughput check of the script extractors on pathological inputs.
+
+A stress corpus of adversarial sources (``human class`` markers without a
+colon, identifiers made of repeated ``name``, unterminated comments, blocks
+and initializers, long lines without ``;``...) is generated at two sizes and
+every extraction stage is timed on each file. A stage fails when it
+processes less than ``--min-mb-per-s`` or when quadrupling the input
+multiplies its time by more than ``--max-growth`` (about 4 for a linear
+scan, 16 for a quadratic one).
+
+``parse_sma_file`` is then run on the corpus written to disk: every file has
+to finish within the per-file time budget, and a file over the size budget
+has to come back as a reduced record. The script exits with status 1 on any
+failure, like ``check_startup``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import call_parser
+import dataset_builder
+import fingerprints
+import hook_costs
+
+CORPUS: Dict[str, Callable[[int], str]] = {
+    "human_class_no_colon": lambda size: "human class " * (size // 12),
+    "human_class_far_colon": lambda size: "human class " * (size // 12 - 1) + ": !g Late\n",
+    "name_identifier": lambda size: "new const " + "name" * (size // 4),
+    "long_identifier": lambda size: "new Float:" + "a" * size,
+    "stat_whitespace": lambda size: ("new health" + " \t" * 20 + "\n") * (size // 51),
+    "no_semicolon_line": lambda size: "new g_speed = " + "1 + " * (size // 4),
+    "minified": lambda size: "new a=1,b=2;public f(id){set_task(1.0,\"t\",id);}" * (size // 48),
+    "unterminated_comments": lambda size: "/* " * (size // 3),
+    "unterminated_blocks": lambda size: "public f(id) {\n" * (size // 15),
+    "bodyless_publics": lambda size: "public f(id)\n" * (size // 13) + "{\n" * (size // 2),
+    "unterminated_initializer": lambda size: "new const a[] = {" + "1," * (size // 2),
+    "unterminated_strings": lambda size: ('"models/' + "x" * 60 + "\n") * (size // 69),
+    "deep_parens": lambda size: "f" + "(" * size,
+    "unclosed_register_calls": lambda size: "zp_register_extra_item(" * (size // 23),
+    "unclosed_precaches": lambda size: 'precache_model("models/' * (size // 23),
+    "unterminated_class_handlers": lambda size: (
+        'public class_1(id) {\nchat_color(id, "!g[ZP] Class:!g Name"); set_user_health(id, 100);\n' * (size // 87)
+    ),
+    "repeated_items": lambda size: (
+        'new g_item = zp_register_extra_item("Item", 10, ZP_TEAM_HUMAN); precache_model("models/item.mdl");\n'
+        * (size // 99)
+    ),
+}
+
+STAGES: Dict[str, Callable[[str], object]] = {
+    "extract_stats": dataset_builder.extract_stats,
+    "extract_paths": dataset_builder.extract_paths,
+    "extract_human_classes": dataset_builder.extract_human_classes,
+    "extract_entity_name": lambda text: dataset_builder.extract_entity_name((), text, "stress"),
+    "extract_abilities": dataset_builder.extract_abilities,
+    "scan_calls": call_parser.scan_calls,
+    "collect_constants": call_parser.collect_constants,
+    "build_items": lambda text: call_parser.build_items(Path("zp_hclass.sma"), text),
+    "analyze_text": hook_costs.analyze_text,
+    "minhash_signature": fingerprints.minhash_signature,
+}
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Check extractor throughput on pathological scripts.")
+    parser.add_argument(
+        "--size-kb",
+        type=int,
+        default=32,
+        help="Size of the smaller stress file; the larger one is four times as big.",
+    )
+    parser.add_argument(
+        "--min-mb-per-s",
+        type=float,
+        default=0.25,
+        help="Minimum throughput of every stage on the larger file.",
+    )
+    parser.add_argument(
+        "--max-growth",
+        type=float,
+        default=8.0,
+        help="Maximum time ratio between the larger and the smaller file.",
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=3,
+        help="Number of runs per measurement; the fastest one is reported.",
+    )
+    parser.add_argument(
+        "--corpus-dir",
+        type=Path,
+        help="Keep the stress corpus in this directory instead of a temporary one.",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Optional path where the JSON report is written.",
+    )
+    return parser.parse_args(argv)
+
+
+def best_time(function: Callable[[str], object], text: str, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(max(1, repeats)):
+        start = time.perf_counter()
+        function(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_stage(case: str, stage: str, small: str, large: str, args: argparse.Namespace) -> dict:
+    function = STAGES[stage]
+    try:
+        # Floor the small time so sub-millisecond stages do not turn noise into growth.
+        small_s = max(best_time(function, small, args.repeats), 5e-3)
+        large_s = best_time(function, large, args.repeats)
+    except Exception as exc:  # a crash is a failure of its own, e.g. RecursionError
+        return {"case": case, "stage": stage, "error": f"{type(exc).__name__}: {exc}", "ok": False}
+    mb_per_s = len(large) / 1e6 / max(large_s, 1e-9)
+    growth = large_s / small_s
+    return {
+        "case": case,
+        "stage": stage,
+        "large_ms": round(large_s * 1000.0, 2),
+        "mb_per_s": round(mb_per_s, 2),
+        "growth": round(growth, 2),
+        "ok": mb_per_s >= args.min_mb_per_s and growth <= args.max_growth,
+    }
+
+
+def check_files(corpus_dir: Path, size: int) -> List[dict]:
+    """Run parse_sma_file on the corpus as files, plus one over the size budget."""
+
+    error_logger = logging.getLogger("check_extraction.errors")
+    error_logger.addHandler(logging.NullHandler())
+    error_logger.propagate = False
+    targets = []
+    for case, generate in CORPUS.items():
+        # Named zp_hclass.sma so the human class stage runs on every file.
+        path = corpus_dir / case / "zp_hclass.sma"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(generate(size), encoding="utf-8")
+        targets.append((case, path, False))
+    oversized = corpus_dir / "oversized" / "zp_hclass.sma"
+    oversized.parent.mkdir(parents=True, exist_ok=True)
+    line = 'new g_health = 100;\nregister_plugin("Oversized", "1.0", "stress")\n'
+    oversized.write_text(line * (dataset_builder.MAX_SOURCE_BYTES // len(line) + 1), encoding="utf-8")
+    targets.append(("oversized", oversized, True))
+
+    results = []
+    for case, path, expect_reduced in targets:
+        start = time.perf_counter()
+        record = dataset_builder.parse_sma_file(path, error_logger, corpus_dir)
+        elapsed = time.perf_counter() - start
+        reduced = bool(record is not None and record.reduced)
+        results.append(
+            {
+                "case": case,
+                "parse_ms": round(elapsed * 1000.0, 2),
+                "reduced": reduced,
+                "ok": record is not None
+                and reduced == expect_reduced
+                and elapsed <= dataset_builder.FILE_TIME_BUDGET,
+            }
+        )
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    size = args.size_kb * 1024
+
+    stages = []
+    for case, generate in CORPUS.items():
+        small, large = generate(size), generate(4 * size)
+        stages.extend(check_stage(case, stage, small, large, args) for stage in STAGES)
+
+    if args.corpus_dir:
+        files = check_files(args.corpus_dir, size)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            files = check_files(Path(tmp), size)
+
+    report = {
+        "size_kb": args.size_kb,
+        "min_mb_per_s": args.min_mb_per_s,
+        "max_growth": args.max_growth,
+        "stages": stages,
+        "files": files,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text + "\n", encoding="utf-8")
+
+    failed = [entry for entry in stages + files if not entry["ok"]]
+    for entry in failed:
+        name = f"{entry['case']}/{entry['stage']}" if "stage" in entry else entry["case"]
+        print(f"Extraction regression: {name}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Parity check between ``call_parser.build_items`` and ``zpbuilder.json``.
+
+The bundled pack is scanned the way the GUI does it (``scan_items`` on every
+``.sma`` under ``--input``) and the items are matched by id against the
+stored database. Missing or extra ids and differing fields are failures;
+values the GUI lets the user change (``enabled`` and stats that the scan
+filled from the defaults) are reported as edits instead. The script exits
+with status 1 on any failure, like ``check_startup``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import call_parser
+
+ROOT = Path(__file__).resolve().parent
+DB_PATH = ROOT / "zpbuilder.json"
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare build_items with the items stored in zpbuilder.json.")
+    parser.add_argument(
+        "--input",
+        type=Path,
+        default=call_parser.INPUT_DIR,
+        help="Directory scanned for .sma files.",
+    )
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=DB_PATH,
+        help="zpbuilder.json holding the items saved by the GUI scan.",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Optional path where the JSON report is written.",
+    )
+    return parser.parse_args(argv)
+
+
+def diff_values(built: object, stored: object, path: str = "") -> List[dict]:
+    if isinstance(built, dict) and isinstance(stored, dict):
+        differences = []
+        for key in sorted(set(built) | set(stored)):
+            differences.extend(diff_values(built.get(key), stored.get(key), f"{path}.{key}" if path else key))
+        return differences
+    if built != stored:
+        return [{"field": path, "built": built, "stored": stored}]
+    return []
+
+
+def is_edit(difference: dict, stored: dict) -> bool:
+    """Whether a difference is a value the user changed in the GUI."""
+
+    field = difference["field"]
+    if field == "enabled":
+        return True
+    if not field.startswith("stats."):
+        return False
+    stat = field.split(".", 1)[1]
+    resolved = stored.get("meta", {}).get("resolvedFrom", {}).get(stat, [])
+    default = call_parser.DEFAULTS.get(stored.get("type"), {}).get(stat)
+    return "default" in resolved and difference["built"] == default
+
+
+def compare(built: Dict[str, dict], stored: Dict[str, dict]) -> dict:
+    differing = []
+    edited = []
+    for item_id in sorted(set(built) & set(stored)):
+        item = stored[item_id]
+        for difference in diff_values(built[item_id], item):
+            entry = {"id": item_id, "name": item.get("name"), **difference}
+            (edited if is_edit(difference, item) else differing).append(entry)
+    return {
+        "built": len(built),
+        "stored": len(stored),
+        "missing": [
+            {"id": item_id, "name": stored[item_id].get("name")} for item_id in sorted(set(stored) - set(built))
+        ],
+        "extra": [
+            {"id": item_id, "name": built[item_id]["name"], "originFile": built[item_id]["meta"]["originFile"]}
+            for item_id in sorted(set(built) - set(stored))
+        ],
+        "differing": differing,
+        "edited": edited,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    stored = {item["id"]: item for item in json.loads(args.db.read_text(encoding="utf-8")).get("items", [])}
+    built = {
+        item["id"]: item
+        for item in call_parser.scan_items(sorted(args.input.rglob("*.sma")), args.input)
+    }
+
+    report = compare(built, stored)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text + "\n", encoding="utf-8")
+
+    for entry in report["missing"]:
+        print(f"Item missing from build_items: {entry['name']} ({entry['id']})", file=sys.stderr)
+    for entry in report["extra"]:
+        print(f"Item not in {args.db.name}: {entry['name']} ({entry['originFile']})", file=sys.stderr)
+    for entry in report["differing"]:
+        print(f"Item field differs: {entry['name']} {entry['field']}", file=sys.stderr)
+    failed = report["missing"] or report["extra"] or report["differing"]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
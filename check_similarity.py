@@ -0,0 +1,111 @@
+"""Format check of the similar-plugins index.
+
+The index is built twice, from ``dataset.parquet`` and from ``dataset.csv``,
+and both builds are compared: same rows, same numeric feature layout and
+vectors, same TF-IDF vocabulary, weights and vectors. Parquet list cells
+arrive as NumPy arrays and CSV ones as text, so any difference means a list
+column was tokenized differently. The vocabulary is also scanned for tokens
+that hold a whole serialized list (``paths_models=[]``). The script exits
+with status 1 on any failure, like ``check_startup``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+import similarity_index
+import train_baseline
+
+ROOT = Path(__file__).resolve().parent
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Check that the index built from Parquet matches the CSV one.")
+    parser.add_argument(
+        "--parquet",
+        type=Path,
+        default=ROOT / "dataset.parquet",
+        help="Parquet dataset written by dataset_builder.",
+    )
+    parser.add_argument(
+        "--csv",
+        type=Path,
+        default=ROOT / "dataset.csv",
+        help="CSV dataset written by dataset_builder.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1e-6,
+        help="Maximum absolute difference between the vectors of both builds.",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Optional path where the JSON report is written.",
+    )
+    return parser.parse_args(argv)
+
+
+def max_difference(left: np.ndarray, right: np.ndarray) -> Optional[float]:
+    """Largest absolute difference, or None when the shapes differ."""
+    if left.shape != right.shape:
+        return None
+    return float(np.abs(left - right).max()) if left.size else 0.0
+
+
+def compare(parquet: similarity_index.SimilarityIndex, csv: similarity_index.SimilarityIndex, tolerance: float) -> dict:
+    vocabulary = parquet.meta["vocabulary"]
+    csv_vocabulary = csv.meta["vocabulary"]
+    same_vocabulary = vocabulary == csv_vocabulary
+    numeric = max_difference(parquet.numeric, csv.numeric)
+    tokens = max_difference(parquet.tokens.toarray(), csv.tokens.toarray()) if same_vocabulary else None
+    idf = max_difference(np.asarray(parquet.meta["idf"]), np.asarray(csv.meta["idf"])) if same_vocabulary else None
+    serialized = sorted(token for token in vocabulary if token.split("=", 1)[-1].startswith("["))
+    checks = {
+        "files": parquet.files == csv.files,
+        "feature_columns": parquet.meta["feature_columns"] == csv.meta["feature_columns"],
+        "vocabulary": same_vocabulary,
+        "numeric": numeric is not None and numeric <= tolerance,
+        "idf": idf is not None and idf <= tolerance,
+        "tokens": tokens is not None and tokens <= tolerance,
+        "no_serialized_lists": not serialized,
+    }
+    return {
+        "rows": len(parquet.files),
+        "vocabulary_size": {"parquet": len(vocabulary), "csv": len(csv_vocabulary)},
+        "only_parquet": sorted(set(vocabulary) - set(csv_vocabulary))[:20],
+        "only_csv": sorted(set(csv_vocabulary) - set(vocabulary))[:20],
+        "serialized_tokens": serialized[:20],
+        "max_difference": {"numeric": numeric, "idf": idf, "tokens": tokens},
+        "checks": checks,
+        "ok": all(checks.values()),
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    train_baseline.setup_logging()
+    parquet = similarity_index.SimilarityIndex.build(train_baseline.read_dataset(args.parquet))
+    csv = similarity_index.SimilarityIndex.build(train_baseline.read_dataset(args.csv))
+
+    report = compare(parquet, csv, args.tolerance)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text + "\n", encoding="utf-8")
+
+    for name, passed in report["checks"].items():
+        if not passed:
+            print(f"Index mismatch between Parquet and CSV: {name}", file=sys.stderr)
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""Import-time regression check for the Python entry points.
+
+Each entry point is imported in a fresh interpreter with ``-X importtime`` to
+report its startup cost and to verify that no heavy third-party library is
+loaded at import time. The CLI commands that should fail or exit early
+(``--help``, usage errors) are timed as well. The script exits with status 1
+when a heavy module leaks into an import or a command exceeds its budget.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+ROOT = Path(__file__).resolve().parent
+SCRIPTS_DIR = ROOT / "scripts"
+
+HEAVY_MODULES = (
+    "pandas",
+    "numpy",
+    "sklearn",
+    "joblib",
+    "matplotlib",
+    "seaborn",
+    "PIL",
+    "pyarrow",
+)
+
+IMPORT_CHECKS: Dict[str, Path] = {
+    "train_baseline": ROOT,
+    "dataset_builder": ROOT,
+    "streaming_trainer": ROOT,
+    "similarity_index": ROOT,
+    "code_search": ROOT,
+    "forest_export": ROOT,
+    "query_service": ROOT,
+    "dataset_diff": ROOT,
+    "result_cache": ROOT,
+    "spr2png": SCRIPTS_DIR,
+    "mdl2png": SCRIPTS_DIR,
+    "wav2waveform": SCRIPTS_DIR,
+    "asset_catalog": SCRIPTS_DIR,
+    "fastdl_optimizer": SCRIPTS_DIR,
+    "preview_atlas": SCRIPTS_DIR,
+}
+
+COMMAND_CHECKS: Dict[str, List[str]] = {
+    "train_baseline --help": [str(ROOT / "train_baseline.py"), "--help"],
+    "dataset_builder --help": [str(ROOT / "dataset_builder.py"), "--help"],
+    "streaming_trainer --help": [str(ROOT / "streaming_trainer.py"), "--help"],
+    "similarity_index --help": [str(ROOT / "similarity_index.py"), "--help"],
+    "code_search --help": [str(ROOT / "code_search.py"), "--help"],
+    "forest_export --help": [str(ROOT / "forest_export.py"), "--help"],
+    "query_service --help": [str(ROOT / "query_service.py"), "--help"],
+    "dataset_diff --help": [str(ROOT / "dataset_diff.py"), "--help"],
+    "spr2png (usage)": [str(SCRIPTS_DIR / "spr2png.py")],
+    "mdl2png (usage)": [str(SCRIPTS_DIR / "mdl2png.py")],
+    "wav2waveform (usage)": [str(SCRIPTS_DIR / "wav2waveform.py")],
+    "asset_catalog (usage)": [str(SCRIPTS_DIR / "asset_catalog.py")],
+    "fastdl_optimizer (usage)": [str(SCRIPTS_DIR / "fastdl_optimizer.py")],
+    "preview_atlas (usage)": [str(SCRIPTS_DIR / "preview_atlas.py")],
+}
+
+IMPORT_PROBE = """
+import json, sys
+sys.path.insert(0, {path!r})
+import {module}
+print(json.dumps(sorted(name for name in {heavy!r} if name in sys.modules)))
+"""
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Check startup time of the Python entry points.")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=150.0,
+        help="Maximum startup time per command on top of a bare interpreter.",
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=5,
+        help="Number of runs per command; the fastest one is reported.",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Optional path where the JSON report is written.",
+    )
+    return parser.parse_args(argv)
+
+
+def parse_importtime(stderr: str, module: str) -> Optional[float]:
+    """Return the cumulative import time in ms reported for ``module``."""
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = [part.strip() for part in line[len("import time:"):].split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            try:
+                return int(parts[1]) / 1000.0
+            except ValueError:
+                return None
+    return None
+
+
+def check_import(module: str, path: Path) -> dict:
+    probe = IMPORT_PROBE.format(path=str(path), module=module, heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    heavy_loaded: List[str] = []
+    if result.returncode == 0 and result.stdout.strip():
+        heavy_loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    return {
+        "module": module,
+        "import_ms": parse_importtime(result.stderr, module),
+        "heavy_modules": heavy_loaded,
+        "ok": result.returncode == 0 and not heavy_loaded,
+        "error": result.stderr.strip().splitlines()[-1] if result.returncode else None,
+    }
+
+
+def best_wall_time(command: Sequence[str], repeats: int) -> float:
+    best = float("inf")
+    for _ in range(max(1, repeats)):
+        start = time.perf_counter()
+        subprocess.run(command, capture_output=True, check=False)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+
+    baseline_ms = best_wall_time([sys.executable, "-c", "pass"], args.repeats)
+    imports = [check_import(module, path) for module, path in IMPORT_CHECKS.items()]
+    commands = []
+    for label, command in COMMAND_CHECKS.items():
+        total_ms = best_wall_time([sys.executable, *command], args.repeats)
+        net_ms = total_ms - baseline_ms
+        commands.append(
+            {
+                "command": label,
+                "total_ms": round(total_ms, 1),
+                "net_ms": round(net_ms, 1),
+                "ok": net_ms <= args.budget_ms,
+            }
+        )
+
+    report = {
+        "python": sys.version.split()[0],
+        "interpreter_ms": round(baseline_ms, 1),
+        "budget_ms": args.budget_ms,
+        "imports": imports,
+        "commands": commands,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text + "\n", encoding="utf-8")
+
+    failed = [entry for entry in imports + commands if not entry["ok"]]
+    for entry in failed:
+        name = entry.get("module") or entry.get("command")
+        print(f"Startup regression: {name}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
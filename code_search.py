@@ -0,0 +1,316 @@
+"""Trigram index for fast literal and regex searches over pack sources.
+
+Every ``.sma`` and ``.inc`` below ``input/`` is reduced to the set of byte
+trigrams of its lower-cased text. The index keeps one posting list (sorted
+document ids) per trigram, stored as three flat NumPy arrays in
+``code_index/postings.npz``; ``code_index/files.json`` lists the documents
+with the size and mtime they were indexed at.
+
+A query is narrowed to the documents that contain every trigram the pattern
+requires (for regexes, the literal runs every match must contain) and only
+those files are read and matched, so a search costs a few posting-list
+intersections plus the candidate files. Updates are incremental: files whose
+size or mtime changed are re-tokenized and their postings replaced, and
+queries refresh the index first unless told not to.
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import re
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    import numpy as np
+
+ROOT = Path(__file__).resolve().parent
+INPUT_DIR = ROOT / "input"
+INDEX_DIR = ROOT / "code_index"
+SOURCE_SUFFIXES = (".sma", ".inc")
+MAX_LINE_LENGTH = 240
+
+
+@dataclass
+class Match:
+    file: str
+    line: int
+    column: int
+    text: str
+
+
+def trigram_keys(data: bytes) -> "np.ndarray":
+    """Unique case-folded byte trigrams of ``data`` encoded as uint32."""
+    import numpy as np
+
+    if len(data) < 3:
+        return np.zeros(0, dtype=np.uint32)
+    raw = np.frombuffer(data, dtype=np.uint8)
+    lowered = np.where((raw >= 65) & (raw <= 90), raw + 32, raw).astype(np.uint32)
+    keys = (lowered[:-2] << 16) | (lowered[1:-1] << 8) | lowered[2:]
+    return np.unique(keys)
+
+
+def required_literals(pattern: str, flags: int = 0) -> List[str]:
+    """Literal runs that every match of ``pattern`` must contain.
+
+    Only the top-level sequence (and single-branch groups in it) is walked;
+    anything optional or repeated ends a run. An empty list means the
+    pattern cannot be narrowed and every document is a candidate.
+    """
+    try:
+        import re._parser as sre_parse  # Python 3.11+
+    except ImportError:  # pragma: no cover - older interpreters
+        import sre_parse  # type: ignore[no-redef]
+
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except re.error:
+        return []
+    constants = sre_parse
+    runs: List[str] = []
+    current: List[str] = []
+
+    def flush() -> None:
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    def walk(items) -> None:
+        for op, value in items:
+            if op is constants.LITERAL:
+                current.append(chr(value))
+            elif op is constants.SUBPATTERN:
+                walk(value[-1])
+            elif op in (constants.MAX_REPEAT, constants.MIN_REPEAT) and value[0] >= 1:
+                # The body appears at least once, but what follows it is not adjacent.
+                flush()
+                walk(value[2])
+                flush()
+            elif op is constants.AT:
+                continue
+            else:
+                flush()
+
+    walk(parsed)
+    flush()
+    return [run for run in runs if len(run) >= 3]
+
+
+class CodeIndex:
+    """Posting lists of trigram -> document ids, plus the document table."""
+
+    def __init__(self, root: Path, files: List[Dict[str, object]], keys, offsets, docs) -> None:
+        self.root = root
+        self.files = files
+        self.keys = keys
+        self.offsets = offsets
+        self.docs = docs
+
+    @classmethod
+    def empty(cls, root: Path) -> "CodeIndex":
+        import numpy as np
+
+        return cls(root, [], np.zeros(0, np.uint32), np.zeros(1, np.int64), np.zeros(0, np.uint32))
+
+    @classmethod
+    def load(cls, index_dir: Path = INDEX_DIR, root: Path = ROOT) -> "CodeIndex":
+        import numpy as np
+
+        files_path = index_dir / "files.json"
+        postings_path = index_dir / "postings.npz"
+        if not files_path.exists() or not postings_path.exists():
+            return cls.empty(root)
+        meta = json.loads(files_path.read_text(encoding="utf-8"))
+        with np.load(postings_path) as arrays:
+            return cls(root, meta["files"], arrays["keys"], arrays["offsets"], arrays["docs"])
+
+    def save(self, index_dir: Path = INDEX_DIR) -> None:
+        import numpy as np
+
+        from dataset_builder import safe_write, safe_write_json
+
+        def _write(tmp: Path) -> None:
+            with tmp.open("wb") as handle:
+                np.savez(handle, keys=self.keys, offsets=self.offsets, docs=self.docs)
+
+        safe_write(index_dir / "postings.npz", _write)
+        safe_write_json(index_dir / "files.json", {"files": self.files})
+
+    def update(self, input_dir: Path = INPUT_DIR) -> Dict[str, int]:
+        """Re-index new and changed sources and drop removed ones."""
+        import numpy as np
+
+        current: Dict[str, Path] = {}
+        for suffix in SOURCE_SUFFIXES:
+            for path in input_dir.rglob(f"*{suffix}"):
+                current[path.relative_to(self.root).as_posix()] = path
+
+        keep_ids: List[int] = []
+        kept_files: List[Dict[str, object]] = []
+        changed: List[str] = []
+        for doc_id, entry in enumerate(self.files):
+            path = current.get(str(entry["path"]))
+            if path is None:
+                continue
+            stat = path.stat()
+            if stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]:
+                keep_ids.append(doc_id)
+                kept_files.append(entry)
+            else:
+                changed.append(str(entry["path"]))
+        known = {str(entry["path"]) for entry in self.files}
+        added = sorted(name for name in current if name not in known)
+        removed = len(self.files) - len(kept_files) - len(changed)
+        if not changed and not added and not removed:
+            return {"documents": len(self.files), "reindexed": 0, "removed": 0}
+
+        # Surviving postings, renumbered to the compacted document ids.
+        remap = np.full(len(self.files) + 1, -1, dtype=np.int64)
+        remap[np.asarray(keep_ids, dtype=np.int64)] = np.arange(len(keep_ids))
+        counts = np.diff(self.offsets)
+        pair_keys = np.repeat(self.keys, counts)
+        pair_docs = remap[self.docs.astype(np.int64)] if len(self.docs) else np.zeros(0, np.int64)
+        alive = pair_docs >= 0
+        key_parts = [pair_keys[alive]]
+        doc_parts = [pair_docs[alive]]
+
+        files = kept_files
+        for name in sorted(changed) + added:
+            path = current[name]
+            stat = path.stat()
+            keys = trigram_keys(path.read_bytes())
+            key_parts.append(keys)
+            doc_parts.append(np.full(len(keys), len(files), dtype=np.int64))
+            files.append({"path": name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+
+        all_keys = np.concatenate(key_parts).astype(np.uint32)
+        all_docs = np.concatenate(doc_parts)
+        order = np.lexsort((all_docs, all_keys))
+        all_keys = all_keys[order]
+        self.docs = all_docs[order].astype(np.uint32)
+        self.keys, starts = np.unique(all_keys, return_index=True)
+        self.offsets = np.append(starts, len(all_keys)).astype(np.int64)
+        self.files = files
+        return {"documents": len(files), "reindexed": len(changed) + len(added), "removed": removed}
+
+    def postings(self, key: int) -> "np.ndarray":
+        import numpy as np
+
+        position = int(np.searchsorted(self.keys, key))
+        if position >= len(self.keys) or self.keys[position] != key:
+            return np.zeros(0, dtype=np.uint32)
+        return self.docs[self.offsets[position]:self.offsets[position + 1]]
+
+    def candidates(self, literals: Iterable[str]) -> List[int]:
+        """Document ids containing every trigram of every literal."""
+        import numpy as np
+
+        keys = set()
+        for literal in literals:
+            keys.update(int(key) for key in trigram_keys(literal.encode("utf-8")))
+        if not keys:
+            return list(range(len(self.files)))
+        lists = sorted((self.postings(key) for key in keys), key=len)
+        result = lists[0]
+        for posting in lists[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, posting, assume_unique=True)
+        return [int(doc) for doc in result]
+
+    def search(
+        self,
+        pattern: str,
+        *,
+        regex: bool = False,
+        ignore_case: bool = False,
+        limit: Optional[int] = None,
+    ) -> List[Match]:
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        compiled = re.compile(pattern if regex else re.escape(pattern), flags)
+        literals = required_literals(pattern, flags) if regex else [pattern]
+        matches: List[Match] = []
+        for doc_id in self.candidates(literals):
+            name = str(self.files[doc_id]["path"])
+            try:
+                text = (self.root / name).read_text(encoding="utf-8", errors="ignore")
+            except OSError:
+                continue
+            line_starts: Optional[List[int]] = None
+            for found in compiled.finditer(text):
+                if line_starts is None:
+                    line_starts = [0] + [m.end() for m in re.finditer("\n", text)]
+                line = bisect.bisect_right(line_starts, found.start())
+                start = line_starts[line - 1]
+                end = text.find("\n", start)
+                content = text[start:end if end >= 0 else len(text)].strip()
+                matches.append(Match(name, line, found.start() - start + 1, content[:MAX_LINE_LENGTH]))
+                if limit is not None and len(matches) >= limit:
+                    return matches
+        return matches
+
+
+def build_index(input_dir: Path = INPUT_DIR, index_dir: Path = INDEX_DIR) -> Dict[str, int]:
+    """Update (or create) the persisted index for ``input_dir``."""
+    index = CodeIndex.load(index_dir, input_dir.resolve().parent)
+    summary = index.update(input_dir.resolve())
+    if summary["reindexed"] or summary["removed"] or not (index_dir / "files.json").exists():
+        index.save(index_dir)
+    summary["trigrams"] = int(len(index.keys))
+    return summary
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Índice de trigramas para buscar en los .sma/.inc del pack")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Crea o actualiza el índice")
+    build.add_argument("--input-dir", type=Path, default=INPUT_DIR, help="Directorio con los packs")
+    build.add_argument("--index-dir", type=Path, default=INDEX_DIR, help="Directorio del índice")
+
+    query = subparsers.add_parser("query", help="Busca un literal o una expresión regular")
+    query.add_argument("pattern", help="Texto (o regex con --regex) a buscar")
+    query.add_argument("--regex", "-E", action="store_true", help="Interpreta el patrón como expresión regular")
+    query.add_argument("--ignore-case", "-i", action="store_true", help="No distingue mayúsculas")
+    query.add_argument("--limit", type=int, default=None, help="Máximo de coincidencias")
+    query.add_argument("--no-refresh", action="store_true", help="No actualiza el índice antes de buscar")
+    query.add_argument("--json", action="store_true", help="Salida JSON")
+    query.add_argument("--input-dir", type=Path, default=INPUT_DIR, help="Directorio con los packs")
+    query.add_argument("--index-dir", type=Path, default=INDEX_DIR, help="Directorio del índice")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.command == "build":
+        print(json.dumps(build_index(args.input_dir, args.index_dir)))
+        return 0
+
+    input_dir = args.input_dir.resolve()
+    index = CodeIndex.load(args.index_dir, input_dir.parent)
+    if not args.no_refresh and index.update(input_dir)["reindexed"]:
+        index.save(args.index_dir)
+    started = time.perf_counter()
+    matches = index.search(args.pattern, regex=args.regex, ignore_case=args.ignore_case, limit=args.limit)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if args.json:
+        json.dump(
+            {"pattern": args.pattern, "query_ms": round(elapsed_ms, 2), "matches": [asdict(m) for m in matches]},
+            sys.stdout,
+            indent=2,
+            ensure_ascii=False,
+        )
+        sys.stdout.write("\n")
+    else:
+        for match in matches:
+            print(f"{match.file}:{match.line}: {match.text}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,366 @@
+"""Parallel, cached ``amxxpc`` builds for generated and packaged plugins.
+
+Each ``.sma`` is compiled in its own ``amxxpc`` process, with at most
+``--jobs`` compilers running at once. Outputs are cached by content: the key
+hashes the source, every file in its transitive ``#include`` closure, the
+include search path and the compiler binary, so a plugin is only recompiled
+when something it depends on changes. Compiler output is parsed into
+structured diagnostics and the whole build is reported as JSON.
+
+The compiler and include directories default to ``amxxpcPath`` and
+``includeDirs`` from ``zpbuilder.config.json``; ``--compiler`` overrides the
+binary (for example with a stub script when testing).
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+ROOT = Path(__file__).resolve().parent
+CONFIG_PATH = ROOT / "zpbuilder.config.json"
+BUILD_DIR = ROOT / "build"
+CACHE_DIR = BUILD_DIR / ".amxx_cache"
+CACHE_VERSION = "1"
+COMPILE_TIMEOUT = 120
+
+_INCLUDE_PATTERN = re.compile(r'^[ \t]*#(?:try)?include\s*(?:<([^>\n]+)>|"([^"\n]+)")', re.MULTILINE)
+_DIAGNOSTIC_PATTERN = re.compile(
+    r"^(?P<file>.+?)\((?P<line>\d+)(?:\s*--\s*(?P<end_line>\d+))?\)\s*:\s*"
+    r"(?P<severity>fatal error|error|warning)\s+(?P<code>\d+)\s*:\s*(?P<message>.*)$",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class CompileResult:
+    """Outcome of one plugin build."""
+
+    source: str
+    output: Optional[str]
+    status: str  # compiled | cached | failed
+    key: str
+    seconds: float
+    includes: List[str] = field(default_factory=list)
+    diagnostics: List[Dict[str, object]] = field(default_factory=list)
+
+
+def load_config(path: Path = CONFIG_PATH) -> Dict[str, object]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+class FileHasher:
+    """SHA-256 of files, memoized on ``(path, mtime, size)``."""
+
+    def __init__(self) -> None:
+        self._cache: Dict[Tuple[str, int, int], str] = {}
+
+    def digest(self, path: Path) -> str:
+        stat = path.stat()
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+        cached = self._cache.get(key)
+        if cached is None:
+            hasher = hashlib.sha256()
+            with path.open("rb") as handle:
+                for chunk in iter(lambda: handle.read(1 << 20), b""):
+                    hasher.update(chunk)
+            cached = self._cache[key] = hasher.hexdigest()
+        return cached
+
+
+class IncludeResolver:
+    """Resolve ``#include`` directives the way ``amxxpc`` does.
+
+    ``<name>`` is looked up in the include directories; ``"name"`` is tried
+    next to the including file first. A missing extension defaults to
+    ``.inc``. Direct includes are memoized per file so shared headers are
+    parsed once per build.
+    """
+
+    def __init__(self, include_dirs: Sequence[Path]) -> None:
+        self.include_dirs = [Path(directory) for directory in include_dirs]
+        self._direct: Dict[Path, Tuple[List[Path], List[str]]] = {}
+
+    def _lookup(self, name: str, directories: Iterable[Path]) -> Optional[Path]:
+        candidates = [name] if Path(name).suffix else [f"{name}.inc", name]
+        for directory in directories:
+            for candidate in candidates:
+                path = directory / candidate
+                if path.is_file():
+                    return path.resolve()
+        return None
+
+    def direct_includes(self, path: Path) -> Tuple[List[Path], List[str]]:
+        if path not in self._direct:
+            text = path.read_text(encoding="utf-8", errors="ignore")
+            found: List[Path] = []
+            missing: List[str] = []
+            for match in _INCLUDE_PATTERN.finditer(text):
+                system_name, local_name = match.groups()
+                name = (system_name or local_name).strip()
+                directories = self.include_dirs if system_name else [path.parent, *self.include_dirs]
+                resolved = self._lookup(name, directories)
+                if resolved is None:
+                    missing.append(name)
+                else:
+                    found.append(resolved)
+            self._direct[path] = (found, missing)
+        return self._direct[path]
+
+    def closure(self, source: Path) -> Tuple[List[Path], List[str]]:
+        """Return every file ``source`` includes, directly or not, and the misses."""
+
+        seen: Dict[Path, None] = {}
+        missing: Dict[str, None] = {}
+        stack = [source.resolve()]
+        while stack:
+            current = stack.pop()
+            includes, unresolved = self.direct_includes(current)
+            for name in unresolved:
+                missing.setdefault(name)
+            for include in includes:
+                if include not in seen and include != source.resolve():
+                    seen[include] = None
+                    stack.append(include)
+        return sorted(seen), sorted(missing)
+
+
+def parse_diagnostics(output: str) -> List[Dict[str, object]]:
+    """Turn ``amxxpc`` output into a list of structured diagnostics."""
+
+    diagnostics: List[Dict[str, object]] = []
+    for line in output.splitlines():
+        match = _DIAGNOSTIC_PATTERN.match(line.strip())
+        if not match:
+            continue
+        diagnostics.append(
+            {
+                "file": match.group("file"),
+                "line": int(match.group("line")),
+                "end_line": int(match.group("end_line")) if match.group("end_line") else None,
+                "severity": match.group("severity").lower(),
+                "code": int(match.group("code")),
+                "message": match.group("message").strip(),
+            }
+        )
+    return diagnostics
+
+
+class CompileFarm:
+    """Cached ``amxxpc`` builds run on a bounded pool of compiler processes."""
+
+    def __init__(
+        self,
+        compiler: Sequence[str],
+        include_dirs: Sequence[Path],
+        cache_dir: Path = CACHE_DIR,
+        *,
+        jobs: Optional[int] = None,
+    ) -> None:
+        self.compiler = list(compiler)
+        self.include_dirs = [Path(directory) for directory in include_dirs if Path(directory).is_dir()]
+        self.cache_dir = cache_dir
+        self.jobs = jobs or os.cpu_count() or 1
+        self.hasher = FileHasher()
+        self.resolver = IncludeResolver(self.include_dirs)
+        self._compiler_digest = self._digest_compiler()
+
+    def _digest_compiler(self) -> str:
+        # A script stub runs through an interpreter; hash the script as well.
+        digests = []
+        for part in self.compiler:
+            path = Path(part)
+            digests.append(self.hasher.digest(path) if path.is_file() else part)
+        return hashlib.sha256("\0".join(digests).encode("utf-8")).hexdigest()
+
+    def cache_key(self, source: Path) -> Tuple[str, List[Path], List[str]]:
+        includes, missing = self.resolver.closure(source)
+        hasher = hashlib.sha256()
+        hasher.update(f"v{CACHE_VERSION}\0{self._compiler_digest}\0".encode("utf-8"))
+        for directory in self.include_dirs:
+            hasher.update(f"I{directory}\0".encode("utf-8"))
+        hasher.update(self.hasher.digest(source).encode("ascii"))
+        for include in includes:
+            hasher.update(f"{include.name}\0{self.hasher.digest(include)}\0".encode("utf-8"))
+        for name in missing:
+            hasher.update(f"?{name}\0".encode("utf-8"))
+        return hasher.hexdigest(), includes, missing
+
+    def _command(self, source: Path, output: Path) -> List[str]:
+        return [
+            *self.compiler,
+            str(source),
+            f"-o{output}",
+            *(f"-i{directory}" for directory in self.include_dirs),
+        ]
+
+    def compile_one(self, source: Path, output_dir: Path, *, force: bool = False) -> CompileResult:
+        start = time.perf_counter()
+        key, includes, _ = self.cache_key(source)
+        output = output_dir / f"{source.stem}.amxx"
+        cached_plugin = self.cache_dir / f"{key}.amxx"
+        cached_report = self.cache_dir / f"{key}.json"
+        result = CompileResult(
+            source=str(source),
+            output=None,
+            status="failed",
+            key=key,
+            seconds=0.0,
+            includes=[str(path) for path in includes],
+        )
+
+        if not force and cached_plugin.is_file():
+            install(cached_plugin, output)
+            result.output = str(output)
+            result.status = "cached"
+            if cached_report.is_file():
+                result.diagnostics = json.loads(cached_report.read_text(encoding="utf-8"))
+            result.seconds = time.perf_counter() - start
+            return result
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        staging = self.cache_dir / f"{key}.{os.getpid()}.{id(result)}.tmp"
+        try:
+            completed = subprocess.run(
+                self._command(source, staging),
+                capture_output=True,
+                text=True,
+                errors="replace",
+                timeout=COMPILE_TIMEOUT,
+                check=False,
+            )
+            output_text = completed.stdout + completed.stderr
+            result.diagnostics = parse_diagnostics(output_text)
+            has_errors = any(entry["severity"] != "warning" for entry in result.diagnostics)
+            if completed.returncode == 0 and staging.is_file() and not has_errors:
+                cached_report.write_text(json.dumps(result.diagnostics), encoding="utf-8")
+                staging.replace(cached_plugin)
+                install(cached_plugin, output)
+                result.output = str(output)
+                result.status = "compiled"
+            elif not result.diagnostics:
+                result.diagnostics.append(_tool_failure(source, output_text or f"exit code {completed.returncode}"))
+        except (OSError, subprocess.TimeoutExpired) as exc:
+            result.diagnostics.append(_tool_failure(source, str(exc)))
+        finally:
+            staging.unlink(missing_ok=True)
+        result.seconds = time.perf_counter() - start
+        return result
+
+    def build(self, sources: Sequence[Path], output_dir: Path, *, force: bool = False) -> List[CompileResult]:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        # Each worker only waits on its compiler subprocess, so threads bound
+        # the number of concurrent amxxpc processes without pickling overhead.
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            return list(executor.map(lambda source: self.compile_one(source, output_dir, force=force), sources))
+
+
+def _tool_failure(source: Path, message: str) -> Dict[str, object]:
+    return {
+        "file": str(source),
+        "line": None,
+        "end_line": None,
+        "severity": "fatal error",
+        "code": None,
+        "message": message.strip().splitlines()[-1] if message.strip() else message,
+    }
+
+
+def install(cached: Path, output: Path) -> None:
+    """Copy a cached plugin into place atomically."""
+
+    tmp_path = output.with_suffix(output.suffix + ".tmp")
+    shutil.copyfile(cached, tmp_path)
+    tmp_path.replace(output)
+
+
+def collect_sources(paths: Iterable[Path]) -> List[Path]:
+    sources: List[Path] = []
+    for path in paths:
+        if path.is_dir():
+            sources.extend(sorted(candidate for candidate in path.rglob("*.sma") if candidate.is_file()))
+        elif path.suffix.lower() == ".sma" and path.is_file():
+            sources.append(path)
+    return sources
+
+
+def compiler_command(path: str) -> List[str]:
+    """Build the command for ``path``; Python stubs run with this interpreter."""
+
+    return [sys.executable, path] if path.endswith(".py") else [path]
+
+
+def summarize(results: Sequence[CompileResult]) -> Dict[str, object]:
+    counts = {"compiled": 0, "cached": 0, "failed": 0}
+    for result in results:
+        counts[result.status] += 1
+    return {
+        **counts,
+        "total": len(results),
+        "errors": sum(
+            1 for result in results for entry in result.diagnostics if entry["severity"] != "warning"
+        ),
+        "warnings": sum(
+            1 for result in results for entry in result.diagnostics if entry["severity"] == "warning"
+        ),
+    }
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compila plugins .sma en paralelo con caché de .amxx")
+    parser.add_argument("sources", type=Path, nargs="+", help="Archivos .sma o directorios a compilar")
+    parser.add_argument("-o", "--output-dir", type=Path, default=BUILD_DIR / "plugins", help="Directorio de salida")
+    parser.add_argument("--config", type=Path, default=CONFIG_PATH, help="Ruta de zpbuilder.config.json")
+    parser.add_argument("--compiler", type=str, default=None, help="Compilador a usar en lugar de amxxpcPath")
+    parser.add_argument(
+        "--include-dir",
+        type=Path,
+        action="append",
+        default=None,
+        help="Directorio de includes (reemplaza includeDirs; se puede repetir)",
+    )
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR, help="Directorio de la caché de compilación")
+    parser.add_argument("--jobs", type=int, default=None, help="Compilaciones simultáneas (por defecto, núcleos)")
+    parser.add_argument("--force", action="store_true", help="Ignora la caché y recompila todo")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    config = load_config(args.config)
+    compiler = args.compiler or str(config.get("amxxpcPath") or "")
+    if not compiler or not Path(compiler).is_file():
+        print(f"Compilador no encontrado: {compiler or '(amxxpcPath vacío)'}", file=sys.stderr)
+        return 2
+    include_dirs = args.include_dir if args.include_dir is not None else [
+        Path(directory) for directory in config.get("includeDirs") or []
+    ]
+
+    farm = CompileFarm(compiler_command(compiler), include_dirs, args.cache_dir, jobs=args.jobs)
+    results = farm.build(collect_sources(args.sources), args.output_dir, force=args.force)
+    report = {
+        "compiler": compiler,
+        "jobs": farm.jobs,
+        "summary": summarize(results),
+        "results": [asdict(result) for result in results],
+    }
+    json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write("\n")
+    return 1 if report["summary"]["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,8 @@
 """Dataset builder for Zombie Plague script files.
 
 This module scans the ``input/`` directory looking for ``.sma`` files and
-extracts metadata that can be used for machine learning datasets.
+extracts metadata that can be used for machine learning datasets. pandas is
+only imported once a dataset is actually built, so ``--help`` stays fast.
 """
 from __future__ import annotations
 
@@ -10,15 +11,31 @@ import json
 import logging
 import re
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Sequence
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence
 
-import pandas as pd
+import amxx_reader
+import call_parser
+import code_search
+import dataset_diff
+import fingerprints
+import hook_costs
+import record_store
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    import pandas as pd
 
 ROOT = Path(__file__).resolve().parent
 INPUT_DIR = ROOT / "input"
 LOG_DIR = ROOT / "logs"
 ERROR_LOG_PATH = LOG_DIR / "dataset_errors.log"
+SHARD_DIR = ROOT / "shards"
+PARTITIONED_DIR = ROOT / "dataset_partitioned"
+# Per-file extraction budget; past either limit only the cheap columns are filled.
+MAX_SOURCE_BYTES = 1024 * 1024
+FILE_TIME_BUDGET = 2.0
 
 STAT_KEYWORDS = {
     "stat_health": ("health",),
@@ -83,6 +100,125 @@ ROOT_PREFIXES: Sequence[str] = (
 )
 
 
+PATH_COLUMNS = ("paths_models", "paths_claws", "paths_sounds", "paths_sprites")
+
+
+class ScriptRecord:
+    """Parsed metadata of one script, one slot per dataset column.
+
+    List columns are kept as tuples and the counters are derived from them,
+    so a record is normalized once when built. Paths and ability names repeat
+    across a pack and are interned. :meth:`columns` turns a batch into
+    column lists for ``pandas.DataFrame`` or ``pyarrow.table``.
+    """
+
+    __slots__ = (
+        "file",
+        "entity_type",
+        "entity_name",
+        "register_calls",
+        "items",
+        "abilities",
+        "human_pseudo_classes",
+        "line_count",
+        *STAT_KEYWORDS,
+        *PATH_COLUMNS,
+        *hook_costs.COST_COLUMNS,
+        "fingerprint",
+        "reduced",
+    )
+
+    def __init__(
+        self,
+        file: str,
+        entity_type: str,
+        entity_name: str,
+        *,
+        register_calls: Iterable[str] = (),
+        items: Iterable[str] = (),
+        abilities: Iterable[str] = (),
+        human_pseudo_classes: Iterable[str] = (),
+        line_count: int = 0,
+        stats: Optional[Dict[str, Optional[float]]] = None,
+        paths: Optional[Dict[str, Iterable[str]]] = None,
+        costs: Optional[Dict[str, float]] = None,
+        fingerprint: object = None,
+        reduced: bool = False,
+    ) -> None:
+        intern = sys.intern
+        self.file = file
+        self.entity_type = intern(entity_type)
+        self.entity_name = entity_name
+        self.register_calls = tuple(register_calls)
+        self.items = tuple(items)
+        self.abilities = tuple(intern(ability) for ability in abilities)
+        self.human_pseudo_classes = tuple(human_pseudo_classes)
+        self.line_count = line_count
+        stats = stats or {}
+        for column in STAT_KEYWORDS:
+            setattr(self, column, stats.get(column))
+        paths = paths or {}
+        for column in PATH_COLUMNS:
+            setattr(self, column, tuple(intern(value) for value in paths.get(column, ())))
+        # Missing costs count as no hooks, so the counters stay integer columns.
+        costs = {**hook_costs.cost_columns(()), **(costs or {})}
+        for column in hook_costs.COST_COLUMNS:
+            setattr(self, column, costs[column])
+        self.fingerprint = fingerprint
+        self.reduced = reduced
+
+    @property
+    def ability_count(self) -> int:
+        return len(self.abilities)
+
+    @property
+    def register_count(self) -> int:
+        return len(self.register_calls)
+
+    @property
+    def resource_count(self) -> int:
+        return sum(len(getattr(self, column)) for column in PATH_COLUMNS)
+
+    def as_dict(self) -> Dict[str, object]:
+        """Exported columns of this record (the fingerprint is left out)."""
+
+        values = {column: getattr(self, column) for column in RECORD_COLUMNS}
+        return {
+            column: list(value) if isinstance(value, tuple) else value
+            for column, value in values.items()
+        }
+
+    @staticmethod
+    def columns(records: Sequence["ScriptRecord"]) -> Dict[str, list]:
+        """Column-oriented view of ``records`` in dataset column order."""
+
+        columns: Dict[str, list] = {}
+        for column in RECORD_COLUMNS:
+            values = [getattr(record, column) for record in records]
+            if column in LIST_COLUMNS:
+                values = [list(value) for value in values]
+            columns[column] = values
+        return columns
+
+
+RECORD_COLUMNS = (
+    "file",
+    "entity_type",
+    "entity_name",
+    "register_calls",
+    "items",
+    "abilities",
+    "human_pseudo_classes",
+    "line_count",
+    "ability_count",
+    "resource_count",
+    "register_count",
+    *STAT_KEYWORDS,
+    *PATH_COLUMNS,
+    *hook_costs.COST_COLUMNS,
+)
+
+
 def setup_logging() -> tuple[logging.Logger, logging.Logger]:
     """Configure console and error loggers."""
 
@@ -177,14 +313,18 @@ def parse_numeric_value(raw: str) -> Optional[float]:
         return None
 
 
+# Every repeat is followed by a character it cannot consume, so a failed
+# attempt never backtracks into an earlier repeat and the scan stays linear.
+_STAT_PATTERN = re.compile(
+    r"(?i)(?:const|new|static)\s+(?:Float:)?([A-Za-z0-9_]+)\s*=\s*([^;\n]+)"
+)
+
+
 def extract_stats(text: str) -> Dict[str, Optional[float]]:
     """Extract stats like health and speed from the file text."""
 
     stats: Dict[str, Optional[float]] = {key: None for key in STAT_KEYWORDS}
-    pattern = re.compile(
-        r"(?i)(?:const|new|static)\s+(?:Float:)?([A-Za-z0-9_]+)\s*=\s*([^;\n]+)"
-    )
-    for match in pattern.finditer(text):
+    for match in _STAT_PATTERN.finditer(text):
         variable = match.group(1).lower()
         raw_value = match.group(2)
         number = parse_numeric_value(raw_value)
@@ -239,36 +379,36 @@ def extract_paths(text: str) -> Dict[str, List[str]]:
     }
 
 
-def extract_register_calls(lines: Iterable[str]) -> List[str]:
-    register_lines: List[str] = []
-    for line in lines:
-        stripped = line.strip()
-        if not stripped or stripped.startswith("//") or stripped.startswith("#"):
-            continue
-        if ("zp_class_" in stripped or "zp_register_" in stripped) and "(" in stripped:
-            register_lines.append(stripped)
-    return deduplicate_ordered(register_lines)
+REGISTER_PREFIXES = ("zp_class_", "zp_register_")
+ITEM_FUNCTIONS = ("zp_register_extra_item", "zp_register_item", "zp_items_register")
 
 
-def extract_item_calls(lines: Iterable[str]) -> List[str]:
-    item_lines: List[str] = []
-    for line in lines:
-        stripped = line.strip()
-        if not stripped or stripped.startswith("//"):
-            continue
-        if any(keyword in stripped for keyword in ("zp_register_extra_item", "zp_register_item", "zp_items_register")):
-            if "(" in stripped:
-                item_lines.append(stripped)
-    return deduplicate_ordered(item_lines)
+def format_call(call: "call_parser.CallSite") -> str:
+    return f"{call.name}({', '.join(' '.join(arg.split()) for arg in call.raw_args)})"
+
+
+def extract_register_calls(calls: Iterable["call_parser.CallSite"]) -> List[str]:
+    return deduplicate_ordered(
+        format_call(call) for call in calls if call.name.startswith(REGISTER_PREFIXES)
+    )
 
 
-def extract_items(item_lines: Iterable[str]) -> List[str]:
+def extract_item_calls(calls: Iterable["call_parser.CallSite"]) -> List["call_parser.CallSite"]:
+    return [call for call in calls if call.name in ITEM_FUNCTIONS]
+
+
+def extract_items(item_calls: Iterable["call_parser.CallSite"], constants: Dict[str, object]) -> List[str]:
     names: List[str] = []
-    pattern = re.compile(r'\(\s*"([^"\n]+)"')
-    for line in item_lines:
-        match = pattern.search(line)
-        if match:
-            names.append(match.group(1).strip())
+    for call in item_calls:
+        if not call.raw_args:
+            continue
+        name = call.args[0]
+        if not call_parser.is_string_literal(call.raw_args[0]):
+            name = constants.get(call.raw_args[0].split("[")[0].strip())
+        if isinstance(name, list):
+            name = next((value for value in name if isinstance(value, str)), None)
+        if isinstance(name, str) and name.strip():
+            names.append(name.strip())
     return deduplicate_ordered(names)
 
 
@@ -278,11 +418,32 @@ def extract_abilities(text: str) -> List[str]:
     return sorted(abilities)
 
 
+_HUMAN_CLASS_MARKER = re.compile("human class", re.IGNORECASE)
+_HUMAN_CLASS_NAME = re.compile(r"\s*!g\s*([^!\"]+)", re.IGNORECASE)
+
+
 def extract_human_classes(text: str) -> List[str]:
-    pattern = re.compile(r"human class[^:]*:\s*!g\s*([^!\"]+)", re.IGNORECASE)
+    """Names matched by ``human class[^:]*:\\s*!g\\s*([^!"]+)``, in linear time.
+
+    The regex rescans up to the next colon from every ``human class``, which
+    is quadratic on text with many markers and no colon. Here the colon is
+    looked up once per marker and a failed colon skips every marker before it.
+    """
+
     classes: List[str] = []
-    for match in pattern.finditer(text):
+    position = 0
+    for marker in _HUMAN_CLASS_MARKER.finditer(text):
+        if marker.start() < position:
+            continue
+        colon = text.find(":", marker.end())
+        if colon < 0:
+            break
+        match = _HUMAN_CLASS_NAME.match(text, colon + 1)
+        if match is None:
+            position = colon + 1
+            continue
         classes.append(clean_entity_name(match.group(1).strip()))
+        position = match.end()
     return deduplicate_ordered(classes)
 
 
@@ -299,21 +460,82 @@ def determine_entity_type(path: Path, text_lower: str) -> str:
     return "script"
 
 
+_PLUGIN_NAME_PATTERN = re.compile(r'register_plugin\s*\(\s*"([^"\n]+)"')
+# ``[A-Za-z0-9_]*name[\w\[\]]*`` backtracks over every "name" inside a long
+# identifier; the identifier is matched whole and checked by _is_name_constant.
+_NAME_CONSTANT_PATTERN = re.compile(r"new\s+const\s+([\w\[\]]+)\s*=\s*\{\s*\"([^\"\n]+)\"")
+_ASCII_IDENTIFIER = re.compile(r"[A-Za-z0-9_]*")
+
+
+def _is_name_constant(identifier: str) -> bool:
+    """``identifier`` matches ``[A-Za-z0-9_]*name[\\w\\[\\]]*``."""
+
+    prefix = _ASCII_IDENTIFIER.match(identifier).end()  # type: ignore[union-attr]
+    return identifier.find("name", 0, prefix + 4) >= 0
+
+
 def extract_entity_name(lines: Iterable[str], text: str, fallback: str) -> str:
-    for match in re.finditer(r'register_plugin\s*\(\s*"([^"\n]+)"', text):
+    for match in _PLUGIN_NAME_PATTERN.finditer(text):
         name = match.group(1).strip()
         if name:
             return clean_entity_name(name)
-    name_pattern = re.compile(r"new\s+const\s+[A-Za-z0-9_]*name[\w\[\]]*\s*=\s*\{\s*\"([^\"\n]+)\"")
-    match = name_pattern.search(text)
-    if match:
-        candidate = match.group(1).strip()
-        if candidate:
-            return clean_entity_name(candidate)
+    position = 0
+    while True:
+        match = _NAME_CONSTANT_PATTERN.search(text, position)
+        if match is None:
+            break
+        if _is_name_constant(match.group(1)):
+            candidate = match.group(2).strip()
+            if candidate:
+                return clean_entity_name(candidate)
+            break
+        position = match.start() + 1
     return clean_entity_name(fallback)
 
 
-def parse_sma_file(path: Path, error_logger: logging.Logger) -> Optional[Dict[str, object]]:
+def _stats_stage(path: Path, text: str) -> Dict[str, object]:
+    return {"stats": extract_stats(text), "paths": extract_paths(text)}
+
+
+def _calls_stage(path: Path, text: str) -> Dict[str, object]:
+    calls = call_parser.scan_calls(text)
+    return {
+        "register_calls": extract_register_calls(calls),
+        "items": extract_items(extract_item_calls(calls), call_parser.collect_constants(text)),
+    }
+
+
+def _human_classes_stage(path: Path, text: str) -> Dict[str, object]:
+    if path.name.lower() != "zp_hclass.sma":
+        return {}
+    return {"human_pseudo_classes": extract_human_classes(text)}
+
+
+def _costs_stage(path: Path, text: str) -> Dict[str, object]:
+    return {"costs": hook_costs.cost_columns(hook_costs.analyze_text(text))}
+
+
+# Full extraction, cheapest first, as ScriptRecord keyword arguments.
+EXTRACTION_STAGES = (_stats_stage, _human_classes_stage, _calls_stage, _costs_stage)
+
+
+def parse_sma_file(
+    path: Path,
+    error_logger: logging.Logger,
+    base_dir: Path = ROOT,
+    *,
+    max_bytes: int = MAX_SOURCE_BYTES,
+    time_budget: float = FILE_TIME_BUDGET,
+) -> Optional[ScriptRecord]:
+    """Parse one script into a record, within a size and time budget.
+
+    Files over ``max_bytes`` get a reduced record: type, name, abilities and
+    the fingerprint from the first ``max_bytes``, with stats, paths, calls
+    and costs left empty. The full extraction runs in EXTRACTION_STAGES and
+    stops early (keeping the columns already filled) once the file has used
+    ``time_budget`` seconds. Reduced records are logged and flagged.
+    """
+
     try:
         text = path.read_text(encoding="utf-8", errors="ignore")
     except Exception as exc:  # pragma: no cover - defensive logging
@@ -321,72 +543,74 @@ def parse_sma_file(path: Path, error_logger: logging.Logger) -> Optional[Dict[st
         return None
 
     try:
+        started = time.perf_counter()
         lines = text.splitlines()
-        text_lower = text.lower()
-
-        stats = extract_stats(text)
-        paths = extract_paths(text)
-        register_lines = extract_register_calls(lines)
-        item_lines = extract_item_calls(lines)
-        items = extract_items(item_lines)
-        abilities = extract_abilities(text)
-        human_classes = (
-            extract_human_classes(text) if path.name.lower() == "zp_hclass.sma" else []
+        head = text[:max_bytes]
+        fields: Dict[str, object] = {}
+        reason = None
+        if len(text) > max_bytes:
+            reason = f"{len(text) // 1024} KB, límite {max_bytes // 1024} KB"
+        else:
+            for position, stage in enumerate(EXTRACTION_STAGES):
+                elapsed = time.perf_counter() - started
+                if position and elapsed > time_budget:
+                    reason = f"{elapsed:.2f} s, límite {time_budget:.2f} s"
+                    break
+                fields.update(stage(path, text))
+        if reason is not None:
+            error_logger.error("Extracción reducida para %s (%s)", path, reason)
+
+        return ScriptRecord(
+            path.relative_to(base_dir).as_posix(),
+            determine_entity_type(path, head.lower()),
+            extract_entity_name(lines, head, path.stem),
+            abilities=extract_abilities(head),
+            line_count=len(lines),
+            # Consumed by build_dataset for near-duplicate clustering, not exported.
+            fingerprint=fingerprints.minhash_signature(head),
+            reduced=reason is not None,
+            **fields,  # type: ignore[arg-type]
         )
+    except Exception as exc:  # pragma: no cover - defensive logging
+        error_logger.exception("Error procesando %s: %s", path, exc)
+        return None
 
-        entity_type = determine_entity_type(path, text_lower)
-        entity_name = extract_entity_name(lines, text, path.stem)
-
-        for column in LIST_COLUMNS:
-            if column not in ("paths_models", "paths_claws", "paths_sounds", "paths_sprites"):
-                continue
-            # Ensure list types for resource paths (already sorted)
-            paths.setdefault(column, [])
-
-        record: Dict[str, object] = {
-            "file": str(path.relative_to(ROOT)),
-            "entity_type": entity_type,
-            "entity_name": entity_name,
-            "register_calls": register_lines,
-            "items": items,
-            "abilities": abilities,
-            "human_pseudo_classes": human_classes,
-            "line_count": len(lines),
-            "ability_count": len(abilities),
-            "resource_count": sum(len(paths.get(key, [])) for key in (
-                "paths_models",
-                "paths_claws",
-                "paths_sounds",
-                "paths_sprites",
-            )),
-            "register_count": len(register_lines),
-        }
-        record.update(stats)
-        record.update(paths)
-
-        for column in LIST_COLUMNS:
-            value = record.get(column)
-            if value is None:
-                record[column] = []
-            elif isinstance(value, list):
-                record[column] = value
-            elif isinstance(value, set):
-                record[column] = sorted(value)
-            else:
-                record[column] = [value]
-
-        record["ability_count"] = len(record.get("abilities", []))
-        record["register_count"] = len(record.get("register_calls", []))
-        record["resource_count"] = sum(
-            len(record.get(column, []))
-            for column in ("paths_models", "paths_claws", "paths_sounds", "paths_sprites")
-        )
+def parse_amxx_file(
+    path: Path,
+    error_logger: logging.Logger,
+    base_dir: Path = ROOT,
+) -> Optional[ScriptRecord]:
+    """Build a dataset record for a compiled plugin from its native/public tables.
+
+    Only the table prefix of the AMX image is decompressed, so binary-only
+    plugins cost little more than reading the file. Fields that need the
+    source (stats, paths, items) are left empty, and the line count and hook
+    costs are zero.
+    """
 
-        return record
+    try:
+        plugin = amxx_reader.AmxxFile(path)
+        natives = plugin.natives()
+        publics = plugin.publics()
     except Exception as exc:  # pragma: no cover - defensive logging
-        error_logger.exception("Error procesando %s: %s", path, exc)
+        error_logger.exception("No se pudo leer el plugin compilado %s: %s", path, exc)
         return None
 
+    native_names = deduplicate_ordered(natives)
+    register_calls = [
+        name for name in native_names if "zp_class_" in name or "zp_register_" in name
+    ]
+    abilities = sorted(set(native_names) & set(ABILITY_KEYWORDS))
+    return ScriptRecord(
+        path.relative_to(base_dir).as_posix(),
+        determine_entity_type(path, " ".join(native_names).lower()),
+        clean_entity_name(path.stem),
+        register_calls=register_calls,
+        abilities=abilities,
+        fingerprint=fingerprints.minhash_signature(" ".join(publics + native_names)),
+    )
+
+
 def dataframe_for_csv(dataframe: pd.DataFrame) -> pd.DataFrame:
     """Return a copy of the dataframe with list columns serialized as JSON."""
 
@@ -407,6 +631,8 @@ def dataframe_for_csv(dataframe: pd.DataFrame) -> pd.DataFrame:
 
 
 def infer_column_type(series: pd.Series, column: str) -> str:
+    import pandas as pd
+
     if column in LIST_COLUMNS:
         return "list"
     if pd.api.types.is_integer_dtype(series):
@@ -432,55 +658,318 @@ def safe_write_json(path: Path, data: object) -> None:
     safe_write(path, _write_json)
 
 
-def build_dataset(
+def collect_records(
+    input_dir: Path,
     limit: Optional[int],
     logger: logging.Logger,
     error_logger: logging.Logger,
-) -> tuple[pd.DataFrame, Dict[str, int]]:
-    if not INPUT_DIR.exists():
-        raise FileNotFoundError(f"Input directory not found: {INPUT_DIR}")
+    *,
+    include_amxx: bool = False,
+    max_bytes: int = MAX_SOURCE_BYTES,
+    time_budget: float = FILE_TIME_BUDGET,
+) -> tuple[List[ScriptRecord], list, Dict[str, int]]:
+    """Parse every ``.sma`` (and, optionally, ``.amxx``) below ``input_dir``.
+
+    Returns the records, their MinHash signatures (same order) and the
+    processed/valid/failed/reduced counters. File paths are stored relative
+    to the parent of ``input_dir`` so that they start with the pack directory
+    name.
+    """
+
+    if not input_dir.exists():
+        raise FileNotFoundError(f"Input directory not found: {input_dir}")
 
-    records: List[Dict[str, object]] = []
+    records: List[ScriptRecord] = []
     processed = 0
     failures = 0
-    for sma_file in sorted(INPUT_DIR.rglob("*.sma")):
+    reduced = 0
+    sources = sorted(input_dir.rglob("*.sma"))
+    if include_amxx:
+        sources += sorted(input_dir.rglob("*.amxx"))
+    for source in sources:
         if limit is not None and processed >= limit:
             break
         processed += 1
-        record = parse_sma_file(sma_file, error_logger)
+        if source.suffix.lower() == ".amxx":
+            record = parse_amxx_file(source, error_logger, input_dir.parent)
+        else:
+            record = parse_sma_file(
+                source, error_logger, input_dir.parent, max_bytes=max_bytes, time_budget=time_budget
+            )
         if record is None:
             failures += 1
-            logger.warning("Se omitió %s por errores de parseo", sma_file)
+            logger.warning("Se omitió %s por errores de parseo", source)
             continue
+        if record.reduced:
+            reduced += 1
+            logger.warning("Extracción reducida para %s (excede el presupuesto por archivo)", source)
         records.append(record)
 
     if not records:
-        raise RuntimeError("No .sma files were found in the input directory")
+        raise RuntimeError(f"No .sma files were found in {input_dir}")
 
-    dataframe = pd.DataFrame(records)
+    signatures = []
+    for record in records:
+        signatures.append(record.fingerprint)
+        record.fingerprint = None
+    counters = {"processed": processed, "valid": len(records), "failed": failures, "reduced": reduced}
+    return records, signatures, counters
+
+
+def records_to_dataframe(
+    records: Sequence[ScriptRecord],
+    cluster_ids: Sequence[int],
+) -> pd.DataFrame:
+    import pandas as pd
+
+    columns = ScriptRecord.columns(records)
+    columns["cluster_id"] = list(cluster_ids)
+    dataframe = pd.DataFrame(columns)
     for column in STAT_KEYWORDS:
-        if column not in dataframe:
-            dataframe[column] = None
         dataframe[column] = pd.to_numeric(dataframe[column], errors="coerce")
-    for column in LIST_COLUMNS:
-        if column not in dataframe:
-            dataframe[column] = [[] for _ in range(len(dataframe))]
+    return dataframe
 
-    summary = {
-        "processed": processed,
-        "valid": len(records),
-        "failed": failures,
-    }
 
+def build_dataset(
+    limit: Optional[int],
+    logger: logging.Logger,
+    error_logger: logging.Logger,
+    *,
+    dedup_threshold: float = fingerprints.DEFAULT_THRESHOLD,
+    input_dir: Path = INPUT_DIR,
+    include_amxx: bool = False,
+    max_bytes: int = MAX_SOURCE_BYTES,
+    time_budget: float = FILE_TIME_BUDGET,
+) -> tuple[pd.DataFrame, Dict[str, int]]:
+    records, signatures, summary = collect_records(
+        input_dir,
+        limit,
+        logger,
+        error_logger,
+        include_amxx=include_amxx,
+        max_bytes=max_bytes,
+        time_budget=time_budget,
+    )
+    cluster_ids = fingerprints.cluster_signatures(signatures, threshold=dedup_threshold)
+    dataframe = records_to_dataframe(records, cluster_ids)
+    summary["clusters"] = len(set(cluster_ids))
     return dataframe, summary
 
 
+def build_schema(dataframe: pd.DataFrame) -> Dict[str, object]:
+    return {
+        "columns": [
+            {
+                "name": column,
+                "type": infer_column_type(dataframe[column], column),
+            }
+            for column in dataframe.columns
+        ]
+    }
+
+
+def pack_name_for(input_dir: Path) -> str:
+    """Derive a partition-safe pack name from an input root."""
+
+    name = re.sub(r"[^0-9A-Za-z_.\-]+", "_", input_dir.resolve().name).strip("_")
+    return name or "pack"
+
+
+def build_pack_shard(
+    input_dir: Path,
+    shard_dir: Path,
+    limit: Optional[int] = None,
+    include_amxx: bool = False,
+    max_bytes: int = MAX_SOURCE_BYTES,
+    time_budget: float = FILE_TIME_BUDGET,
+) -> Dict[str, object]:
+    """Build one pack into ``shard_dir`` (Parquet shard, schema and fingerprints).
+
+    Runs in a worker process, so it configures its own loggers and writes its
+    parse errors next to the shard instead of the shared error log.
+    """
+
+    import numpy as np
+
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    logger = logging.getLogger(f"dataset_builder.shard.{shard_dir.name}")
+    error_logger = logging.getLogger(f"dataset_builder.shard.{shard_dir.name}.errors")
+    if not error_logger.handlers:
+        error_logger.setLevel(logging.ERROR)
+        handler = logging.FileHandler(shard_dir / "errors.log", mode="w", encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+        error_logger.addHandler(handler)
+        error_logger.propagate = False
+
+    records, signatures, summary = collect_records(
+        input_dir,
+        limit,
+        logger,
+        error_logger,
+        include_amxx=include_amxx,
+        max_bytes=max_bytes,
+        time_budget=time_budget,
+    )
+    # Cluster ids are assigned corpus-wide by merge_shards; keep a local one
+    # so the shard is usable on its own.
+    cluster_ids = fingerprints.cluster_signatures(signatures)
+    dataframe = records_to_dataframe(records, cluster_ids)
+
+    safe_write(shard_dir / "dataset.parquet", lambda tmp: dataframe.to_parquet(tmp, index=False))
+    def _write_signatures(tmp_path: Path) -> None:
+        with tmp_path.open("wb") as handle:
+            np.save(handle, np.vstack(signatures))
+
+    safe_write(shard_dir / "fingerprints.npy", _write_signatures)
+    safe_write_json(shard_dir / "dataset_schema.json", build_schema(dataframe))
+    summary["pack"] = shard_dir.name
+    summary["input_dir"] = str(input_dir)
+    return summary
+
+
+def build_shards(
+    input_dirs: Sequence[Path],
+    shard_root: Path,
+    logger: logging.Logger,
+    *,
+    limit: Optional[int] = None,
+    jobs: Optional[int] = None,
+    include_amxx: bool = False,
+    max_bytes: int = MAX_SOURCE_BYTES,
+    time_budget: float = FILE_TIME_BUDGET,
+) -> List[Dict[str, object]]:
+    """Build every pack into its own shard under ``shard_root`` in parallel."""
+
+    names: Dict[str, int] = {}
+    targets = []
+    for input_dir in input_dirs:
+        name = pack_name_for(input_dir)
+        count = names.get(name, 0)
+        names[name] = count + 1
+        if count:
+            name = f"{name}_{count + 1}"
+        targets.append((input_dir, shard_root / name))
+
+    summaries: List[Dict[str, object]] = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(
+                build_pack_shard, input_dir, shard_dir, limit, include_amxx, max_bytes, time_budget
+            ): shard_dir
+            for input_dir, shard_dir in targets
+        }
+        for future, shard_dir in futures.items():
+            try:
+                summary = future.result()
+            except Exception as exc:  # pragma: no cover - defensive logging
+                logger.error("No fue posible construir el shard %s: %s", shard_dir.name, exc)
+                continue
+            logger.info(
+                "Shard %s: %s archivos, %s válidos, %s errores",
+                summary["pack"],
+                summary["processed"],
+                summary["valid"],
+                summary["failed"],
+            )
+            summaries.append(summary)
+    return summaries
+
+
+def merge_shards(
+    shard_root: Path,
+    output_dir: Path,
+    logger: logging.Logger,
+    *,
+    dedup_threshold: float = fingerprints.DEFAULT_THRESHOLD,
+) -> Dict[str, int]:
+    """Combine shards into a Hive-partitioned dataset keyed by ``pack``.
+
+    Shards are read back as Arrow tables, so no script is parsed again. The
+    stored fingerprints are clustered across all packs, which replaces the
+    per-shard ``cluster_id`` with a corpus-wide one.
+    """
+
+    import shutil
+
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    shard_dirs = sorted(
+        path for path in shard_root.iterdir() if (path / "dataset.parquet").exists()
+    ) if shard_root.exists() else []
+    if not shard_dirs:
+        raise FileNotFoundError(f"No shards found in {shard_root}")
+
+    tables = [
+        pq.read_table(path / "dataset.parquet").replace_schema_metadata(None)
+        for path in shard_dirs
+    ]
+    # Shards typed independently (e.g. an always-empty list column is
+    # list<null> in one pack); promote them to one schema for the partitions.
+    unified = pa.unify_schemas([table.schema for table in tables], promote_options="permissive")
+    signatures = [np.load(path / "fingerprints.npy") for path in shard_dirs]
+    cluster_ids = fingerprints.cluster_signatures(
+        [row for matrix in signatures for row in matrix], threshold=dedup_threshold
+    )
+
+    tmp_dir = output_dir.with_name(output_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    offset = 0
+    schema_frame = None
+    for shard_dir, table in zip(shard_dirs, tables):
+        ids = pa.array(cluster_ids[offset:offset + table.num_rows], type=pa.int64())
+        offset += table.num_rows
+        index = table.schema.get_field_index("cluster_id")
+        if index >= 0:
+            table = table.set_column(index, "cluster_id", ids)
+        else:
+            table = table.append_column("cluster_id", ids)
+        for field in unified:
+            if field.name not in table.column_names:
+                table = table.append_column(field, pa.nulls(table.num_rows, field.type))
+        table = table.select(unified.names).cast(unified.set(
+            unified.get_field_index("cluster_id"), pa.field("cluster_id", pa.int64())
+        ))
+        partition = tmp_dir / f"pack={shard_dir.name}"
+        partition.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table, partition / "part-0.parquet")
+        if schema_frame is None:
+            schema_frame = table.slice(0, 0).to_pandas()
+
+    schema = build_schema(schema_frame)
+    schema["columns"].append({"name": "pack", "type": "string"})
+    schema["partitioning"] = {"flavor": "hive", "columns": ["pack"]}
+    # Leading underscore: Parquet readers skip it when scanning the partitions.
+    safe_write_json(tmp_dir / "_dataset_schema.json", schema)
+
+    if output_dir.exists():
+        shutil.rmtree(output_dir)
+    tmp_dir.replace(output_dir)
+
+    summary = {
+        "packs": len(shard_dirs),
+        "rows": offset,
+        "clusters": len(set(cluster_ids)),
+    }
+    logger.info(
+        "Dataset particionado en %s: %s packs, %s filas, %s clusters",
+        output_dir,
+        summary["packs"],
+        summary["rows"],
+        summary["clusters"],
+    )
+    return summary
+
+
 def export_dataset(
     dataframe: pd.DataFrame,
     logger: logging.Logger,
     *,
     write_parquet: bool,
     parquet_reason: Optional[str] = None,
+    write_store: bool = True,
 ) -> None:
     csv_path = ROOT / "dataset.csv"
     parquet_path = ROOT / "dataset.parquet"
@@ -502,16 +991,13 @@ def export_dataset(
     preview_records = dataframe.head(20).to_dict(orient="records")
     safe_write_json(preview_path, preview_records)
 
-    schema = {
-        "columns": [
-            {
-                "name": column,
-                "type": infer_column_type(dataframe[column], column),
-            }
-            for column in dataframe.columns
-        ]
-    }
-    safe_write_json(schema_path, schema)
+    safe_write_json(schema_path, build_schema(dataframe))
+    hashes_path = dataset_diff.write_hashes(dataframe, ROOT, parquet=write_parquet)
+
+    if write_store:
+        record_store.write_records(
+            dataframe.to_dict(orient="records"), record_store.STORE_PATH, prune=True
+        )
 
     logger.info("Archivos exportados:")
     logger.info("- CSV: %s", csv_path)
@@ -519,6 +1005,9 @@ def export_dataset(
         logger.info("- Parquet: %s", parquet_path)
     logger.info("- Vista previa: %s", preview_path)
     logger.info("- Esquema: %s", schema_path)
+    logger.info("- Hashes por fila: %s", hashes_path)
+    if write_store:
+        logger.info("- SQLite: %s", record_store.STORE_PATH)
 
 
 def summarize_dataframe(dataframe: pd.DataFrame, logger: logging.Logger) -> None:
@@ -570,15 +1059,125 @@ def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
         action="store_true",
         help="Omite la generación de la salida en formato Parquet",
     )
+    parser.add_argument(
+        "--no-sqlite",
+        action="store_true",
+        help="Omite la escritura del store SQLite (dataset.sqlite)",
+    )
+    parser.add_argument(
+        "--no-code-index",
+        action="store_true",
+        help="Omite la actualización del índice de búsqueda de código (code_index/)",
+    )
+    parser.add_argument(
+        "--include-amxx",
+        action="store_true",
+        help="Incluye los plugins compilados .amxx (natives y publics) como filas del dataset",
+    )
+    parser.add_argument(
+        "--max-file-kb",
+        type=int,
+        default=MAX_SOURCE_BYTES // 1024,
+        help="Tamaño máximo por archivo .sma; los más grandes reciben una extracción reducida",
+    )
+    parser.add_argument(
+        "--file-time-budget",
+        type=float,
+        default=FILE_TIME_BUDGET,
+        help="Segundos de extracción por archivo antes de pasar a la extracción reducida",
+    )
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=fingerprints.DEFAULT_THRESHOLD,
+        help="Similitud Jaccard mínima para agrupar scripts casi idénticos en un cluster_id",
+    )
+    parser.add_argument(
+        "--inputs",
+        type=Path,
+        nargs="+",
+        default=None,
+        help="Construye cada pack indicado en su propio shard Parquet en paralelo",
+    )
+    parser.add_argument(
+        "--shard-dir",
+        type=Path,
+        default=SHARD_DIR,
+        help="Directorio donde se escriben los shards por pack",
+    )
+    parser.add_argument(
+        "--merge",
+        action="store_true",
+        help="Combina los shards en un dataset Parquet particionado por pack",
+    )
+    parser.add_argument(
+        "--partitioned-dir",
+        type=Path,
+        default=PARTITIONED_DIR,
+        help="Directorio de salida del dataset particionado",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Procesos en paralelo para construir shards (por defecto, uno por núcleo)",
+    )
     return parser.parse_args(argv)
 
 
+def run_batch(args: argparse.Namespace, logger: logging.Logger) -> None:
+    """Multi-pack mode: build shards and/or merge them."""
+
+    if not can_export_parquet():
+        logger.error("El modo multi-pack requiere pyarrow para escribir shards Parquet")
+        sys.exit(1)
+
+    if args.inputs:
+        summaries = build_shards(
+            args.inputs,
+            args.shard_dir,
+            logger,
+            limit=args.limit,
+            jobs=args.jobs,
+            include_amxx=args.include_amxx,
+            max_bytes=args.max_file_kb * 1024,
+            time_budget=args.file_time_budget,
+        )
+        if len(summaries) != len(args.inputs):
+            logger.error("Algunos packs no pudieron construirse; revisá los errores")
+            sys.exit(1)
+
+    if args.merge:
+        try:
+            merge_shards(
+                args.shard_dir,
+                args.partitioned_dir,
+                logger,
+                dedup_threshold=args.dedup_threshold,
+            )
+        except Exception as exc:  # pragma: no cover - defensive logging
+            logger.error("No fue posible combinar los shards: %s", exc)
+            sys.exit(1)
+
+
 def main(argv: Optional[Sequence[str]] = None) -> None:
     args = parse_args(argv)
     logger, error_logger = setup_logging()
 
+    if args.inputs or args.merge:
+        run_batch(args, logger)
+        return
+
     try:
-        dataframe, summary = build_dataset(args.limit, logger, error_logger)
+        dataframe, summary = build_dataset(
+            args.limit,
+            logger,
+            error_logger,
+            dedup_threshold=args.dedup_threshold,
+            include_amxx=args.include_amxx,
+            max_bytes=args.max_file_kb * 1024,
+            time_budget=args.file_time_budget,
+        )
     except Exception as exc:  # pragma: no cover - defensive logging
         logger.error("No fue posible construir el dataset: %s", exc)
         sys.exit(1)
@@ -595,13 +1194,30 @@ def main(argv: Optional[Sequence[str]] = None) -> None:
         logger,
         write_parquet=parquet_available,
         parquet_reason=parquet_reason,
+        write_store=not args.no_sqlite,
     )
 
+    if not args.no_code_index:
+        try:
+            index_summary = code_search.build_index(INPUT_DIR)
+            logger.info(
+                "- Índice de código: %s (%s archivos, %s reindexados)",
+                code_search.INDEX_DIR,
+                index_summary["documents"],
+                index_summary["reindexed"],
+            )
+        except Exception as exc:  # pragma: no cover - defensive logging
+            logger.warning("No fue posible actualizar el índice de código: %s", exc)
+
     logger.info(
-        "Archivos procesados: %s | Registros válidos: %s | Errores: %s",
+        "Archivos procesados: %s | Registros válidos: %s | Errores: %s | Extracción reducida: %s",
         summary["processed"],
         summary["valid"],
         summary["failed"],
+        summary["reduced"],
+    )
+    logger.info(
+        "Grupos de scripts casi idénticos (cluster_id): %s", summary["clusters"]
     )
     summarize_dataframe(dataframe, logger)
 
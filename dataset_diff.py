@@ -0,0 +1,270 @@
+"""Content hashes for dataset rows and a diff between two builds.
+
+``export_dataset`` writes ``dataset_hashes.parquet`` (``.csv`` when Parquet is
+unavailable) next to the dataset: one row per ``file`` with a 64-bit hash of
+every column plus a ``row_hash`` combining them. Hashes are computed from a
+canonical text form of each cell (lists as JSON, integral floats as ints,
+missing values as ``null``), so a build exported as CSV and the same build
+exported as Parquet hash identically. ``cluster_id`` is left out because
+cluster numbers are reassigned on every build.
+
+``python dataset_diff.py OLD NEW`` joins the two hash tables on ``file``.
+Rows whose ``row_hash`` matches are skipped without reading the dataset at
+all; only the added and modified rows are loaded (with a Parquet row filter
+when possible) to report the changed fields, and for list columns the items
+that were added or removed.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    import numpy as np
+    import pandas as pd
+
+ROOT = Path(__file__).resolve().parent
+HASHES_STEM = "dataset_hashes"
+ROW_HASH = "row_hash"
+KEY_COLUMN = "file"
+# Cluster numbers are reassigned on every build, so they are not content.
+IGNORED_COLUMNS = ("cluster_id",)
+
+
+def _canonical(value: object, is_list: bool) -> str:
+    if hasattr(value, "tolist"):
+        value = value.tolist()
+    if is_list:
+        if isinstance(value, str):
+            try:
+                value = json.loads(value) if value.strip() else []
+            except ValueError:
+                value = [value]
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            value = []
+        if not isinstance(value, (list, tuple)):
+            value = [value]
+        return json.dumps([str(item) for item in value], ensure_ascii=False)
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "null"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _numeric_text(values: np.ndarray) -> np.ndarray:
+    """Vectorized :func:`_canonical` for a numeric column."""
+    import numpy as np
+
+    text = values.astype(str).astype(object)
+    integral = np.isfinite(values) & (np.floor(values) == values) & (np.abs(values) < 2.0**63)
+    text[integral] = values[integral].astype(np.int64).astype(str)
+    text[np.isnan(values)] = "null"
+    return text
+
+
+def hash_frame(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """One uint64 hash per cell and a combined ``row_hash``, keyed by ``file``."""
+    import numpy as np
+    import pandas as pd
+
+    from dataset_builder import LIST_COLUMNS
+
+    columns = sorted(
+        column for column in dataframe.columns if column != KEY_COLUMN and column not in IGNORED_COLUMNS
+    )
+    hashes = pd.DataFrame(index=dataframe.index)
+    for column in columns:
+        series = dataframe[column]
+        if column not in LIST_COLUMNS and pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            text = _numeric_text(series.to_numpy(dtype="float64"))
+        else:
+            is_list = column in LIST_COLUMNS
+            text = np.array([_canonical(value, is_list) for value in series], dtype=object)
+        hashes[column] = pd.util.hash_array(text, categorize=False)
+    hashes.insert(0, ROW_HASH, pd.util.hash_pandas_object(hashes, index=False).to_numpy())
+    hashes.insert(0, KEY_COLUMN, dataframe[KEY_COLUMN].astype(str).to_numpy())
+    return hashes.reset_index(drop=True)
+
+
+def hashes_path_for(dataset_path: Path) -> Optional[Path]:
+    """Existing hash sidecar written next to ``dataset_path``, if any."""
+    directory = dataset_path if dataset_path.is_dir() else dataset_path.parent
+    for suffix in (".parquet", ".csv"):
+        candidate = directory / f"{HASHES_STEM}{suffix}"
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def write_hashes(dataframe: pd.DataFrame, directory: Path, *, parquet: bool) -> Path:
+    from dataset_builder import safe_write
+
+    hashes = hash_frame(dataframe)
+    if parquet:
+        path = directory / f"{HASHES_STEM}.parquet"
+        safe_write(path, lambda tmp: hashes.to_parquet(tmp, index=False))
+    else:
+        path = directory / f"{HASHES_STEM}.csv"
+        safe_write(path, lambda tmp: hashes.to_csv(tmp, index=False))
+    return path
+
+
+def resolve_dataset(path: Path) -> Path:
+    """A build directory resolves to its dataset.parquet (or dataset.csv)."""
+    if path.is_dir():
+        for name in ("dataset.parquet", "dataset.csv"):
+            if (path / name).exists():
+                return path / name
+        if any(path.rglob("*.parquet")):
+            return path  # partitioned dataset
+        raise FileNotFoundError(f"No hay dataset en {path}")
+    if not path.exists():
+        raise FileNotFoundError(f"No existe {path}")
+    return path
+
+
+def read_rows(dataset_path: Path, files: Sequence[str]) -> pd.DataFrame:
+    """Only the rows for ``files``; Parquet filters them before decoding."""
+    import pandas as pd
+
+    if not files:
+        return pd.DataFrame(columns=[KEY_COLUMN])
+    if dataset_path.is_dir() or dataset_path.suffix.lower() == ".parquet":
+        frame = pd.read_parquet(dataset_path, filters=[(KEY_COLUMN, "in", list(files))])
+    else:
+        frame = pd.read_csv(dataset_path)
+        frame = frame[frame[KEY_COLUMN].isin(set(files))]
+    return frame.set_index(KEY_COLUMN, drop=False)
+
+
+def load_hashes(dataset_path: Path) -> pd.DataFrame:
+    """The stored sidecar when it is not older than the dataset, else recomputed."""
+    import pandas as pd
+
+    sidecar = hashes_path_for(dataset_path)
+    if sidecar is not None and sidecar.stat().st_mtime_ns >= dataset_path.stat().st_mtime_ns:
+        if sidecar.suffix == ".parquet":
+            return pd.read_parquet(sidecar)
+        frame = pd.read_csv(sidecar, dtype={KEY_COLUMN: str})
+        return frame.astype({column: "uint64" for column in frame.columns if column != KEY_COLUMN})
+    if dataset_path.is_dir() or dataset_path.suffix.lower() == ".parquet":
+        frame = pd.read_parquet(dataset_path)
+    else:
+        frame = pd.read_csv(dataset_path)
+    return hash_frame(frame)
+
+
+def _field_change(column: str, old: object, new: object) -> Dict[str, object]:
+    from dataset_builder import LIST_COLUMNS
+
+    if column in LIST_COLUMNS:
+        before = json.loads(_canonical(old, True))
+        after = json.loads(_canonical(new, True))
+        return {
+            "added": [item for item in after if item not in before],
+            "removed": [item for item in before if item not in after],
+        }
+    old_text, new_text = _canonical(old, False), _canonical(new, False)
+    return {"old": None if old_text == "null" else old_text, "new": None if new_text == "null" else new_text}
+
+
+def diff_datasets(old_path: Path, new_path: Path, *, with_values: bool = True) -> Dict[str, object]:
+    old_path, new_path = resolve_dataset(old_path), resolve_dataset(new_path)
+    old_hashes = load_hashes(old_path).set_index(KEY_COLUMN)
+    new_hashes = load_hashes(new_path).set_index(KEY_COLUMN)
+
+    added = sorted(new_hashes.index.difference(old_hashes.index))
+    removed = sorted(old_hashes.index.difference(new_hashes.index))
+    common = new_hashes.index.intersection(old_hashes.index)
+    shared_columns = [
+        column
+        for column in new_hashes.columns
+        if column != ROW_HASH and column in old_hashes.columns
+    ]
+    if set(old_hashes.columns) == set(new_hashes.columns):
+        changed_mask = old_hashes.loc[common, ROW_HASH].to_numpy() != new_hashes.loc[common, ROW_HASH].to_numpy()
+    else:  # schema changed: row hashes cover different columns, compare the shared ones
+        changed_mask = (
+            old_hashes.loc[common, shared_columns].to_numpy() != new_hashes.loc[common, shared_columns].to_numpy()
+        ).any(axis=1)
+    modified_files = sorted(common[changed_mask])
+
+    old_part = old_hashes.loc[modified_files, shared_columns]
+    new_part = new_hashes.loc[modified_files, shared_columns]
+    differs = old_part.to_numpy() != new_part.to_numpy()
+    schema_columns = sorted(set(old_hashes.columns) ^ set(new_hashes.columns))
+
+    old_rows = read_rows(old_path, modified_files + removed) if with_values else None
+    new_rows = read_rows(new_path, modified_files + added) if with_values else None
+    modified = []
+    for position, file in enumerate(modified_files):
+        columns = [column for column, flag in zip(shared_columns, differs[position]) if flag]
+        entry: Dict[str, object] = {"file": file, "columns": columns}
+        if with_values:
+            entry["changes"] = {
+                column: _field_change(
+                    column, old_rows.at[file, column], new_rows.at[file, column]  # type: ignore[union-attr]
+                )
+                for column in columns
+            }
+        modified.append(entry)
+
+    def summary(rows: Optional[pd.DataFrame], files: List[str]) -> List[Dict[str, object]]:
+        if rows is None:
+            return [{"file": file} for file in files]
+        return [
+            {
+                "file": file,
+                "entity_type": rows.at[file, "entity_type"] if "entity_type" in rows else None,
+                "entity_name": rows.at[file, "entity_name"] if "entity_name" in rows else None,
+            }
+            for file in files
+        ]
+
+    return {
+        "old": str(old_path),
+        "new": str(new_path),
+        "unchanged": int(len(common) - len(modified_files)),
+        "added": summary(new_rows, added),
+        "removed": summary(old_rows, removed),
+        "modified": modified,
+        "schema_changes": schema_columns,
+    }
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compara dos builds del dataset por hash de contenido (filas nuevas, borradas y modificadas)"
+    )
+    parser.add_argument("old", type=Path, help="Dataset anterior (archivo o directorio del build)")
+    parser.add_argument("new", type=Path, nargs="?", default=ROOT, help="Dataset nuevo (por defecto, el del proyecto)")
+    parser.add_argument("--summary", action="store_true", help="Solo archivos y columnas, sin valores")
+    parser.add_argument("--output", type=Path, default=None, help="Guarda el reporte JSON en esta ruta")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    start = time.perf_counter()
+    try:
+        report = diff_datasets(args.old, args.new, with_values=not args.summary)
+    except FileNotFoundError as exc:
+        print(json.dumps({"error": str(exc)}, ensure_ascii=False))
+        return 1
+    report["diff_ms"] = round((time.perf_counter() - start) * 1000.0, 2)
+    text = json.dumps(report, indent=2, ensure_ascii=False, default=str)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
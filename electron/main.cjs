@@ -228,11 +228,30 @@ function runPythonScript(pythonPath, scriptPath, args) {
   })
 }
 
+function runCompileFarm(pythonPath, args) {
+  return new Promise((resolve) => {
+    const child = spawn(pythonPath, [PYTHON_SCRIPTS.compileFarm, ...args])
+    let stdout = ''
+    child.stdout.on('data', (data) => { stdout += data.toString() })
+    child.on('close', () => {
+      try { resolve(JSON.parse(stdout)) } catch { resolve(null) }
+    })
+    child.on('error', () => resolve(null))
+  })
+}
+
 // ------------------- Python Script Paths --------------------
 const PYTHON_SCRIPTS = {
   spr2png: path.join(APP_DIRS.scripts, 'spr2png.py'),
   mdl2png: path.join(APP_DIRS.scripts, 'mdl2png.py'),
-  wav2waveform: path.join(APP_DIRS.scripts, 'wav2waveform.py')
+  wav2waveform: path.join(APP_DIRS.scripts, 'wav2waveform.py'),
+  assetCatalog: path.join(APP_DIRS.scripts, 'asset_catalog.py'),
+  fastdlOptimizer: path.join(APP_DIRS.scripts, 'fastdl_optimizer.py'),
+  previewAtlas: path.join(APP_DIRS.scripts, 'preview_atlas.py'),
+  compileFarm: path.join(process.cwd(), 'compile_farm.py'),
+  codeSearch: path.join(process.cwd(), 'code_search.py'),
+  queryService: path.join(process.cwd(), 'query_service.py'),
+  recordStore: path.join(process.cwd(), 'record_store.py')
 }
 
 // ------------------- Preview Generators --------------------
@@ -371,6 +390,124 @@ ipcMain.handle('detect:python', async () => {
   }
 })
 
+ipcMain.handle('store:query', async (_evt, filters = {}) => {
+  // Consulta indexada sobre dataset.sqlite (lo genera dataset_builder.py)
+  const cfg = readCFG()
+  const pythonPath = cfg.pythonPath || 'python'
+  const args = ['query']
+  if (filters.type) args.push('--type', String(filters.type))
+  for (const cond of filters.where || []) args.push('--where', String(cond))
+  for (const use of filters.uses || []) args.push('--uses', String(use))
+  if (filters.limit != null) args.push('--limit', String(filters.limit))
+  if (filters.noLists) args.push('--no-lists')
+  try {
+    const { stdout } = await runPythonScript(pythonPath, PYTHON_SCRIPTS.recordStore, args)
+    return JSON.parse(stdout)
+  } catch (error) {
+    return { error: String(error.message || error), count: 0, results: [] }
+  }
+})
+
+// ------------------- Query Service --------------------
+// Proceso Python persistente con dataset y modelo en memoria (query_service.py)
+const QUERY_SERVICE_PORT = 8765
+let queryService = null
+
+function ensureQueryService() {
+  if (queryService) return queryService
+  const cfg = readCFG()
+  const pythonPath = cfg.pythonPath || 'python'
+  const child = spawn(pythonPath, [PYTHON_SCRIPTS.queryService, '--port', String(QUERY_SERVICE_PORT)], { cwd: process.cwd() })
+  queryService = new Promise((resolve, reject) => {
+    child.stderr.on('data', (data) => { if (/Serving/.test(data.toString())) resolve(child) })
+    child.on('error', reject)
+    child.on('exit', (code) => {
+      queryService = null
+      reject(new Error(`query_service.py terminó con código ${code}`))
+    })
+  })
+  return queryService
+}
+
+app.on('will-quit', () => {
+  if (queryService) queryService.then((child) => child.kill()).catch(() => {})
+})
+
+ipcMain.handle('service:request', async (_evt, endpoint, body = null) => {
+  // endpoint: 'stats' | 'lookup' | 'filter' | 'classify'
+  try {
+    await ensureQueryService()
+    const res = await fetch(`http://127.0.0.1:${QUERY_SERVICE_PORT}/${endpoint}`, body
+      ? { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(body) }
+      : undefined)
+    return await res.json()
+  } catch (error) {
+    return { error: String(error.message || error) }
+  }
+})
+
+ipcMain.handle('code:search', async (_evt, query = {}) => {
+  // Búsqueda literal o regex sobre los .sma/.inc usando el índice de trigramas (code_index/)
+  const cfg = readCFG()
+  const pythonPath = cfg.pythonPath || 'python'
+  const args = ['query', String(query.pattern || ''), '--json', '--input-dir', APP_DIRS.input]
+  if (query.regex) args.push('--regex')
+  if (query.ignoreCase) args.push('--ignore-case')
+  if (query.limit != null) args.push('--limit', String(query.limit))
+  try {
+    const { stdout } = await runPythonScript(pythonPath, PYTHON_SCRIPTS.codeSearch, args)
+    return JSON.parse(stdout)
+  } catch (error) {
+    return { error: String(error.message || error), matches: [] }
+  }
+})
+
+ipcMain.handle('assets:catalog', async () => {
+  // Metadatos de todos los assets leyendo solo cabeceras (sin generar previews)
+  ensureDirs()
+  const cfg = readCFG()
+  const pythonPath = cfg.pythonPath || 'python'
+  const output = path.join(APP_DIRS.previews, 'asset_catalog.json')
+  try {
+    await runPythonScript(pythonPath, PYTHON_SCRIPTS.assetCatalog, [APP_DIRS.input, output])
+    return JSON.parse(fs.readFileSync(output, 'utf-8'))
+  } catch (error) {
+    return { error: String(error.message || error), count: 0, assets: {} }
+  }
+})
+
+ipcMain.handle('fastdl:optimize', async (_evt, opts = {}) => {
+  // Copias FastDL (.bz2) en build/fastdl; los sonidos se pasan a mono 22 kHz
+  ensureDirs()
+  const cfg = readCFG()
+  const pythonPath = cfg.pythonPath || 'python'
+  const args = [APP_DIRS.input, path.join(APP_DIRS.build, 'fastdl')]
+  if (opts.bits) args.push('--bits', String(opts.bits))
+  if (opts.noTranscode) args.push('--no-transcode')
+  try {
+    const { stdout } = await runPythonScript(pythonPath, PYTHON_SCRIPTS.fastdlOptimizer, args)
+    return JSON.parse(stdout)
+  } catch (error) {
+    return { error: String(error.message || error), packs: {} }
+  }
+})
+
+ipcMain.handle('previews:atlas', async (_evt, opts = {}) => {
+  // Hojas de atlas en previews/atlas (zpb://atlas/atlas_N.png) más su índice JSON
+  ensureDirs()
+  const cfg = readCFG()
+  const pythonPath = cfg.pythonPath || 'python'
+  const args = [APP_DIRS.previews]
+  if (opts.thumb) args.push('--thumb', String(opts.thumb))
+  if (opts.repack) args.push('--repack')
+  try {
+    await runPythonScript(pythonPath, PYTHON_SCRIPTS.previewAtlas, args)
+    return JSON.parse(fs.readFileSync(path.join(APP_DIRS.previews, 'atlas', 'atlas.json'), 'utf-8'))
+  } catch (error) {
+    return { error: String(error.message || error), sheets: [], entries: {} }
+  }
+})
+
 ipcMain.handle('scan:sma', async () => {
   ensureDirs()
   const files = walkAll(APP_DIRS.input).filter(f => f.toLowerCase().endsWith('.sma'))
@@ -440,14 +577,21 @@ ipcMain.handle('scan:mdl', async () => {
   ensureDirs()
   const models = walkAll(APP_DIRS.input).filter(f => f.toLowerCase().endsWith('.mdl')).map(m => path.relative(APP_DIRS.input, m))
 
-  // Generate previews for models
-  for (const model of models) {
-    const absPath = path.join(APP_DIRS.input, model)
-    const previewPath = path.join(APP_DIRS.previews, 'models', model.replace('.mdl', '.png'))
-    fse.ensureDirSync(path.dirname(previewPath))
-
-    if (!fs.existsSync(previewPath)) {
-      await generateModelPreview(absPath, previewPath)
+  // Miniaturas renderizadas en lote: un solo proceso y caché por hash del .mdl,
+  // así los modelos sin cambios no se vuelven a renderizar
+  try {
+    const cfg = readCFG()
+    await runPythonScript(cfg.pythonPath || 'python', PYTHON_SCRIPTS.mdl2png, [
+      '--batch', APP_DIRS.input, path.join(APP_DIRS.previews, 'models')
+    ])
+  } catch (error) {
+    console.error('Error generating model previews:', error)
+    for (const model of models) {
+      const previewPath = path.join(APP_DIRS.previews, 'models', model.replace('.mdl', '.png'))
+      if (!fs.existsSync(previewPath)) {
+        fse.ensureDirSync(path.dirname(previewPath))
+        await generateModelPreview(path.join(APP_DIRS.input, model), previewPath)
+      }
     }
   }
 
@@ -750,7 +894,18 @@ ipcMain.handle('build:generate', async (_evt, items) => {
   seedDefaultSystems(APP_DIRS.systems, APP_DIRS.build)
 
   const compiled = []
-  if (cfg.amxxpcPath && fs.existsSync(cfg.amxxpcPath)) {
+  const diagnostics = []
+  const pythonPath = cfg.pythonPath || 'python'
+  const useFarm = fs.existsSync(PYTHON_SCRIPTS.compileFarm) && checkPythonAvailable(pythonPath)
+  if (cfg.amxxpcPath && fs.existsSync(cfg.amxxpcPath) && useFarm) {
+    // Compilación paralela con caché; el reporte JSON llega por stdout aunque falle algún plugin
+    const pluginsDir = path.join(APP_DIRS.build, 'plugins')
+    const report = await runCompileFarm(pythonPath, [path.join(APP_DIRS.build, 'scripting'), '-o', pluginsDir, '--config', APP_DIRS.cfg])
+    for (const result of (report && report.results) || []) {
+      if (result.output && fs.existsSync(result.output)) compiled.push(result.output)
+      for (const d of result.diagnostics || []) diagnostics.push({ source: result.source, ...d })
+    }
+  } else if (cfg.amxxpcPath && fs.existsSync(cfg.amxxpcPath)) {
     const includeFlags = (cfg.includeDirs || []).flatMap(d => ['-i', d])
     const smaFiles = []
     function pushDir(d) {
@@ -776,7 +931,7 @@ ipcMain.handle('build:generate', async (_evt, items) => {
     }
   }
 
-  return { ok: true, problems: [], compiled, cfg: readCFG() }
+  return { ok: true, problems: [], compiled, diagnostics, cfg: readCFG() }
 })
 
 // ------------------- Grouped SMA ------------------------
@@ -0,0 +1,146 @@
+"""Content fingerprints for grouping near-identical plugins.
+
+Every script is reduced to a MinHash signature over shingles of normalized
+tokens. Locality-sensitive hashing (banding) proposes candidate pairs in
+sub-quadratic time and candidates whose estimated Jaccard similarity reaches
+the threshold are merged into the same cluster.
+"""
+from __future__ import annotations
+
+import re
+import zlib
+from typing import TYPE_CHECKING, Dict, List, Sequence
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    import numpy as np
+
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 16
+SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.8
+# Largest prime below 2**32, so every permuted value fits the uint32 signature.
+_HASH_PRIME = 4294967291
+_PERMUTATION_SEED = 1729
+
+_COMMENT_PATTERN = re.compile(r"/\*.*?(?:\*/|\Z)|//[^\n]*", re.DOTALL)
+_TOKEN_PATTERN = re.compile(r"[a-z_][a-z0-9_]*|\d+(?:\.\d+)?|\"[^\"\n]*\"|[^\s\w]")
+
+_permutations_cache: Dict[int, tuple] = {}
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """Lower-case the source, drop comments and split it into tokens."""
+
+    without_comments = _COMMENT_PATTERN.sub(" ", text)
+    return _TOKEN_PATTERN.findall(without_comments.lower())
+
+
+def shingle_hashes(tokens: Sequence[str], size: int = SHINGLE_SIZE) -> List[int]:
+    """Return stable 32-bit hashes of every ``size``-token shingle."""
+
+    if len(tokens) < size:
+        return [zlib.crc32(" ".join(tokens).encode("utf-8"))] if tokens else []
+    return list(
+        {
+            zlib.crc32(" ".join(tokens[index:index + size]).encode("utf-8"))
+            for index in range(len(tokens) - size + 1)
+        }
+    )
+
+
+def _permutations(num_perm: int) -> tuple:
+    import numpy as np
+
+    if num_perm not in _permutations_cache:
+        rng = np.random.default_rng(_PERMUTATION_SEED)
+        a = rng.integers(1, 2**31, size=num_perm, dtype=np.uint64)
+        b = rng.integers(0, 2**32, size=num_perm, dtype=np.uint64)
+        _permutations_cache[num_perm] = (a, b)
+    return _permutations_cache[num_perm]
+
+
+def minhash_signature(text: str, num_perm: int = NUM_PERMUTATIONS) -> np.ndarray:
+    """Compute the MinHash signature of a script's normalized shingles."""
+
+    import numpy as np
+
+    hashes = shingle_hashes(normalize_tokens(text))
+    signature = np.full(num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+    if not hashes:
+        return signature
+
+    a, b = _permutations(num_perm)
+    values = np.asarray(hashes, dtype=np.uint64)
+    # Chunk the shingles so very large files keep a bounded working set.
+    for start in range(0, len(values), 4096):
+        chunk = values[start:start + 4096, None]
+        permuted = (chunk * a + b) % _HASH_PRIME
+        signature = np.minimum(signature, permuted.min(axis=0).astype(np.uint32))
+    return signature
+
+
+def estimate_similarity(left: np.ndarray, right: np.ndarray) -> float:
+    """Estimate the Jaccard similarity of two MinHash signatures."""
+
+    return float((left == right).mean())
+
+
+def _find(parents: List[int], index: int) -> int:
+    while parents[index] != index:
+        parents[index] = parents[parents[index]]
+        index = parents[index]
+    return index
+
+
+def cluster_signatures(
+    signatures: Sequence[np.ndarray],
+    threshold: float = DEFAULT_THRESHOLD,
+    bands: int = LSH_BANDS,
+) -> List[int]:
+    """Group near-duplicate signatures and return one cluster id per input.
+
+    Signatures are split into ``bands`` bands; inputs sharing any band land in
+    the same bucket and become candidate pairs, which are confirmed against
+    ``threshold``. A bucket keeps one member per cluster, so each input is
+    compared once per distinct cluster it collides with and duplicates
+    (identical or empty files) cost one comparison each. Cluster ids are numbered in order of first appearance, so
+    the result is stable for a stable input order.
+    """
+
+    import numpy as np
+
+    count = len(signatures)
+    parents = list(range(count))
+    if count == 0:
+        return []
+
+    matrix = np.vstack(signatures)
+    rows_per_band = matrix.shape[1] // bands
+    for band in range(bands):
+        buckets: Dict[bytes, List[int]] = {}
+        band_slice = matrix[:, band * rows_per_band:(band + 1) * rows_per_band]
+        for index in range(count):
+            key = band_slice[index].tobytes()
+            # One representative per cluster, not just the first member: two
+            # near-duplicates can share a bucket with an unrelated script.
+            representatives: List[int] = []
+            roots = set()
+            for other in buckets.get(key, ()):
+                root_other = _find(parents, other)
+                if root_other in roots:  # merged with another representative since
+                    continue
+                roots.add(root_other)
+                representatives.append(other)
+                root_index = _find(parents, index)
+                if root_other != root_index and estimate_similarity(matrix[other], matrix[index]) >= threshold:
+                    parents[max(root_other, root_index)] = min(root_other, root_index)
+            if not any(_find(parents, other) == _find(parents, index) for other in representatives):
+                representatives.append(index)
+            buckets[key] = representatives
+
+    cluster_ids: Dict[int, int] = {}
+    result: List[int] = []
+    for index in range(count):
+        root = _find(parents, index)
+        result.append(cluster_ids.setdefault(root, len(cluster_ids)))
+    return result
@@ -0,0 +1,345 @@
+"""Export a fitted RandomForest to flat NumPy arrays and evaluate it without scikit-learn.
+
+Loading ``results/randomforest_model.pkl`` means importing scikit-learn and
+unpickling every estimator, which dominates the latency of one-off
+predictions. :func:`export_forest` flattens all trees of the fitted forest
+into one set of contiguous arrays (split feature, threshold, left/right child
+and per-leaf class probabilities, with tree roots at ``roots``) stored in a
+single ``.npz``. :class:`ForestEvaluator` needs only NumPy: it keeps one node
+index per (tree, row), advances all of them one level per step and then sums
+the leaf probabilities tree by tree.
+
+Predictions match ``model.predict`` exactly: rows are cast to float32 before
+being compared with the float64 thresholds, the leaf values are the ones
+``DecisionTreeClassifier.predict_proba`` returns, and the per-tree
+probabilities are accumulated in estimator order before dividing by the
+number of trees, just like a single-threaded ``predict_proba``.
+
+The evaluator is meant for cold starts and small batches (the GUI and query
+tools): it avoids the scikit-learn import entirely. For batches of thousands
+of rows the compiled scikit-learn traversal is still faster; ``benchmark``
+writes both numbers to ``results/forest_benchmark.json``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import subprocess
+import sys
+import time
+import warnings
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Sequence
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+
+ROOT = Path(__file__).resolve().parent
+RESULTS_DIR = Path("results")
+MODEL_PATH = RESULTS_DIR / "randomforest_model.pkl"
+FOREST_PATH = RESULTS_DIR / "randomforest_model.npz"
+FORMAT_VERSION = 1
+DEFAULT_BATCH_SIZES = [1, 64, 1024]
+# Rows evaluated together; bounds the (trees x rows) node-index matrix.
+CHUNK_ROWS = 4096
+
+
+def export_forest(model: RandomForestClassifier, path: Path = FOREST_PATH) -> Path:
+    """Flatten the trees of a fitted single-output forest into ``path``."""
+    import numpy as np
+
+    if getattr(model, "n_outputs_", 1) != 1:
+        raise ValueError("Only single-output forests can be exported")
+
+    n_classes = len(model.classes_)
+    features: List[np.ndarray] = []
+    thresholds: List[np.ndarray] = []
+    lefts: List[np.ndarray] = []
+    rights: List[np.ndarray] = []
+    missing_left: List[np.ndarray] = []
+    values: List[np.ndarray] = []
+    roots: List[int] = []
+    depth = 0
+    offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        count = tree.node_count
+        own = np.arange(offset, offset + count, dtype=np.int64)
+        leaf = tree.children_left == -1
+        # Leaves point at themselves so extra levels leave them in place.
+        lefts.append(np.where(leaf, own, tree.children_left + offset))
+        rights.append(np.where(leaf, own, tree.children_right + offset))
+        features.append(np.where(leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+        mgl = getattr(tree, "missing_go_to_left", None)
+        missing_left.append(np.zeros(count, dtype=bool) if mgl is None else mgl.astype(bool))
+
+        value = np.asarray(tree.value[:, 0, :n_classes], dtype=np.float64)
+        totals = value.sum(axis=1)
+        if not np.allclose(totals[leaf], 1.0):
+            # Older scikit-learn stores weighted counts and normalizes in predict_proba.
+            totals[totals == 0] = 1.0
+            value = value / totals[:, None]
+        values.append(value)
+
+        roots.append(offset)
+        depth = max(depth, int(tree.max_depth))
+        offset += count
+
+    columns = getattr(model, "feature_names_in_", None)
+    if columns is None:
+        columns = [f"x{index}" for index in range(model.n_features_in_)]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("wb") as handle:
+        np.savez(
+            handle,
+            format_version=np.int32(FORMAT_VERSION),
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            missing_left=np.concatenate(missing_left),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int64),
+            max_depth=np.int32(depth),
+            classes=np.asarray([str(label) for label in model.classes_]),
+            feature_columns=np.asarray([str(column) for column in columns]),
+        )
+    tmp_path.replace(path)
+    return path
+
+
+class ForestEvaluator:
+    """Batch evaluator over the arrays written by :func:`export_forest`."""
+
+    def __init__(self, arrays: dict) -> None:
+        version = int(arrays["format_version"])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported forest format version {version}")
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.missing_left = arrays["missing_left"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.max_depth = int(arrays["max_depth"])
+        self.classes = arrays["classes"]
+        self.feature_columns = [str(column) for column in arrays["feature_columns"]]
+        self.has_missing = bool(self.missing_left.any())
+
+    @classmethod
+    def load(cls, path: Path = FOREST_PATH) -> "ForestEvaluator":
+        import numpy as np
+
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files})
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    def _matrix(self, X: object) -> np.ndarray:
+        import numpy as np
+
+        if hasattr(X, "reindex"):  # DataFrame: align to the training columns
+            X = X.reindex(columns=self.feature_columns, fill_value=0)
+        matrix = np.ascontiguousarray(X, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[1] != len(self.feature_columns):
+            raise ValueError(
+                f"Expected {len(self.feature_columns)} features, got shape {matrix.shape}"
+            )
+        return matrix
+
+    def leaves(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node index reached by every (tree, row) pair."""
+        import numpy as np
+
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        nodes = np.repeat(self.roots, n_rows)
+        offsets = np.tile(np.arange(n_rows, dtype=np.int64) * n_features, len(self.roots))
+        # Only pairs still on an internal node are advanced at each level.
+        active = np.flatnonzero(self.left[nodes] != nodes)
+        for _ in range(self.max_depth):
+            if not len(active):
+                break
+            current = nodes[active]
+            x = flat[offsets[active] + self.feature[current]]
+            go_left = x <= self.threshold[current]
+            if self.has_missing:
+                go_left |= np.isnan(x) & self.missing_left[current]
+            current = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = current
+            active = active[self.left[current] != current]
+        return nodes.reshape(len(self.roots), n_rows)
+
+    def predict_proba(self, X: object) -> np.ndarray:
+        import numpy as np
+
+        matrix = self._matrix(X)
+        proba = np.zeros((matrix.shape[0], len(self.classes)), dtype=np.float64)
+        for start in range(0, matrix.shape[0], CHUNK_ROWS):
+            chunk = proba[start:start + CHUNK_ROWS]
+            # Sequential accumulation keeps the floating-point sums bit-identical.
+            for tree_leaves in self.leaves(matrix[start:start + CHUNK_ROWS]):
+                chunk += self.value[tree_leaves]
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X: object) -> np.ndarray:
+        import numpy as np
+
+        return self.classes.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+def load_forest(path: Path = FOREST_PATH) -> ForestEvaluator:
+    return ForestEvaluator.load(path)
+
+
+STARTUP_PROBES = {
+    "sklearn": (
+        "import sys, joblib, numpy as np\n"
+        "model = joblib.load(sys.argv[1])\n"
+        "model.predict(np.zeros((1, model.n_features_in_), dtype=np.float32))\n"
+    ),
+    "numpy": (
+        "import sys\n"
+        "sys.path.insert(0, sys.argv[3])\n"
+        "import numpy as np\n"
+        "from forest_export import load_forest\n"
+        "forest = load_forest(sys.argv[2])\n"
+        "forest.predict(np.zeros((1, len(forest.feature_columns)), dtype=np.float32))\n"
+    ),
+}
+
+
+def measure_startup(model_path: Path, forest_path: Path, repeats: int) -> dict:
+    """Best wall time of a fresh interpreter that loads the model and predicts one row."""
+    timings = {}
+    for name, probe in STARTUP_PROBES.items():
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable, "-c", probe, str(model_path), str(forest_path), str(ROOT)],
+                check=True,
+            )
+            best = min(best, time.perf_counter() - start)
+        timings[name] = round(best * 1000, 1)
+    return timings
+
+
+def benchmark_features(columns: Sequence[str], dataset_path: Optional[Path] = None) -> np.ndarray:
+    """Feature rows built from the exported dataset with the training pipeline."""
+    import train_baseline
+
+    args = argparse.Namespace(dataset_path=dataset_path, no_parquet=False)
+    frame = train_baseline.read_dataset(train_baseline.detect_dataset_path(args))
+    frame = train_baseline.fill_missing_values(train_baseline.ensure_list_columns(frame))
+    features = train_baseline.build_feature_columns(frame)
+    return features.reindex(columns=list(columns), fill_value=0).to_numpy(dtype="float32")
+
+
+def run_benchmark(
+    model_path: Path,
+    forest_path: Path,
+    batch_sizes: Sequence[int],
+    repeats: int,
+    dataset_path: Optional[Path] = None,
+) -> dict:
+    import joblib
+    import numpy as np
+
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    model = joblib.load(model_path)
+    forest = load_forest(forest_path)
+    base = benchmark_features(forest.feature_columns, dataset_path)
+    rows = []
+    for size in batch_sizes:
+        X = np.resize(base, (size, base.shape[1]))
+        expected = model.predict(X)
+        actual = forest.predict(X)
+        timings = {}
+        for name, predict in (("sklearn", model.predict), ("numpy", forest.predict)):
+            best = float("inf")
+            for _ in range(repeats):
+                start = time.perf_counter()
+                predict(X)
+                best = min(best, time.perf_counter() - start)
+            timings[name] = round(best * 1000, 3)
+        rows.append(
+            {
+                "batch_size": size,
+                "sklearn_ms": timings["sklearn"],
+                "numpy_ms": timings["numpy"],
+                "identical": bool(np.array_equal(expected.astype(str), actual)),
+                "max_proba_diff": float(
+                    np.abs(model.predict_proba(X) - forest.predict_proba(X)).max()
+                ),
+            }
+        )
+    return {
+        "n_estimators": forest.n_estimators,
+        "max_depth": forest.max_depth,
+        "nodes": int(len(forest.feature)),
+        "startup_ms": measure_startup(model_path, forest_path, repeats),
+        "batches": rows,
+    }
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Export the RandomForest to NumPy arrays and benchmark the evaluator."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export = subparsers.add_parser("export", help="Flatten a pickled forest into an .npz file.")
+    export.add_argument("--model", type=Path, default=MODEL_PATH, help="Pickled model path.")
+    export.add_argument("--output", type=Path, default=FOREST_PATH, help="Exported forest path.")
+
+    bench = subparsers.add_parser("benchmark", help="Compare startup and batch latency with sklearn.")
+    bench.add_argument("--model", type=Path, default=MODEL_PATH, help="Pickled model path.")
+    bench.add_argument("--forest", type=Path, default=FOREST_PATH, help="Exported forest path.")
+    bench.add_argument(
+        "--batch-sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_BATCH_SIZES,
+        help="Rows per predict call.",
+    )
+    bench.add_argument("--dataset-path", type=Path, default=None, help="Dataset used for the rows.")
+    bench.add_argument("--repeats", type=int, default=5, help="Runs per measurement (best is kept).")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    args = parse_args(argv)
+    if args.command == "export":
+        import joblib
+
+        path = export_forest(joblib.load(args.model), args.output)
+        logging.info("Exported forest to %s", path)
+        return 0
+
+    if not args.forest.exists():
+        import joblib
+
+        export_forest(joblib.load(args.model), args.forest)
+    report = run_benchmark(
+        args.model, args.forest, args.batch_sizes, args.repeats, args.dataset_path
+    )
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    report_path = RESULTS_DIR / "forest_benchmark.json"
+    report_path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    print(json.dumps(report, indent=2))
+    logging.info("Saved benchmark report to %s", report_path)
+    return 0 if all(row["identical"] for row in report["batches"]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
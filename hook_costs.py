@@ -0,0 +1,332 @@
+"""Static per-frame cost analysis for plugin hooks and timers.
+
+Every ``RegisterHam``/``register_forward``/``register_event`` hook,
+``set_task`` timer and engine-called public (``client_PreThink``,
+``server_frame``...) is extracted with its handler, interval and repeat
+flags. Each site gets an estimated call rate for a given player count and
+server frame rate; weighting it by the handler's body size gives a load
+score that ranks which plugins in a pack are most likely to cost server
+tick time. The rates are static estimates, not measurements.
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import re
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from call_parser import mask_comments, match_braces, scan_calls
+
+ROOT = Path(__file__).resolve().parent
+INPUT_DIR = ROOT / "input"
+
+DEFAULT_PLAYERS = 32
+DEFAULT_TICKRATE = 100.0
+UNKNOWN_INTERVAL = 1.0
+UNKNOWN_EVENT_RATE = 0.1
+
+# Scopes: how a hook's call rate scales.
+#   player_frame - once per player per server frame
+#   player_pair  - once per player per visible player per frame
+#   frame        - once per server frame
+#   player_event - ``rate`` times per player per second
+#   event        - ``rate`` times per second for the whole server
+HOOK_RATES: Dict[str, tuple[str, float]] = {
+    "FM_PlayerPreThink": ("player_frame", 1.0),
+    "FM_PlayerPostThink": ("player_frame", 1.0),
+    "FM_CmdStart": ("player_frame", 1.0),
+    "FM_UpdateClientData": ("player_frame", 1.0),
+    "FM_TraceLine": ("player_frame", 1.0),
+    "FM_AddToFullPack": ("player_pair", 1.0),
+    "FM_CheckVisibility": ("player_pair", 1.0),
+    "FM_StartFrame": ("frame", 1.0),
+    "FM_Think": ("frame", 10.0),
+    "FM_Touch": ("player_event", 5.0),
+    "FM_EmitSound": ("player_event", 2.0),
+    "FM_SetModel": ("player_event", 0.5),
+    "FM_ClientDisconnect": ("event", 0.01),
+    "FM_Spawn": ("event", 0.1),
+    "Ham_Player_PreThink": ("player_frame", 1.0),
+    "Ham_Player_PostThink": ("player_frame", 1.0),
+    "Ham_Player_UpdateClientData": ("player_frame", 1.0),
+    "Ham_Player_ResetMaxSpeed": ("player_event", 1.0),
+    "Ham_Think": ("frame", 1.0),
+    "Ham_Touch": ("player_event", 5.0),
+    "Ham_TraceAttack": ("player_event", 5.0),
+    "Ham_TakeDamage": ("player_event", 1.0),
+    "Ham_Killed": ("player_event", 0.05),
+    "Ham_Spawn": ("player_event", 0.02),
+    "Ham_Use": ("player_event", 0.1),
+    "Ham_Item_Deploy": ("player_event", 0.2),
+    "client_PreThink": ("player_frame", 1.0),
+    "client_PostThink": ("player_frame", 1.0),
+    "server_frame": ("frame", 1.0),
+    "event": ("player_event", 0.5),
+    "message": ("player_event", 0.5),
+    "logevent": ("event", 0.02),
+    "think": ("frame", 1.0),
+    "touch": ("player_event", 1.0),
+}
+PER_FRAME_SCOPES = ("player_frame", "player_pair", "frame")
+
+HOOK_FUNCTIONS = {
+    "RegisterHam": "ham",
+    "RegisterHamBots": "ham",
+    "RegisterHamFromEntity": "ham",
+    "register_forward": "forward",
+    "register_event": "event",
+    "register_logevent": "logevent",
+    "register_message": "message",
+    "register_think": "think",
+    "register_touch": "touch",
+    "set_task": "timer",
+}
+HANDLER_POSITIONS = {
+    "RegisterHam": 2,
+    "RegisterHamBots": 1,
+    "RegisterHamFromEntity": 2,
+    "register_forward": 1,
+    "register_event": 1,
+    "register_logevent": 0,
+    "register_message": 1,
+    "register_think": 1,
+    "register_touch": 2,
+}
+NAMED_BY_KIND = ("event", "logevent", "message", "think", "touch")
+ENGINE_PUBLICS = ("client_PreThink", "client_PostThink", "server_frame")
+
+_PUBLIC_PATTERN = re.compile(r"^[ \t]*public\s+([A-Za-z_]\w*)\s*\(", re.MULTILINE)
+_PLAYER_ARG_PATTERN = re.compile(r"\b(?:id|player|victim|attacker|target|index)\b")
+_NUMBER_PATTERN = re.compile(r"^-?\d+(?:\.\d+)?$")
+
+
+@dataclass
+class HookSite:
+    """A hook or timer registration found in a plugin."""
+
+    kind: str
+    name: str
+    handler: Optional[str]
+    line: int
+    scope: str
+    interval: Optional[float] = None
+    repeat: Optional[str] = None
+    per_player: bool = False
+    handler_lines: int = 1
+    calls_per_second: float = 0.0
+    load_score: float = 0.0
+
+
+def unquote(arg: str) -> Optional[str]:
+    if len(arg) >= 2 and arg.startswith('"') and arg.endswith('"'):
+        return arg[1:-1]
+    return None
+
+
+def handler_sizes(text: str) -> Dict[str, int]:
+    """Map every public function to the number of lines in its body."""
+
+    sizes: Dict[str, int] = {}
+    closes = match_braces(text, skip_quotes=False)
+    newlines = [match.start() for match in re.finditer("\n", text)]
+    brace = -1
+    for match in _PUBLIC_PATTERN.finditer(text):
+        if brace < match.end():  # publics without a body share the next brace
+            brace = text.find("{", match.end())
+            if brace < 0:
+                break
+        lines = bisect.bisect_left(newlines, closes[brace]) - bisect.bisect_left(newlines, brace)
+        sizes[match.group(1)] = max(1, lines)
+    return sizes
+
+
+def estimate_rate(scope: str, rate: float, players: int, tickrate: float) -> float:
+    if scope == "player_frame":
+        return players * tickrate * rate
+    if scope == "player_pair":
+        return players * players * tickrate * rate
+    if scope == "frame":
+        return tickrate * rate
+    if scope == "player_event":
+        return players * rate
+    return rate
+
+
+def _timer_site(args: List[str], line: int) -> HookSite:
+    interval = float(args[0]) if args and _NUMBER_PATTERN.match(args[0]) else None
+    flags = unquote(args[5]) if len(args) > 5 else None
+    repeat = flags if flags in ("a", "b") else None
+    per_player = len(args) > 2 and bool(_PLAYER_ARG_PATTERN.search(args[2]))
+    return HookSite(
+        kind="timer",
+        name="set_task",
+        handler=unquote(args[1]) if len(args) > 1 else None,
+        line=line,
+        scope="timer",
+        interval=interval,
+        repeat=repeat,
+        per_player=per_player,
+    )
+
+
+def _hook_site(function: str, args: List[str], line: int) -> HookSite:
+    kind = HOOK_FUNCTIONS[function]
+    position = HANDLER_POSITIONS[function]
+    handler = unquote(args[position]) if position < len(args) else None
+    name = args[0] if args else function
+    if kind in NAMED_BY_KIND:
+        name = unquote(name) or name
+        scope = HOOK_RATES[kind][0]
+    else:
+        scope = HOOK_RATES.get(name, ("player_event", UNKNOWN_EVENT_RATE))[0]
+    return HookSite(kind=kind, name=name, handler=handler, line=line, scope=scope)
+
+
+def analyze_text(
+    text: str,
+    players: int = DEFAULT_PLAYERS,
+    tickrate: float = DEFAULT_TICKRATE,
+) -> List[HookSite]:
+    """Extract every hook/timer site of a script with its estimated cost."""
+
+    masked = mask_comments(text)
+    sizes = handler_sizes(masked)
+    sites: List[HookSite] = []
+
+    for call in scan_calls(masked, HOOK_FUNCTIONS):
+        if call.name == "set_task":
+            sites.append(_timer_site(call.raw_args, call.line))
+        else:
+            sites.append(_hook_site(call.name, call.raw_args, call.line))
+
+    for name in ENGINE_PUBLICS:
+        if name in sizes:
+            line = masked.count("\n", 0, masked.find(f"public {name}")) + 1
+            sites.append(
+                HookSite(kind="public", name=name, handler=name, line=line, scope=HOOK_RATES[name][0])
+            )
+
+    for site in sites:
+        site.handler_lines = sizes.get(site.handler or "", 1)
+        if site.kind == "timer":
+            if site.repeat is None:
+                continue
+            calls = 1.0 / (site.interval or UNKNOWN_INTERVAL)
+            site.calls_per_second = calls * (players if site.per_player else 1)
+        else:
+            key = site.kind if site.kind in NAMED_BY_KIND else site.name
+            _, rate = HOOK_RATES.get(key, (site.scope, UNKNOWN_EVENT_RATE))
+            site.calls_per_second = estimate_rate(site.scope, rate, players, tickrate)
+        site.load_score = site.calls_per_second * site.handler_lines
+
+    return sites
+
+
+COST_COLUMNS = (
+    "hook_count",
+    "timer_count",
+    "repeating_timer_count",
+    "per_frame_hook_count",
+    "est_calls_per_sec",
+    "est_load_score",
+)
+
+
+def cost_columns(sites: Sequence[HookSite]) -> Dict[str, float]:
+    """Summarize hook sites into the per-plugin dataset columns."""
+
+    timers = [site for site in sites if site.kind == "timer"]
+    hooks = [site for site in sites if site.kind != "timer"]
+    return {
+        "hook_count": len(hooks),
+        "timer_count": len(timers),
+        "repeating_timer_count": sum(1 for site in timers if site.repeat),
+        "per_frame_hook_count": sum(1 for site in hooks if site.scope in PER_FRAME_SCOPES),
+        "est_calls_per_sec": round(sum((site.calls_per_second for site in sites), 0.0), 3),
+        "est_load_score": round(sum((site.load_score for site in sites), 0.0), 3),
+    }
+
+
+def rank_plugins(
+    paths: Iterable[Path],
+    players: int = DEFAULT_PLAYERS,
+    tickrate: float = DEFAULT_TICKRATE,
+) -> List[dict]:
+    """Analyze every script and rank them by estimated load score."""
+
+    report: List[dict] = []
+    for path in paths:
+        text = path.read_text(encoding="utf-8", errors="ignore")
+        sites = analyze_text(text, players, tickrate)
+        if not sites:
+            continue
+        top_sites = sorted(sites, key=lambda site: site.load_score, reverse=True)
+        entry = {"file": str(path), **cost_columns(sites)}
+        entry["top_sites"] = [asdict(site) for site in top_sites[:5]]
+        report.append(entry)
+    report.sort(key=lambda entry: entry["est_load_score"], reverse=True)
+    return report
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Rank plugins by estimated per-frame hook and timer cost"
+    )
+    parser.add_argument(
+        "paths",
+        type=Path,
+        nargs="*",
+        default=[INPUT_DIR],
+        help="Archivos .sma o directorios de un pack (por defecto input/)",
+    )
+    parser.add_argument("--players", type=int, default=DEFAULT_PLAYERS, help="Jugadores conectados")
+    parser.add_argument(
+        "--tickrate",
+        type=float,
+        default=DEFAULT_TICKRATE,
+        help="Frames por segundo del servidor (sys_ticrate)",
+    )
+    parser.add_argument("--top", type=int, default=20, help="Cantidad de plugins a mostrar")
+    parser.add_argument("--json", action="store_true", help="Imprime el reporte completo en JSON")
+    return parser.parse_args(argv)
+
+
+def iter_sma_files(paths: Iterable[Path]) -> List[Path]:
+    files: List[Path] = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(path.rglob("*.sma")))
+        elif path.suffix.lower() == ".sma":
+            files.append(path)
+    return files
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    report = rank_plugins(iter_sma_files(args.paths), args.players, args.tickrate)[: args.top]
+    if args.json:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        sys.stdout.write("\n")
+        return
+
+    print(f"Costo estimado con {args.players} jugadores a {args.tickrate:g} fps")
+    print(f"{'score':>12} {'calls/s':>10} {'frame':>5} {'timers':>6}  plugin")
+    for entry in report:
+        print(
+            f"{entry['est_load_score']:>12.1f} {entry['est_calls_per_sec']:>10.1f} "
+            f"{entry['per_frame_hook_count']:>5} {entry['repeating_timer_count']:>6}  "
+            f"{Path(entry['file']).name}"
+        )
+        for site in entry["top_sites"][:3]:
+            print(
+                f"{'':>12} {site['calls_per_second']:>10.1f}   -> {site['name']} "
+                f"({site['handler']}, línea {site['line']})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+"""Precache budget and download-size analysis for a plugin set.
+
+Every ``precache_model``/``precache_sound``/``precache_generic`` call (and
+their ``engfunc(EngFunc_Precache*)`` forms) is attributed to its plugin and
+resolved to a file under the pack's ``cstrike/`` tree. Arguments that are
+constants are resolved through the plugin's ``new const``/``#define``
+strings; calls fed from runtime arrays fall back to the plugin's literal
+asset paths of the matching type and are marked as inferred.
+
+:class:`PrecacheBudget` keeps reference counts per asset so enabling or
+disabling a plugin updates the unique counts and total bytes in time
+proportional to that plugin's assets, which lets the GUI evaluate toggles
+instantly (see ``--serve``).
+
+Plugins are keyed by their path relative to the pack, since packs often
+carry the same ``.sma`` in more than one directory. Toggles accept either
+that key or the bare plugin name, which selects every copy.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+from collections import Counter
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from call_parser import mask_comments, scan_calls
+
+ROOT = Path(__file__).resolve().parent
+INPUT_DIR = ROOT / "input"
+
+# GoldSrc engine limits (MAX_MODELS, MAX_SOUNDS, MAX_GENERIC). Models and
+# sprites share the model table.
+PRECACHE_LIMITS = {"model": 512, "sound": 512, "generic": 512}
+# Slots already taken by the map, the game DLL and the default CS assets.
+DEFAULT_RESERVED = {"model": 120, "sound": 140, "generic": 0}
+WARN_RATIO = 0.9
+
+PRECACHE_FUNCTIONS = {
+    "precache_model": "model",
+    "precache_sound": "sound",
+    "precache_generic": "generic",
+}
+ENGFUNC_KINDS = {
+    "EngFunc_PrecacheModel": "model",
+    "EngFunc_PrecacheSound": "sound",
+    "EngFunc_PrecacheGeneric": "generic",
+}
+INFERRED_EXTENSIONS = {
+    "model": (".mdl", ".spr"),
+    "sound": (".wav",),
+    "generic": (".mp3",),
+}
+
+_CONST_PATTERN = re.compile(
+    r"\b(?:new|static)\s+(?:const\s+)?([A-Za-z_]\w*)(?:\s*\[[^\]\n]*\])+\s*=\s*(\{[^}]*\}|\"[^\"\n]*\")"
+)
+_DEFINE_PATTERN = re.compile(r"^[ \t]*#define\s+([A-Za-z_]\w*)\s+\"([^\"\n]*)\"", re.MULTILINE)
+_STRING_PATTERN = re.compile(r'"([^"\n]*)"')
+_IDENTIFIER_PATTERN = re.compile(r"^([A-Za-z_]\w*)\s*(?:\[.*\])?$")
+
+
+@dataclass(frozen=True)
+class PrecacheEntry:
+    """One asset precached by a plugin."""
+
+    plugin: str
+    kind: str
+    path: str
+    line: int
+    source: str  # literal | constant | inferred
+
+
+def string_constants(masked: str) -> Dict[str, List[str]]:
+    """Collect string constants (scalars and arrays) declared in a script."""
+
+    constants: Dict[str, List[str]] = {}
+    for match in _CONST_PATTERN.finditer(masked):
+        constants[match.group(1)] = _STRING_PATTERN.findall(match.group(2))
+    for match in _DEFINE_PATTERN.finditer(masked):
+        constants[match.group(1)] = [match.group(2)]
+    return constants
+
+
+def asset_relpath(kind: str, raw: str) -> str:
+    """Return the game-directory relative path the engine loads for ``raw``."""
+
+    path = raw.replace("\\", "/").lstrip("/")
+    if kind == "sound" and not path.lower().startswith("sound/"):
+        path = f"sound/{path}"
+    return path
+
+
+def extract_precaches(text: str, plugin: str) -> List[PrecacheEntry]:
+    """Extract every precache call of a script with its resolved asset paths."""
+
+    masked = mask_comments(text)
+    constants = string_constants(masked)
+    entries: Dict[tuple, PrecacheEntry] = {}
+    unresolved_kinds = set()
+
+    def add(kind: str, raw: str, line: int, source: str) -> None:
+        if "%" in raw or not raw.rsplit("/", 1)[-1].split(".", 1)[0]:
+            return
+        path = asset_relpath(kind, raw)
+        entries.setdefault((kind, path.lower()), PrecacheEntry(plugin, kind, path, line, source))
+
+    for call in scan_calls(masked, [*PRECACHE_FUNCTIONS, "engfunc"]):
+        args = call.raw_args
+        if call.name == "engfunc":
+            kind = ENGFUNC_KINDS.get(args[0]) if args else None
+            args = args[1:]
+        else:
+            kind = PRECACHE_FUNCTIONS[call.name]
+        if kind is None or not args:
+            continue
+        line = call.line
+        argument = args[0]
+        literal = _STRING_PATTERN.fullmatch(argument)
+        identifier = _IDENTIFIER_PATTERN.match(argument)
+        if literal:
+            add(kind, literal.group(1), line, "literal")
+        elif identifier and identifier.group(1) in constants:
+            for value in constants[identifier.group(1)]:
+                add(kind, value, line, "constant")
+        else:
+            unresolved_kinds.add(kind)
+
+    # Runtime values (loop variables filled from settings arrays) default to
+    # the plugin's own literal asset strings of the same type.
+    if unresolved_kinds:
+        line_starts = [0] + [index + 1 for index, char in enumerate(masked) if char == "\n"]
+        for match in _STRING_PATTERN.finditer(masked):
+            value = match.group(1)
+            lower = value.lower()
+            for kind in unresolved_kinds:
+                if lower.endswith(INFERRED_EXTENSIONS[kind]):
+                    line = _line_for_offset(line_starts, match.start())
+                    add(kind, value, line, "inferred")
+    return list(entries.values())
+
+
+def _line_for_offset(line_starts: Sequence[int], offset: int) -> int:
+    import bisect
+
+    return bisect.bisect_right(line_starts, offset)
+
+
+def find_game_root(path: Path) -> Optional[Path]:
+    """Return the ``cstrike/`` directory that contains ``path``."""
+
+    for parent in path.resolve().parents:
+        if parent.name.lower() == "cstrike" or (parent / "addons").is_dir():
+            return parent
+    return None
+
+
+@lru_cache(maxsize=None)
+def _casefold_index(game_root: str) -> Dict[str, str]:
+    index: Dict[str, str] = {}
+    for directory, _, files in os.walk(game_root):
+        for name in files:
+            full = os.path.join(directory, name)
+            index[os.path.relpath(full, game_root).replace(os.sep, "/").lower()] = full
+    return index
+
+
+@lru_cache(maxsize=None)
+def asset_size(game_root: str, relpath: str) -> Optional[int]:
+    """Size in bytes of an asset in the pack, ``None`` when it is not shipped.
+
+    Results are cached, so each asset is stat'ed once however many plugins
+    precache it. Packs built on Windows often differ in case, so a miss falls
+    back to a case-insensitive lookup.
+    """
+
+    try:
+        return os.stat(os.path.join(game_root, relpath)).st_size
+    except OSError:
+        match = _casefold_index(game_root).get(relpath.lower())
+        if match is None:
+            return None
+        return os.stat(match).st_size
+
+
+class PrecacheBudget:
+    """Incremental precache counts and download size for a plugin subset."""
+
+    def __init__(
+        self,
+        plugins: Dict[str, Sequence[PrecacheEntry]],
+        game_root: Optional[Path],
+        *,
+        limits: Optional[Dict[str, int]] = None,
+        reserved: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.plugins = {name: list(entries) for name, entries in plugins.items()}
+        self.aliases: Dict[str, List[str]] = {}
+        for name in self.plugins:
+            self.aliases.setdefault(plugin_name(name), []).append(name)
+        self.game_root = str(game_root) if game_root else None
+        self.limits = dict(limits or PRECACHE_LIMITS)
+        self.reserved = dict(reserved or DEFAULT_RESERVED)
+        self.enabled: set[str] = set()
+        self._refcounts: Counter = Counter()
+        self.counts: Counter = Counter()
+        self.bytes = 0
+        self.missing: Counter = Counter()
+
+    def _size(self, entry: PrecacheEntry) -> Optional[int]:
+        if self.game_root is None:
+            return None
+        return asset_size(self.game_root, entry.path)
+
+    def _apply(self, entry: PrecacheEntry, delta: int) -> None:
+        key = (entry.kind, entry.path.lower())
+        before = self._refcounts[key]
+        self._refcounts[key] = before + delta
+        if (before == 0) == (delta > 0):  # 0 -> 1 or 1 -> 0
+            self.counts[entry.kind] += delta
+            size = self._size(entry)
+            if size is None:
+                self.missing[key] += delta
+            else:
+                self.bytes += size * delta
+        if self._refcounts[key] == 0:
+            del self._refcounts[key]
+            self.missing.pop(key, None)
+
+    def resolve(self, plugin: str) -> List[str]:
+        """Keys matching a plugin key or bare name (every copy of that name)."""
+
+        if plugin in self.plugins:
+            return [plugin]
+        return self.aliases.get(plugin, [])
+
+    def collisions(self) -> Dict[str, List[str]]:
+        return {name: keys for name, keys in sorted(self.aliases.items()) if len(keys) > 1}
+
+    def enable(self, plugin: str) -> None:
+        for key in self.resolve(plugin):
+            if key in self.enabled:
+                continue
+            self.enabled.add(key)
+            for entry in self.plugins[key]:
+                self._apply(entry, 1)
+
+    def disable(self, plugin: str) -> None:
+        for key in self.resolve(plugin):
+            if key not in self.enabled:
+                continue
+            self.enabled.discard(key)
+            for entry in self.plugins[key]:
+                self._apply(entry, -1)
+
+    def set_enabled(self, plugins: Iterable[str]) -> None:
+        wanted = {key for plugin in plugins for key in self.resolve(plugin)}
+        for plugin in sorted(self.enabled - wanted):
+            self.disable(plugin)
+        for plugin in sorted(wanted - self.enabled):
+            self.enable(plugin)
+
+    def warnings(self) -> List[str]:
+        messages: List[str] = []
+        for name, keys in self.collisions().items():
+            messages.append(f"{name}: {len(keys)} plugins con el mismo nombre ({', '.join(keys)})")
+        for kind, limit in self.limits.items():
+            used = self.counts[kind] + self.reserved.get(kind, 0)
+            if used > limit:
+                messages.append(f"{kind}: {used}/{limit} precaches, excede el límite del motor")
+            elif used >= limit * WARN_RATIO:
+                messages.append(f"{kind}: {used}/{limit} precaches, cerca del límite del motor")
+        return messages
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "enabled_plugins": len(self.enabled),
+            "counts": {kind: self.counts[kind] for kind in self.limits},
+            "reserved": self.reserved,
+            "limits": self.limits,
+            "download_bytes": self.bytes,
+            "missing_assets": sorted(path for _, path in self.missing),
+            "name_collisions": self.collisions(),
+            "warnings": self.warnings(),
+            "over_limit": any(
+                self.counts[kind] + self.reserved.get(kind, 0) > limit
+                for kind, limit in self.limits.items()
+            ),
+        }
+
+
+def plugin_name(key: str) -> str:
+    """Bare plugin name (file stem) of a pack-relative plugin key."""
+
+    return key.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+
+
+def load_pack(pack_dir: Path) -> tuple[Dict[str, List[PrecacheEntry]], Optional[Path]]:
+    """Extract the precaches of every ``.sma`` in a pack, keyed by pack-relative path."""
+
+    plugins: Dict[str, List[PrecacheEntry]] = {}
+    game_root: Optional[Path] = None
+    for path in sorted(pack_dir.rglob("*.sma")):
+        text = path.read_text(encoding="utf-8", errors="ignore")
+        key = path.relative_to(pack_dir).as_posix()
+        plugins[key] = extract_precaches(text, key)
+        if game_root is None:
+            game_root = find_game_root(path)
+    return plugins, game_root
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Presupuesto de precache y tamaño de descarga")
+    parser.add_argument("pack", type=Path, nargs="?", default=INPUT_DIR, help="Directorio del pack")
+    parser.add_argument(
+        "--plugins",
+        nargs="+",
+        default=None,
+        help="Plugins habilitados (nombre sin .sma o ruta relativa al pack); por defecto, todos",
+    )
+    parser.add_argument("--disable", nargs="+", default=[], help="Plugins a excluir")
+    parser.add_argument(
+        "--reserved",
+        type=json.loads,
+        default=None,
+        help='Slots ya ocupados por el juego, p. ej. \'{"model": 120, "sound": 140}\'',
+    )
+    parser.add_argument("--details", action="store_true", help="Incluye los assets por plugin")
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Lee toggles JSON por stdin ({\"enable\": [...], \"disable\": [...]}) y responde con el resumen",
+    )
+    return parser.parse_args(argv)
+
+
+def serve(budget: PrecacheBudget) -> None:
+    """Answer one JSON summary line per JSON toggle line read from stdin."""
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+            if "set" in request:
+                budget.set_enabled(request["set"])
+            for plugin in request.get("disable", []):
+                budget.disable(plugin)
+            for plugin in request.get("enable", []):
+                budget.enable(plugin)
+            response = budget.summary()
+        except (ValueError, TypeError, AttributeError) as exc:
+            response = {"error": str(exc)}
+        sys.stdout.write(json.dumps(response, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    plugins, game_root = load_pack(args.pack)
+    budget = PrecacheBudget(plugins, game_root, reserved=args.reserved)
+    selected = args.plugins if args.plugins is not None else list(plugins)
+    budget.set_enabled(selected)
+    for name in args.disable:
+        budget.disable(name)
+
+    if args.serve:
+        serve(budget)
+        return 0
+
+    report = budget.summary()
+    if args.details:
+        report["plugins"] = {
+            name: [asdict(entry) for entry in plugins[name]]
+            for name in sorted(budget.enabled)
+            if plugins[name]
+        }
+    json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write("\n")
+    for message in report["warnings"]:
+        print(f"Advertencia: {message}", file=sys.stderr)
+    return 2 if report["over_limit"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,5 +14,11 @@ contextBridge.exposeInMainWorld('zpb', {
   detectZP: () => ipcRenderer.invoke('detect:zp50'),
   detectPython: () => ipcRenderer.invoke('detect:python'),
   setConfig: (cfg) => ipcRenderer.invoke('cfg:set', cfg),
-  getConfig: () => ipcRenderer.invoke('cfg:get')
+  getConfig: () => ipcRenderer.invoke('cfg:get'),
+  queryStore: (filters) => ipcRenderer.invoke('store:query', filters),
+  searchCode: (query) => ipcRenderer.invoke('code:search', query),
+  queryService: (endpoint, body) => ipcRenderer.invoke('service:request', endpoint, body),
+  assetCatalog: () => ipcRenderer.invoke('assets:catalog'),
+  optimizeFastDL: (opts) => ipcRenderer.invoke('fastdl:optimize', opts),
+  previewAtlas: (opts) => ipcRenderer.invoke('previews:atlas', opts)
 })
@@ -0,0 +1,514 @@
+"""Long-running local query service over the dataset and the trained model.
+
+Starting ``train_baseline.py`` or ``record_store.py`` for every question the
+GUI asks pays for the pandas import, the dataset read and the model load each
+time. This service does that once and answers over HTTP on localhost:
+
+``GET /stats``
+    Row count, rows per ``entity_type``, stat ranges, model and reload info.
+``GET /lookup?file=<file>``
+    The dataset record for one ``file`` value.
+``POST /filter`` ``{"type", "where": [...], "uses": [...], "limit"}``
+    Same filter syntax as ``record_store.py query`` (``stat_speed>300``,
+    ``paths_sprites=sprites/lgtning.spr``), answered from memory.
+``POST /classify`` ``{"files": [...], "records": [...], "sma": [...]}``
+    Predicted ``entity_type`` and class probabilities for dataset rows, raw
+    records or ``.sma`` paths parsed on the fly.
+
+Predictions use the NumPy forest export (``results/randomforest_model.npz``)
+so the service never imports scikit-learn. Concurrent classify requests are
+queued and evaluated together by :class:`MicroBatcher`: the worker takes
+everything that arrives within ``--batch-wait-ms`` of the first request (up
+to ``--max-batch`` rows) and runs a single ``predict_proba``. A watcher thread
+polls the size and mtime of the dataset and the model and swaps in a freshly
+loaded :class:`ServiceState` when either changes; requests in flight keep the
+state they started with.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import operator
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlparse
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    import numpy as np
+    import pandas as pd
+
+    from forest_export import ForestEvaluator
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_POLL_SECONDS = 2.0
+DEFAULT_BATCH_WAIT_MS = 2.0
+DEFAULT_MAX_BATCH = 512
+# Pending connections the listening socket accepts before resetting new ones;
+# the socketserver default of 5 is far below the GUI's concurrent bursts.
+REQUEST_QUEUE_SIZE = 128
+OPERATOR_FUNCTIONS = {
+    "<=": operator.le,
+    ">=": operator.ge,
+    "!=": operator.ne,
+    "=": operator.eq,
+    "<": operator.lt,
+    ">": operator.gt,
+}
+
+
+def _json_value(value: object) -> object:
+    """Plain JSON value for a dataset cell (NumPy scalars/arrays, NaN)."""
+    if hasattr(value, "tolist"):
+        value = value.tolist()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, (list, tuple)):
+        return [_json_value(item) for item in value]
+    return value
+
+
+def _signature(path: Optional[Path]) -> Optional[Tuple[int, int]]:
+    if path is None or not path.exists():
+        return None
+    if path.is_dir():  # partitioned dataset: newest file wins
+        stats = [child.stat() for child in path.rglob("*.parquet")]
+        return (sum(stat.st_size for stat in stats), max((stat.st_mtime_ns for stat in stats), default=0))
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+class ServiceState:
+    """Dataset, feature matrix, list-value postings and model loaded together."""
+
+    def __init__(self, dataset_path: Path, model_path: Path) -> None:
+        import numpy as np
+
+        import record_store
+        import train_baseline
+        from forest_export import ForestEvaluator
+
+        self.dataset_path = dataset_path
+        self.model_path = model_path
+        self.signature = (_signature(dataset_path), _signature(model_path))
+        self.loaded_at = time.time()
+
+        self.frame: pd.DataFrame = train_baseline.read_dataset(dataset_path).reset_index(drop=True)
+        self.records: List[Dict[str, object]] = [
+            {column: _json_value(value) for column, value in row.items()}
+            for row in self.frame.to_dict(orient="records")
+        ]
+        self.positions = {str(record.get("file")): index for index, record in enumerate(self.records)}
+        # value -> row positions for every list column ("uses" filters).
+        self.postings: Dict[str, Dict[str, List[int]]] = {}
+        for column in record_store.LIST_COLUMNS:
+            values: Dict[str, List[int]] = {}
+            for index, record in enumerate(self.records):
+                for value in record.get(column) or []:
+                    positions = values.setdefault(str(value), [])
+                    if not positions or positions[-1] != index:
+                        positions.append(index)
+            self.postings[column] = values
+
+        self.forest: Optional[ForestEvaluator] = None
+        self.features: Optional[np.ndarray] = None
+        if model_path.exists():
+            self.forest = ForestEvaluator.load(model_path)
+            self.features = self.feature_matrix(self.frame)
+        else:
+            logging.warning("Model export not found at %s; /classify is disabled.", model_path)
+
+    def feature_matrix(self, frame: pd.DataFrame) -> np.ndarray:
+        """Raw dataset rows -> model features, with the training pipeline."""
+        import train_baseline
+
+        prepared = train_baseline.fill_missing_values(train_baseline.ensure_list_columns(frame))
+        features = train_baseline.build_feature_columns(prepared)
+        assert self.forest is not None
+        return features.reindex(columns=self.forest.feature_columns, fill_value=0).to_numpy(
+            dtype="float32"
+        )
+
+    def filter(
+        self,
+        entity_type: Optional[str] = None,
+        where: Sequence[str] = (),
+        uses: Sequence[str] = (),
+        limit: Optional[int] = 100,
+    ) -> List[Dict[str, object]]:
+        import record_store
+
+        conditions = [record_store.parse_condition(text) for text in where]
+        selected: Optional[set] = None
+        for column, value in (record_store.parse_uses(text) for text in uses):
+            rows = set(self.postings.get(column, {}).get(value, ()))
+            selected = rows if selected is None else selected & rows
+        candidates = range(len(self.records)) if selected is None else sorted(selected)
+
+        results = []
+        for index in candidates:
+            record = self.records[index]
+            if entity_type is not None and record.get("entity_type") != entity_type:
+                continue
+            if not all(
+                record.get(column) is not None
+                and OPERATOR_FUNCTIONS[op](record[column], value)
+                for column, op, value in conditions
+            ):
+                continue
+            results.append(record)
+        results.sort(key=lambda record: str(record.get("file")))
+        return results[:limit] if limit else results
+
+    def stats(self) -> Dict[str, object]:
+        import record_store
+
+        by_type: Dict[str, int] = {}
+        for record in self.records:
+            key = str(record.get("entity_type"))
+            by_type[key] = by_type.get(key, 0) + 1
+        ranges = {}
+        for column in record_store.STAT_COLUMNS:
+            values = [
+                record[column] for record in self.records if isinstance(record.get(column), (int, float))
+            ]
+            if values:
+                ranges[column] = {"min": min(values), "max": max(values), "mean": sum(values) / len(values)}
+        return {
+            "dataset": str(self.dataset_path),
+            "rows": len(self.records),
+            "entity_types": dict(sorted(by_type.items())),
+            "stats": ranges,
+            "model": None
+            if self.forest is None
+            else {
+                "path": str(self.model_path),
+                "n_estimators": self.forest.n_estimators,
+                "classes": [str(label) for label in self.forest.classes],
+            },
+            "loaded_at": self.loaded_at,
+        }
+
+
+class MicroBatcher:
+    """Coalesces concurrent predictions into one ``predict_proba`` call."""
+
+    def __init__(self, max_wait_ms: float = DEFAULT_BATCH_WAIT_MS, max_batch: int = DEFAULT_MAX_BATCH) -> None:
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max_batch
+        self.pending: "queue.Queue[Tuple[ForestEvaluator, np.ndarray, Future]]" = queue.Queue()
+        self.batches = 0
+        self.rows = 0
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, forest: ForestEvaluator, matrix: np.ndarray) -> Future:
+        future: Future = Future()
+        self.pending.put((forest, matrix, future))
+        return future
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.perf_counter() + self.max_wait
+            size = len(batch[0][1])
+            while size < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[1])
+            # A reload may land mid-batch; requests are grouped by model.
+            groups: Dict[int, List[Tuple[ForestEvaluator, np.ndarray, Future]]] = {}
+            for item in batch:
+                groups.setdefault(id(item[0]), []).append(item)
+            for items in groups.values():
+                self._evaluate(items)
+
+    def _evaluate(self, items: List[Tuple[ForestEvaluator, np.ndarray, Future]]) -> None:
+        import numpy as np
+
+        try:
+            proba = items[0][0].predict_proba(np.concatenate([matrix for _, matrix, _ in items]))
+        except Exception as exc:  # pragma: no cover - defensive
+            for _, _, future in items:
+                future.set_exception(exc)
+            return
+        self.batches += 1
+        self.rows += len(proba)
+        start = 0
+        for _, matrix, future in items:
+            future.set_result(proba[start:start + len(matrix)])
+            start += len(matrix)
+
+
+class QueryService:
+    """Holds the current state, reloads it on change and serves requests."""
+
+    def __init__(
+        self,
+        dataset_path: Path,
+        model_path: Path,
+        *,
+        input_dir: Optional[Path] = None,
+        poll_seconds: float = DEFAULT_POLL_SECONDS,
+        batch_wait_ms: float = DEFAULT_BATCH_WAIT_MS,
+        max_batch: int = DEFAULT_MAX_BATCH,
+    ) -> None:
+        self.dataset_path = dataset_path
+        self.model_path = model_path
+        self.input_dir = input_dir
+        self.poll_seconds = poll_seconds
+        self.state = ServiceState(dataset_path, model_path)
+        self.batcher = MicroBatcher(batch_wait_ms, max_batch)
+        self.reloads = 0
+        self.requests = 0
+        self._stop = threading.Event()
+        self._watcher = threading.Thread(target=self._watch, name="reload-watcher", daemon=True)
+        self._watcher.start()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_seconds):
+            signature = (_signature(self.dataset_path), _signature(self.model_path))
+            if signature == self.state.signature or signature[0] is None:
+                continue
+            try:
+                state = ServiceState(self.dataset_path, self.model_path)
+            except Exception as exc:  # partially written files: retry on the next poll
+                logging.warning("Reload failed, keeping the previous data: %s", exc)
+                continue
+            self.state = state
+            self.reloads += 1
+            logging.info("Reloaded dataset (%d rows) and model", len(state.records))
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def classify(self, payload: Dict[str, object]) -> List[Dict[str, object]]:
+        import pandas as pd
+
+        import dataset_builder
+
+        state = self.state
+        if state.forest is None or state.features is None:
+            raise LookupError(f"Model export not found at {state.model_path}")
+
+        labels: List[str] = []
+        parts = []
+        files = [str(name) for name in list_field(payload, "files")]
+        missing = [name for name in files if name not in state.positions]
+        if missing:
+            raise KeyError(f"Unknown file(s): {', '.join(missing)}")
+        if files:
+            parts.append(state.features[[state.positions[name] for name in files]])
+            labels.extend(files)
+
+        records = list_field(payload, "records")
+        if not all(isinstance(record, dict) for record in records):
+            raise ValueError("'records' must be a list of JSON objects")
+        records = [dict(record) for record in records]
+        input_dir = (self.input_dir or dataset_builder.INPUT_DIR).resolve()
+        for path in list_field(payload, "sma"):
+            resolved = Path(str(path)).resolve()
+            # Scripts of the pack get the dataset key (relative to the parent
+            # of the input directory, as in dataset_builder); others their name.
+            base_dir = input_dir.parent if input_dir in resolved.parents else resolved.parent
+            record = dataset_builder.parse_sma_file(resolved, logging.getLogger("query_service"), base_dir)
+            if record is None:
+                raise ValueError(f"Could not parse {path}")
+            records.append(record.as_dict())
+        if records:
+            parts.append(state.feature_matrix(pd.DataFrame(records)))
+            labels.extend(str(record.get("file", index)) for index, record in enumerate(records))
+        if not parts:
+            return []
+
+        import numpy as np
+
+        proba = self.batcher.submit(state.forest, np.concatenate(parts)).result()
+        classes = [str(label) for label in state.forest.classes]
+        return [
+            {
+                "file": label,
+                "entity_type": classes[int(np.argmax(row))],
+                "proba": {name: round(float(p), 6) for name, p in zip(classes, row)},
+            }
+            for label, row in zip(labels, proba)
+        ]
+
+    def handle(self, method: str, path: str, query: Dict[str, List[str]], body: Dict[str, object]) -> Tuple[int, object]:
+        self.requests += 1
+        state = self.state
+        if path == "/stats":
+            return 200, {
+                **state.stats(),
+                "reloads": self.reloads,
+                "requests": self.requests,
+                "batches": self.batcher.batches,
+                "batched_rows": self.batcher.rows,
+            }
+        if path == "/lookup":
+            name = str((query.get("file") or [body.get("file")])[0])
+            if name not in state.positions:
+                return 404, {"error": f"Unknown file: {name}"}
+            return 200, state.records[state.positions[str(name)]]
+        if path == "/filter":
+            params = dict(body)
+            for key in ("type", "limit"):
+                if key in query:
+                    params[key] = query[key][0]
+            for key in ("where", "uses"):
+                params.setdefault(key, query.get(key, []))
+            limit = params.get("limit", 100)
+            if not isinstance(limit, (int, str, type(None))) or isinstance(limit, bool):
+                raise ValueError("'limit' must be an integer")
+            entity_type = params.get("type")
+            results = state.filter(
+                None if entity_type is None else str(entity_type),
+                [str(text) for text in list_field(params, "where")],
+                [str(text) for text in list_field(params, "uses")],
+                int(limit) if limit not in (None, "") else None,
+            )
+            return 200, {"count": len(results), "results": results}
+        if path == "/classify" and method == "POST":
+            return 200, {"results": self.classify(body)}
+        return 404, {"error": f"Unknown endpoint: {method} {path}"}
+
+
+def list_field(payload: Dict[str, object], key: str) -> list:
+    """Return ``payload[key]`` as a list, treating a missing or null value as empty."""
+    value = payload.get(key)
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        raise ValueError(f"'{key}' must be a JSON list")
+    return value
+
+
+class QueryServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = REQUEST_QUEUE_SIZE
+
+
+def make_handler(service: QueryService) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _dispatch(self, method: str) -> None:
+            start = time.perf_counter()
+            url = urlparse(self.path)
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+                if not isinstance(body, dict):
+                    raise ValueError("Request body must be a JSON object")
+                status, payload = service.handle(method, url.path, parse_qs(url.query), body)
+            except (KeyError, ValueError) as exc:
+                status, payload = 400, {"error": str(exc.args[0]) if exc.args else str(exc)}
+            except LookupError as exc:
+                status, payload = 503, {"error": str(exc)}
+            if isinstance(payload, dict):
+                payload = {**payload, "query_ms": round((time.perf_counter() - start) * 1000.0, 3)}
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:  # noqa: N802 - http.server naming
+            self._dispatch("GET")
+
+        def do_POST(self) -> None:  # noqa: N802 - http.server naming
+            self._dispatch("POST")
+
+        def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+            logging.debug("%s - %s", self.address_string(), format % args)
+
+    return Handler
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Servicio local que mantiene en memoria el dataset y el modelo y responde por HTTP"
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Interfaz de escucha (solo local por defecto)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Puerto HTTP")
+    parser.add_argument("--dataset-path", type=Path, default=None, help="Dataset CSV/Parquet o directorio particionado")
+    parser.add_argument(
+        "--model",
+        type=Path,
+        default=Path("results") / "randomforest_model.npz",
+        help="Modelo exportado por train_baseline.py (forest_export)",
+    )
+    parser.add_argument(
+        "--input-dir",
+        type=Path,
+        default=None,
+        help="Directorio de scripts del dataset; da a los .sma de 'sma' la misma clave 'file'",
+    )
+    parser.add_argument(
+        "--poll",
+        type=float,
+        default=DEFAULT_POLL_SECONDS,
+        help="Segundos entre comprobaciones de cambios en dataset y modelo",
+    )
+    parser.add_argument(
+        "--batch-wait-ms",
+        type=float,
+        default=DEFAULT_BATCH_WAIT_MS,
+        help="Espera máxima para agrupar predicciones concurrentes",
+    )
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="Filas máximas por lote")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import train_baseline
+
+    train_baseline.setup_logging()
+    args = parse_args(argv)
+    try:
+        dataset_path = train_baseline.detect_dataset_path(
+            argparse.Namespace(dataset_path=args.dataset_path, no_parquet=False)
+        )
+    except FileNotFoundError as exc:
+        logging.error("%s", exc)
+        return 1
+
+    service = QueryService(
+        dataset_path,
+        args.model,
+        input_dir=args.input_dir,
+        poll_seconds=args.poll,
+        batch_wait_ms=args.batch_wait_ms,
+        max_batch=args.max_batch,
+    )
+    server = QueryServer((args.host, args.port), make_handler(service))
+    logging.info(
+        "Serving %d rows on http://%s:%d", len(service.state.records), *server.server_address[:2]
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+"""SQLite store for dataset records with indexed lookups.
+
+``dataset_builder`` writes every record into ``dataset.sqlite``: scalar
+columns go to the ``records`` table and each list column gets its own
+``(record_id, position, value)`` table. ``entity_type``, the stats and every
+list value are indexed, so questions such as "classes with stat_speed > 300
+that use sprites/lgtning.spr" are answered from the indexes without loading
+the dataset. Writes run in a single transaction and upsert by ``file``.
+
+The ``query`` command prints JSON and is what the Electron side calls.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+ROOT = Path(__file__).resolve().parent
+STORE_PATH = ROOT / "dataset.sqlite"
+
+LIST_COLUMNS = [
+    "register_calls",
+    "items",
+    "abilities",
+    "human_pseudo_classes",
+    "paths_models",
+    "paths_claws",
+    "paths_sounds",
+    "paths_sprites",
+]
+PATH_COLUMNS = ("paths_models", "paths_claws", "paths_sounds", "paths_sprites")
+STAT_COLUMNS = ["stat_health", "stat_speed", "stat_gravity", "stat_armor", "stat_knockback"]
+SCALAR_COLUMNS: Dict[str, str] = {
+    "entity_type": "TEXT",
+    "entity_name": "TEXT",
+    "line_count": "INTEGER",
+    "ability_count": "INTEGER",
+    "resource_count": "INTEGER",
+    "register_count": "INTEGER",
+    **{column: "REAL" for column in STAT_COLUMNS},
+    "hook_count": "INTEGER",
+    "timer_count": "INTEGER",
+    "repeating_timer_count": "INTEGER",
+    "per_frame_hook_count": "INTEGER",
+    "est_calls_per_sec": "REAL",
+    "est_load_score": "REAL",
+    "cluster_id": "INTEGER",
+}
+INDEXED_COLUMNS = ["entity_type", *STAT_COLUMNS, "cluster_id", "est_load_score"]
+OPERATORS = ("<=", ">=", "!=", "=", "<", ">")
+_CONDITION_PATTERN = re.compile(r"^\s*([a-z_]+)\s*(<=|>=|!=|=|<|>)\s*(.+?)\s*$")
+
+
+def connect(path: Path = STORE_PATH) -> sqlite3.Connection:
+    connection = sqlite3.connect(str(path))
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL")
+    return connection
+
+
+def create_schema(connection: sqlite3.Connection) -> None:
+    scalar_sql = ",\n    ".join(f"{column} {kind}" for column, kind in SCALAR_COLUMNS.items())
+    statements = [
+        f"""CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL UNIQUE,
+    {scalar_sql},
+    extra TEXT
+)""",
+        *(f"CREATE INDEX IF NOT EXISTS idx_records_{column} ON records({column})" for column in INDEXED_COLUMNS),
+    ]
+    for column in LIST_COLUMNS:
+        statements.append(
+            f"""CREATE TABLE IF NOT EXISTS {column} (
+    record_id INTEGER NOT NULL REFERENCES records(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (record_id, position)
+) WITHOUT ROWID"""
+        )
+        statements.append(f"CREATE INDEX IF NOT EXISTS idx_{column}_value ON {column}(value, record_id)")
+    for statement in statements:
+        connection.execute(statement)
+
+
+def _scalar(value: object) -> object:
+    if value is None:
+        return None
+    if hasattr(value, "item"):  # NumPy scalars
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _list_values(value: object) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+        except ValueError:
+            return [value]
+        return [str(item) for item in parsed] if isinstance(parsed, list) else [str(parsed)]
+    try:
+        return [str(item) for item in value]  # lists, tuples and NumPy arrays
+    except TypeError:
+        return [] if _scalar(value) is None else [str(value)]
+
+
+def write_records(
+    records: Iterable[Mapping[str, object]],
+    path: Path = STORE_PATH,
+    *,
+    prune: bool = False,
+) -> int:
+    """Upsert ``records`` by ``file`` in one transaction and return how many.
+
+    With ``prune`` the store is made to mirror ``records`` exactly: rows of
+    files that are not in the batch are deleted.
+    """
+
+    records = list(records)
+    scalar_names = list(SCALAR_COLUMNS)
+    known = {"file", *scalar_names, *LIST_COLUMNS}
+    placeholders = ", ".join("?" for _ in range(len(scalar_names) + 2))
+    updates = ", ".join(f"{column} = excluded.{column}" for column in [*scalar_names, "extra"])
+    upsert = (
+        f"INSERT INTO records (file, {', '.join(scalar_names)}, extra) VALUES ({placeholders}) "
+        f"ON CONFLICT(file) DO UPDATE SET {updates}"
+    )
+
+    rows = []
+    for record in records:
+        extra = {
+            key: _scalar(value)
+            for key, value in record.items()
+            if key not in known and not key.startswith("_") and not isinstance(value, (list, tuple))
+        }
+        rows.append(
+            (
+                str(record["file"]),
+                *(_scalar(record.get(column)) for column in scalar_names),
+                json.dumps(extra, ensure_ascii=False, default=str) if extra else None,
+            )
+        )
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = connect(path)
+    try:
+        with connection:
+            create_schema(connection)
+            connection.executemany(upsert, rows)
+            connection.execute("CREATE TEMP TABLE IF NOT EXISTS batch_files (file TEXT PRIMARY KEY)")
+            connection.execute("DELETE FROM batch_files")
+            connection.executemany("INSERT OR IGNORE INTO batch_files VALUES (?)", ((row[0],) for row in rows))
+            if prune:
+                connection.execute("DELETE FROM records WHERE file NOT IN (SELECT file FROM batch_files)")
+            ids = {
+                file: record_id
+                for record_id, file in connection.execute(
+                    "SELECT id, file FROM records WHERE file IN (SELECT file FROM batch_files)"
+                )
+            }
+            for column in LIST_COLUMNS:
+                connection.execute(
+                    f"DELETE FROM {column} WHERE record_id IN "
+                    "(SELECT id FROM records WHERE file IN (SELECT file FROM batch_files))"
+                )
+                connection.executemany(
+                    f"INSERT INTO {column} (record_id, position, value) VALUES (?, ?, ?)",
+                    (
+                        (ids[str(record["file"])], position, value)
+                        for record in records
+                        for position, value in enumerate(_list_values(record.get(column)))
+                    ),
+                )
+        connection.execute("PRAGMA optimize")
+    finally:
+        connection.close()
+    return len(rows)
+
+
+def parse_condition(text: str) -> Tuple[str, str, object]:
+    """Parse ``column<op>value`` (e.g. ``stat_speed>300``) against the scalar columns."""
+
+    match = _CONDITION_PATTERN.match(text)
+    if not match or match.group(1) not in SCALAR_COLUMNS:
+        raise ValueError(f"Condición inválida: {text!r}")
+    column, operator, raw = match.groups()
+    value: object = raw
+    if SCALAR_COLUMNS[column] != "TEXT":
+        value = float(raw)
+    return column, operator, value
+
+
+def parse_uses(text: str) -> Tuple[str, str]:
+    """Parse ``list_column=value`` (e.g. ``paths_sprites=sprites/lgtning.spr``)."""
+
+    column, _, value = text.partition("=")
+    column = column.strip()
+    if column not in LIST_COLUMNS or not value:
+        raise ValueError(f"Filtro de lista inválido: {text!r}")
+    value = value.strip()
+    if column in PATH_COLUMNS:
+        value = value.replace("\\", "/").lower()
+    return column, value
+
+
+def query(
+    connection: sqlite3.Connection,
+    *,
+    entity_type: Optional[str] = None,
+    conditions: Sequence[Tuple[str, str, object]] = (),
+    uses: Sequence[Tuple[str, str]] = (),
+    limit: Optional[int] = 100,
+    with_lists: bool = True,
+) -> List[Dict[str, object]]:
+    """Return the records matching every filter, with their list columns."""
+
+    clauses: List[str] = []
+    params: List[object] = []
+    if entity_type is not None:
+        clauses.append("r.entity_type = ?")
+        params.append(entity_type)
+    for column, operator, value in conditions:
+        if column not in SCALAR_COLUMNS or operator not in OPERATORS:
+            raise ValueError(f"Condición inválida: {column} {operator}")
+        clauses.append(f"r.{column} {operator} ?")
+        params.append(value)
+    for column, value in uses:
+        if column not in LIST_COLUMNS:
+            raise ValueError(f"Columna de lista inválida: {column}")
+        clauses.append(f"r.id IN (SELECT record_id FROM {column} WHERE value = ?)")
+        params.append(value)
+
+    sql = "SELECT r.* FROM records AS r"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY r.file"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    results = []
+    for row in connection.execute(sql, params):
+        record = dict(row)
+        extra = record.pop("extra")
+        if extra:
+            record.update(json.loads(extra))
+        results.append(record)
+
+    if with_lists and results:
+        by_id = {record["id"]: record for record in results}
+        marks = ", ".join("?" for _ in by_id)
+        for column in LIST_COLUMNS:
+            for record in results:
+                record[column] = []
+            for record_id, value in connection.execute(
+                f"SELECT record_id, value FROM {column} WHERE record_id IN ({marks}) "
+                "ORDER BY record_id, position",
+                list(by_id),
+            ):
+                by_id[record_id][column].append(value)
+    return results
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Consulta el dataset almacenado en SQLite")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    query_parser = subparsers.add_parser("query", help="Filtra registros por tipo, stats y valores de listas")
+    query_parser.add_argument("--db", type=Path, default=STORE_PATH, help="Ruta de dataset.sqlite")
+    query_parser.add_argument("--type", dest="entity_type", default=None, help="entity_type exacto (p. ej. class)")
+    query_parser.add_argument(
+        "--where",
+        action="append",
+        default=[],
+        help="Condición sobre una columna escalar, p. ej. 'stat_speed>300' (se puede repetir)",
+    )
+    query_parser.add_argument(
+        "--uses",
+        action="append",
+        default=[],
+        help="Valor contenido en una columna de lista, p. ej. 'paths_sprites=sprites/lgtning.spr'",
+    )
+    query_parser.add_argument("--limit", type=int, default=100, help="Máximo de filas (0 = sin límite)")
+    query_parser.add_argument("--no-lists", action="store_true", help="No adjunta las columnas de lista")
+
+    import_parser = subparsers.add_parser("import", help="Carga un dataset CSV/Parquet existente en el store")
+    import_parser.add_argument("dataset", type=Path, help="dataset.parquet, dataset.csv o directorio particionado")
+    import_parser.add_argument("--db", type=Path, default=STORE_PATH, help="Ruta de dataset.sqlite")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+
+    if args.command == "import":
+        import pandas as pd
+
+        if args.dataset.is_dir() or args.dataset.suffix.lower() == ".parquet":
+            frame = pd.read_parquet(args.dataset)
+        else:
+            frame = pd.read_csv(args.dataset)
+        count = write_records(frame.to_dict(orient="records"), args.db, prune=True)
+        print(json.dumps({"db": str(args.db), "records": count}))
+        return 0
+
+    if not args.db.exists():
+        print(json.dumps({"error": f"No existe {args.db}"}))
+        return 1
+    try:
+        conditions = [parse_condition(text) for text in args.where]
+        uses = [parse_uses(text) for text in args.uses]
+    except ValueError as exc:
+        print(json.dumps({"error": str(exc)}, ensure_ascii=False))
+        return 2
+
+    connection = connect(args.db)
+    try:
+        start = time.perf_counter()
+        results = query(
+            connection,
+            entity_type=args.entity_type,
+            conditions=conditions,
+            uses=uses,
+            limit=args.limit or None,
+            with_lists=not args.no_lists,
+        )
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+    finally:
+        connection.close()
+    json.dump(
+        {"count": len(results), "query_ms": round(elapsed_ms, 3), "results": results},
+        sys.stdout,
+        ensure_ascii=False,
+    )
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
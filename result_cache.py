@@ -0,0 +1,267 @@
+"""Content-addressed cache for training runs and cross-validation folds.
+
+``train_baseline`` fingerprints everything a run depends on: the bytes of the
+dataset, the training code (which holds the feature configuration and the
+default estimator parameters), ``RANDOM_SEED``, ``SEARCH_GRID`` and the
+options that change the outcome (``--limit``, ``--search``, the group split,
+the early-stopping tolerance). A finished run copies its artifacts (model,
+NumPy export, metrics, search table, plots) to ``runs/<fingerprint>/``; a
+later run with the same fingerprint restores them into ``results/`` without
+importing pandas or scikit-learn.
+
+Cross-validation scores are cached one fold at a time under ``folds/``. A
+fold key covers the content hashes of its training and validation rows, the
+feature columns and the estimator parameters, so changing a parameter or
+part of the data only recomputes the folds it actually affects. Hyperparameter
+search results are cached per (max_depth, max_features) configuration the
+same way.
+
+Entries are evicted oldest-first once they are older than ``max_age_days``
+or the cache grows past ``max_mb``; hits refresh an entry's age.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Sequence
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    import numpy as np
+    import pandas as pd
+
+CACHE_DIR = Path("results_cache")
+CACHE_VERSION = 1
+DEFAULT_MAX_AGE_DAYS = 30.0
+DEFAULT_MAX_MB = 512.0
+ARTIFACTS = (
+    "metrics.json",
+    "search_results.csv",
+    "randomforest_model.pkl",
+    "randomforest_model.npz",
+    "feature_importance.png",
+    "dataset_debug.csv",
+)
+# Estimator parameters that do not change the fitted model.
+VOLATILE_PARAMS = ("n_jobs", "verbose", "warm_start")
+
+
+def _digest(*parts: object) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, bytes) else json.dumps(part, sort_keys=True, default=str).encode("utf-8")
+        h.update(len(data).to_bytes(8, "little"))
+        h.update(data)
+    return h.hexdigest()
+
+
+def file_digest(path: Path) -> str:
+    """sha256 of a dataset file, or of every file below a partitioned dataset."""
+    h = hashlib.sha256()
+    paths = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    for item in paths:
+        h.update(str(item.relative_to(path) if path.is_dir() else item.name).encode("utf-8"))
+        with item.open("rb") as handle:
+            for block in iter(lambda: handle.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()
+
+
+def row_fingerprints(features: pd.DataFrame, labels: pd.Series) -> np.ndarray:
+    """One (feature hash, label hash) pair of uint64 per row."""
+    import numpy as np
+    import pandas as pd
+
+    return np.column_stack(
+        (
+            pd.util.hash_pandas_object(features, index=False).to_numpy(),
+            pd.util.hash_pandas_object(labels.astype(str), index=False).to_numpy(),
+        )
+    )
+
+
+def estimator_params(estimator: object) -> Dict[str, object]:
+    params = estimator.get_params()  # type: ignore[attr-defined]
+    return {key: value for key, value in params.items() if key not in VOLATILE_PARAMS}
+
+
+class ResultCache:
+    """Run artifacts under ``runs/`` and fold scores under ``folds/``."""
+
+    def __init__(
+        self,
+        directory: Path = CACHE_DIR,
+        *,
+        max_age_days: float = DEFAULT_MAX_AGE_DAYS,
+        max_mb: float = DEFAULT_MAX_MB,
+    ) -> None:
+        self.directory = directory
+        self.runs_dir = directory / "runs"
+        self.folds_dir = directory / "folds"
+        self.max_age_days = max_age_days
+        self.max_mb = max_mb
+
+    # ------------------------------------------------------------------ runs
+    def run_key(self, dataset_path: Path, code_paths: Sequence[Path], options: Dict[str, object]) -> str:
+        code = [path.read_bytes() for path in code_paths]
+        return _digest(CACHE_VERSION, file_digest(dataset_path), *code, options)
+
+    def restore_run(self, key: str, results_dir: Path) -> Optional[List[str]]:
+        """Copy a cached run into ``results_dir``; ``None`` on a miss."""
+        entry = self.runs_dir / key
+        if not (entry / "metrics.json").exists():
+            return None
+        results_dir.mkdir(parents=True, exist_ok=True)
+        restored = []
+        for name in ARTIFACTS:
+            target = results_dir / name
+            if (entry / name).exists():
+                shutil.copy2(entry / name, target)
+                restored.append(name)
+            elif target.exists():
+                target.unlink()  # left over from a different run
+        os.utime(entry)
+        return restored
+
+    def store_run(self, key: str, results_dir: Path, since: float) -> List[str]:
+        """Cache the artifacts written to ``results_dir`` after ``since``."""
+        entry = self.runs_dir / key
+        tmp = self.runs_dir / f"{key}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        stored = []
+        for name in ARTIFACTS:
+            source = results_dir / name
+            if source.exists() and source.stat().st_mtime >= since:
+                shutil.copy2(source, tmp / name)
+                stored.append(name)
+        shutil.rmtree(entry, ignore_errors=True)
+        tmp.replace(entry)
+        return stored
+
+    # ----------------------------------------------------------------- folds
+    def _load(self, key: str) -> Optional[object]:
+        path = self.folds_dir / f"{key}.json"
+        try:
+            value = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        os.utime(path)
+        return value
+
+    def _store(self, key: str, value: object) -> None:
+        self.folds_dir.mkdir(parents=True, exist_ok=True)
+        path = self.folds_dir / f"{key}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(value), encoding="utf-8")
+        tmp.replace(path)
+
+    @staticmethod
+    def fold_keys(
+        rows: np.ndarray,
+        columns: Sequence[str],
+        folds: Sequence[tuple],
+        params: Dict[str, object],
+    ) -> List[str]:
+        import numpy as np
+
+        return [
+            _digest(
+                CACHE_VERSION,
+                list(columns),
+                params,
+                np.ascontiguousarray(rows[train_idx]).tobytes(),
+                np.ascontiguousarray(rows[val_idx]).tobytes(),
+            )
+            for train_idx, val_idx in folds
+        ]
+
+    @classmethod
+    def search_keys(
+        cls,
+        rows: np.ndarray,
+        columns: Sequence[str],
+        folds: Sequence[tuple],
+        configurations: Sequence[tuple],
+        settings: Dict[str, object],
+    ) -> List[str]:
+        """One key per search configuration, covering every fold's rows."""
+        fold_part = cls.fold_keys(rows, columns, folds, {})
+        return [_digest(CACHE_VERSION, "search", list(config), settings, fold_part) for config in configurations]
+
+    def cross_val_scores(
+        self,
+        estimator: object,
+        X: pd.DataFrame,
+        y: pd.Series,
+        folds: Sequence[tuple],
+        *,
+        n_jobs: int = 1,
+    ) -> List[float]:
+        """``cross_val_score`` accuracy per fold, computing only uncached folds."""
+        from sklearn.model_selection import cross_val_score
+
+        keys = self.fold_keys(row_fingerprints(X, y), list(X.columns), folds, estimator_params(estimator))
+
+        def score(positions: Sequence[int]) -> List[float]:
+            computed = cross_val_score(
+                estimator,
+                X,
+                y,
+                scoring="accuracy",
+                cv=[folds[position] for position in positions],
+                n_jobs=n_jobs,
+            )
+            return [float(value) for value in computed]
+
+        return [float(value) for value in self.cached_map(keys, score, label="CV folds")]  # type: ignore[arg-type]
+
+    def cached_map(
+        self,
+        keys: Sequence[str],
+        compute: Callable[[Sequence[int]], Iterable[object]],
+        label: str = "Entries",
+    ) -> List[object]:
+        """Values for ``keys``; ``compute`` receives the positions of the misses."""
+        values = [self._load(key) for key in keys]
+        missing = [index for index, value in enumerate(values) if value is None]
+        if missing:
+            for index, value in zip(missing, compute(missing)):
+                values[index] = value
+                self._store(keys[index], value)
+        logging.info("%s reused from cache: %d of %d", label, len(keys) - len(missing), len(keys))
+        return values
+
+    # -------------------------------------------------------------- eviction
+    def evict(self) -> Dict[str, int]:
+        """Drop entries past the age limit, then oldest entries over the size limit."""
+        entries = []
+        for parent in (self.runs_dir, self.folds_dir):
+            if not parent.exists():
+                continue
+            for path in parent.iterdir():
+                if path.name.endswith(".tmp"):
+                    continue
+                files = [p for p in path.rglob("*") if p.is_file()] if path.is_dir() else [path]
+                size = sum(p.stat().st_size for p in files)
+                entries.append((path.stat().st_mtime, size, path))
+        entries.sort()
+
+        cutoff = time.time() - self.max_age_days * 86400.0
+        budget = self.max_mb * 1024 * 1024
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if mtime >= cutoff and total <= budget:
+                break
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return {"entries": len(entries) - removed, "evicted": removed, "bytes": int(total)}
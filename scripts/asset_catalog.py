@@ -0,0 +1,107 @@
+import sys, os, json, argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from spr2png import parse_spr_header
+from mdl2png import parse_mdl_header, parse_mdl_counts
+from wav2waveform import parse_wav_header
+
+KINDS = {".wav": "sound", ".spr": "sprite", ".mdl": "model"}
+
+
+def read_header(path, ext):
+    # Solo cabeceras: nunca se decodifican píxeles ni muestras
+    with open(path, "rb") as f:
+        if ext == ".wav":
+            return parse_wav_header(f)
+        if ext == ".spr":
+            return parse_spr_header(f)
+        if f.read(4) == b"IDSQ":  # <nombre>01.mdl: solo secuencias
+            return {"version": None, "sequence_group_file": True}
+        f.seek(0)
+        header = parse_mdl_header(f)
+        return {"version": header["version"], **parse_mdl_counts(f)}
+
+
+def catalog_entry(root, path, previous):
+    st = os.stat(path)
+    rel = os.path.relpath(path, root).replace(os.sep, "/")
+    old = previous.get(rel)
+    if old and old.get("size") == st.st_size and old.get("mtime_ns") == st.st_mtime_ns:
+        return old
+    ext = os.path.splitext(path)[1].lower()
+    entry = {"path": rel, "kind": KINDS[ext], "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    try:
+        entry.update(read_header(path, ext))
+    except (OSError, ValueError, EOFError) as e:
+        entry["error"] = str(e)
+    return entry
+
+
+def walk_assets(root):
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            if os.path.splitext(name)[1].lower() in KINDS:
+                yield os.path.join(dirpath, name)
+
+
+def load_previous(output):
+    # Reutiliza entradas cuyo tamaño y mtime no cambiaron
+    if not os.path.exists(output):
+        return {}
+    try:
+        if output.endswith(".parquet"):
+            import pandas as pd
+            rows = pd.read_parquet(output).to_dict("records")
+            return {row["path"]: {k: v for k, v in row.items() if v is not None and v == v} for row in rows}
+        with open(output, "r", encoding="utf-8") as f:
+            return json.load(f).get("assets", {})
+    except Exception:
+        return {}
+
+
+def build_catalog(root, output=None, workers=None):
+    previous = load_previous(output) if output else {}
+    paths = sorted(walk_assets(root))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        entries = list(pool.map(lambda p: catalog_entry(root, p, previous), paths))
+    by_kind = {kind: [] for kind in KINDS.values()}
+    for entry in entries:
+        by_kind[entry["kind"]].append(entry["path"])
+    return {
+        "root": os.path.abspath(root),
+        "count": len(entries),
+        "reused": sum(1 for e in entries if previous.get(e["path"]) is e),
+        "errors": sum(1 for e in entries if "error" in e),
+        "by_kind": by_kind,
+        "assets": {e["path"]: e for e in entries},
+    }
+
+
+def write_catalog(catalog, output):
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    tmp = output + ".tmp"
+    if output.endswith(".parquet"):
+        import pandas as pd
+        df = pd.DataFrame(list(catalog["assets"].values()))
+        df.to_parquet(tmp, index=False)
+    else:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(catalog, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Catálogo de metadatos de assets (.wav/.spr/.mdl) leyendo solo cabeceras")
+    parser.add_argument("pack", help="Directorio del pack")
+    parser.add_argument("output", help="Catálogo de salida (.json o .parquet)")
+    parser.add_argument("--workers", type=int, default=None, help="Hilos de lectura")
+    args = parser.parse_args(argv)
+
+    catalog = build_catalog(args.pack, args.output, args.workers)
+    write_catalog(catalog, args.output)
+    print(json.dumps({k: catalog[k] for k in ("count", "reused", "errors")}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
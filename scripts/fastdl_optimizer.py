@@ -0,0 +1,231 @@
+import sys, os, json, argparse, bz2, hashlib, wave
+from concurrent.futures import ThreadPoolExecutor
+
+from wav2waveform import parse_wav_header, iter_wav_chunks
+
+ASSET_EXTENSIONS = (".wav", ".spr", ".mdl", ".bsp", ".wad", ".tga", ".bmp", ".res")
+MANIFEST_NAME = ".fastdl_manifest.json"
+TARGET_RATE = 22050
+CHUNK_FRAMES = 65536
+CUTOFF = 0.9  # frecuencia de corte del paso bajo, relativa al Nyquist de destino
+TRANSITION = 0.2  # ancho de la banda de transición, relativo al mismo Nyquist
+STOPBAND_DB = 80.0
+
+
+def lowpass_taps(step):
+    # Diseño de Kaiser: corte en CUTOFF * Nyquist_destino, longitud según la atenuación
+    import numpy as np
+
+    nyquist = 0.5 / step  # Nyquist de destino en ciclos por muestra de origen
+    width = 2 * np.pi * TRANSITION * nyquist
+    count = int(np.ceil((STOPBAND_DB - 8.0) / (2.285 * width))) | 1
+    beta = 0.1102 * (STOPBAND_DB - 8.7)
+    n = np.arange(count) - (count - 1) / 2
+    taps = 2 * CUTOFF * nyquist * np.sinc(2 * CUTOFF * nyquist * n) * np.kaiser(count, beta)
+    return (taps / taps.sum()).astype(np.float32)
+
+
+class StreamResampler:
+    # Remuestreo por bloques: paso bajo FIR (sinc con ventana de Kaiser) por
+    # debajo del nuevo Nyquist al bajar la frecuencia, e interpolación lineal.
+    # Conserva entre bloques el historial del filtro y las muestras pendientes,
+    # así que el resultado no depende del tamaño de bloque
+    def __init__(self, src_rate, dst_rate):
+        import numpy as np
+
+        self.np = np
+        self.src_rate, self.dst_rate = src_rate, dst_rate
+        self.step = src_rate / dst_rate
+        self.taps = lowpass_taps(self.step) if self.step > 1 else np.ones(1, dtype=np.float32)
+        self.delay = (len(self.taps) - 1) // 2  # retardo de grupo del FIR, en muestras
+        self.history = np.zeros(len(self.taps) - 1, dtype=np.float32)
+        self.tail = np.zeros(0, dtype=np.float32)
+        self.base = -self.delay  # índice global (sin retardo) de self.tail[0]
+        self.next_out = 0
+        self.total_in = 0  # muestras de entrada recibidas
+
+    def _filter(self, x):
+        np = self.np
+        if len(self.taps) == 1:
+            return x
+        padded = np.concatenate((self.history, x.astype(np.float32, copy=False)))
+        self.history = padded[len(padded) - len(self.history):]
+        return np.convolve(padded, self.taps, mode="valid").astype(np.float32)
+
+    def process(self, x, final=False):
+        np = self.np
+        self.total_in += len(x)
+        filtered = self._filter(x)
+        if final and self.delay:  # vacía el retardo del filtro
+            filtered = np.concatenate((filtered, self._filter(np.zeros(self.delay, dtype=np.float32))))
+        buf = np.concatenate((self.tail, filtered))
+        if len(buf) == 0:
+            return buf
+        last = self.base + len(buf) - 1
+        limit = last if final else last - 1  # la interpolación necesita la muestra siguiente
+        k_max = int(np.floor(limit / self.step)) if limit >= 0 else -1
+        if final:  # exactamente ceil(total * dst / src) muestras de salida
+            k_max = min(k_max, -(-self.total_in * self.dst_rate // self.src_rate) - 1)
+        out = np.zeros(0, dtype=np.float32)
+        if k_max >= self.next_out:
+            pos = np.arange(self.next_out, k_max + 1) * self.step - self.base
+            i0 = np.floor(pos).astype(np.int64)
+            frac = (pos - i0).astype(np.float32)
+            i1 = np.minimum(i0 + 1, len(buf) - 1)
+            out = buf[i0] * (1.0 - frac) + buf[i1] * frac
+            self.next_out = k_max + 1
+        keep = min(len(buf), max(0, int(np.floor(self.next_out * self.step)) - self.base))
+        self.tail = buf[keep:]
+        self.base += keep
+        return out
+
+
+def needs_transcode(header, bits):
+    return not (header["format"] == 1 and header["channels"] == 1
+                and header["rate"] <= TARGET_RATE and header["bits"] in (8, bits))
+
+
+def transcode_wav(src, dst, bits=16):
+    # Mono, 22 kHz, PCM 8/16 bits; lectura y escritura por bloques
+    import numpy as np
+
+    with open(src, "rb") as f:
+        header = parse_wav_header(f)
+        if not needs_transcode(header, bits):
+            return False
+        rate = min(header["rate"], TARGET_RATE)
+        resampler = StreamResampler(header["rate"], rate) if rate != header["rate"] else None
+        tmp = dst + ".tmp"
+        with wave.open(tmp, "wb") as out:
+            out.setnchannels(1)
+            out.setsampwidth(bits // 8)
+            out.setframerate(rate)
+
+            def emit(mono):
+                mono = np.clip(np.rint(mono), -32768, 32767)
+                if bits == 8:
+                    out.writeframes((mono / 256.0 + 128.0).clip(0, 255).astype(np.uint8).tobytes())
+                else:
+                    out.writeframes(mono.astype("<i2").tobytes())
+
+            for chunk in iter_wav_chunks(f, header, CHUNK_FRAMES):
+                mono = chunk.mean(axis=1)
+                emit(resampler.process(mono) if resampler else mono)
+            if resampler:
+                emit(resampler.process(np.zeros(0, dtype=np.float32), final=True))
+    os.replace(tmp, dst)
+    return True
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def compress_bz2(src, dst):
+    tmp = dst + ".tmp"
+    comp = bz2.BZ2Compressor(9)
+    with open(src, "rb") as fin, open(tmp, "wb") as fout:
+        for block in iter(lambda: fin.read(1 << 20), b""):
+            fout.write(comp.compress(block))
+        fout.write(comp.flush())
+    os.replace(tmp, dst)
+
+
+def optimize_asset(root, output, rel, previous, settings):
+    src = os.path.join(root, rel)
+    dst = os.path.join(output, rel)
+    digest = file_digest(src)
+    old = previous.get(rel)
+    if (old and old.get("sha256") == digest and old.get("settings") == settings
+            and os.path.exists(dst) and os.path.exists(dst + ".bz2")):
+        return dict(old, skipped=True)
+
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    entry = {"sha256": digest, "settings": settings, "source_size": os.path.getsize(src), "transcoded": False}
+    try:
+        if rel.lower().endswith(".wav") and settings["transcode"]:
+            entry["transcoded"] = transcode_wav(src, dst, settings["bits"])
+    except (OSError, ValueError, EOFError, wave.Error) as e:
+        entry["error"] = str(e)
+    if not entry["transcoded"]:
+        with open(src, "rb") as fin, open(dst + ".tmp", "wb") as fout:
+            for block in iter(lambda: fin.read(1 << 20), b""):
+                fout.write(block)
+        os.replace(dst + ".tmp", dst)
+    compress_bz2(dst, dst + ".bz2")
+    entry["output_size"] = os.path.getsize(dst)
+    entry["bz2_size"] = os.path.getsize(dst + ".bz2")
+    return dict(entry, skipped=False)
+
+
+def walk_assets(root):
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            if name.lower().endswith(ASSET_EXTENSIONS):
+                yield os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, "/")
+
+
+def pack_of(rel):
+    # Cada subdirectorio de primer nivel es un pack
+    return rel.split("/", 1)[0] if "/" in rel else "."
+
+
+def optimize(root, output, bits=16, transcode=True, workers=None):
+    manifest_path = os.path.join(output, MANIFEST_NAME)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+    settings = {"bits": bits, "transcode": transcode, "rate": TARGET_RATE}
+    rels = sorted(walk_assets(root))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        entries = dict(zip(rels, pool.map(lambda r: optimize_asset(root, output, r, previous, settings), rels)))
+
+    # Salidas de assets que ya no existen en el origen
+    for rel in set(previous) - set(entries):
+        for stale in (os.path.join(output, rel), os.path.join(output, rel) + ".bz2"):
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    os.makedirs(output, exist_ok=True)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({rel: {k: v for k, v in e.items() if k != "skipped"} for rel, e in entries.items()}, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    packs = {}
+    for rel, e in entries.items():
+        p = packs.setdefault(pack_of(rel), {"files": 0, "skipped": 0, "transcoded": 0, "errors": 0,
+                                            "source_bytes": 0, "optimized_bytes": 0, "bz2_bytes": 0})
+        p["files"] += 1
+        p["skipped"] += e["skipped"]
+        p["transcoded"] += bool(e.get("transcoded"))
+        p["errors"] += "error" in e
+        p["source_bytes"] += e["source_size"]
+        p["optimized_bytes"] += e["output_size"]
+        p["bz2_bytes"] += e["bz2_size"]
+    for p in packs.values():
+        p["saved_bytes"] = p["source_bytes"] - p["bz2_bytes"]
+    return {"packs": packs, "errors": {rel: e["error"] for rel, e in entries.items() if "error" in e}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Optimiza assets para FastDL: sonidos mono 22 kHz y copias .bz2")
+    parser.add_argument("root", help="Directorio con los packs")
+    parser.add_argument("output", help="Directorio FastDL de salida")
+    parser.add_argument("--bits", type=int, choices=(8, 16), default=16, help="Bits por muestra de los sonidos")
+    parser.add_argument("--no-transcode", action="store_true", help="Solo comprime, sin convertir sonidos")
+    parser.add_argument("--workers", type=int, default=None, help="Hilos de trabajo")
+    args = parser.parse_args(argv)
+
+    report = optimize(args.root, args.output, args.bits, not args.no_transcode, args.workers)
+    print(json.dumps(report, indent=2))
+    return 0  # los errores por archivo van en el reporte
+
+
+if __name__ == "__main__":
+    sys.exit(main())
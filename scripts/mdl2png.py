@@ -1,5 +1,4 @@
-import sys, os, struct
-from PIL import Image, ImageDraw
+import os, struct, hashlib, shutil, filecmp, json, time, argparse, math
 
 def parse_mdl_header(f):
     ident = f.read(4)
@@ -10,23 +9,364 @@ def parse_mdl_header(f):
         raise ValueError(f"Unsupported MDL version: {version}")
     return {"ident": ident, "version": version}
 
-def mdl2png(mdl_path, png_path):
+# studiohdr_t tras ident+version: name, length, 5 vec3, flags y 26 pares cuenta/offset
+STUDIO_HDR = struct.Struct('<64si15f27i')
+
+def parse_mdl_counts(f):
+    # Llamar justo después de parse_mdl_header; no lee vértices ni texturas
+    data = f.read(STUDIO_HDR.size)
+    if len(data) < STUDIO_HDR.size:
+        raise ValueError("Truncated MDL header")
+    v = STUDIO_HDR.unpack(data)
+    n = v[18:]  # numbones, boneindex, numbonecontrollers, ...
+    return {
+        "name": v[0].split(b'\0', 1)[0].decode('latin-1'),
+        "length": v[1],
+        "flags": v[17],
+        "bones": n[0],
+        "bone_controllers": n[2],
+        "hitboxes": n[4],
+        "sequences": n[6],
+        "sequence_groups": n[8],
+        "textures": n[10],
+        "skin_families": n[14],
+        "bodyparts": n[16],
+        "attachments": n[18],
+        "external_textures": n[10] == 0,  # texturas en <nombre>T.mdl
+    }
+
+# ------------------------------------------------------------------ render
+# mstudiobone_t, mstudiobodyparts_t, mstudiomodel_t, mstudiomesh_t, mstudiotexture_t
+BONE = struct.Struct('<32s8i12f')
+BODYPART = struct.Struct('<64s3i')
+MODEL = struct.Struct('<64sif10i')
+MESH = struct.Struct('<5i')
+TEXTURE = struct.Struct('<64s4i')
+NF_MASKED = 0x40  # índice 255 de la paleta es transparente
+
+THUMB = 200
+SUPERSAMPLE = 2
+RENDER_VERSION = 1  # forma parte de la clave de caché: subirlo al cambiar el render
+BACKGROUND = (30, 30, 40)
+MARGIN = 0.06
+LIGHT = (0.45, -0.35, 0.82)  # desde arriba y algo a la izquierda de la cámara
+AMBIENT = 0.4
+CHUNK_PIXELS = 1 << 21  # candidatos por lote del rasterizador
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "previews", "cache", "models")
+
+
+def read_studio(data):
+    if data[:4] != b'IDST':
+        raise ValueError("Not a valid Half-Life MDL file")
+    v = STUDIO_HDR.unpack_from(data, 8)
+    n = v[18:]
+    return {
+        "bones": (n[0], n[1]),
+        "textures": (n[10], n[11]),
+        "skins": (n[13], n[14], n[15]),  # numskinref, numskinfamilies, skinindex
+        "bodyparts": (n[16], n[17]),
+    }
+
+
+def bone_transforms(data, hdr):
+    # Pose de referencia: value[] de cada hueso (las animaciones son deltas sobre ella)
+    import numpy as np
+
+    count, offset = hdr["bones"]
+    out = np.zeros((count, 3, 4))
+    for i in range(count):
+        b = BONE.unpack_from(data, offset + i * BONE.size)
+        parent, (px, py, pz, rx, ry, rz) = b[1], b[9:15]
+        # AngleQuaternion + QuaternionMatrix del SDK
+        sr, cr = math.sin(rx / 2), math.cos(rx / 2)
+        sp, cp = math.sin(ry / 2), math.cos(ry / 2)
+        sy, cy = math.sin(rz / 2), math.cos(rz / 2)
+        x = sr * cp * cy - cr * sp * sy
+        y = cr * sp * cy + sr * cp * sy
+        z = cr * cp * sy - sr * sp * cy
+        w = cr * cp * cy + sr * sp * sy
+        local = np.array([
+            [1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y), px],
+            [2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x), py],
+            [2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y), pz],
+        ])
+        if 0 <= parent < i:
+            p = out[parent]
+            local = np.hstack([p[:, :3] @ local[:, :3], p[:, :3] @ local[:, 3:] + p[:, 3:]])
+        out[i] = local
+    return out
+
+
+def load_textures(data):
+    # Texturas en RGB plano + máscara de transparencia, y tabla de skins de la familia 0
+    import numpy as np
+
+    hdr = read_studio(data)
+    count, offset = hdr["textures"]
+    textures = []
+    for i in range(count):
+        _, flags, width, height, index = TEXTURE.unpack_from(data, offset + i * TEXTURE.size)
+        pixels = np.frombuffer(data, np.uint8, width * height, index)
+        palette = np.frombuffer(data, np.uint8, 768, index + width * height).reshape(256, 3)
+        alpha = pixels != 255 if flags & NF_MASKED else np.ones(len(pixels), bool)
+        textures.append((width, height, palette[pixels], alpha))
+    numskinref, families, skinindex = hdr["skins"]
+    skins = np.frombuffer(data, '<i2', numskinref, skinindex) if families else np.arange(count)
+    return textures, skins
+
+
+def external_textures(path):
+    # Modelos con numtextures == 0 guardan las texturas en <nombre>T.mdl
+    stem = os.path.splitext(path)[0]
+    for suffix in ("T.mdl", "t.mdl"):
+        if os.path.exists(stem + suffix):
+            return stem + suffix
+    return None
+
+
+def mesh_triangles(data, offset):
+    # tricmds: int16 n (>0 tira, <0 abanico, 0 fin) seguido de n x (vert, norm, s, t)
+    import numpy as np
+
+    starts, counts, fans = [], [], []
+    pos = offset
+    while True:
+        (n,) = struct.unpack_from('<h', data, pos)
+        pos += 2
+        if n == 0:
+            break
+        starts.append((pos - offset) // 2)
+        counts.append(abs(n))
+        fans.append(n < 0)
+        pos += abs(n) * 8
+    if not starts:
+        return np.zeros((0, 3, 4), np.int64)
+    shorts = np.frombuffer(data, '<i2', (pos - offset) // 2, offset).astype(np.int64)
+    starts, counts, fans = np.array(starts), np.array(counts), np.array(fans)
+    ntri = np.maximum(counts - 2, 0)
+    cmd = np.repeat(np.arange(len(starts)), ntri)
+    k = np.arange(ntri.sum()) - np.repeat(np.cumsum(ntri) - ntri, ntri)
+    base = starts[cmd]
+    # Sin culling: el orden de giro de las tiras no importa
+    first = np.where(fans[cmd], base, base + 4 * k)
+    corners = np.stack([first, base + 4 * (k + 1), base + 4 * (k + 2)], axis=1)
+    return shorts[corners[..., None] + np.arange(4)]
+
+
+def load_geometry(data, hdr, bones, skins):
+    # Modelo 0 de cada bodypart en la pose de referencia, en coordenadas de mundo
+    import numpy as np
+
+    verts, norms, corners, texture_ids = [], [], [], []
+    nverts = nnorms = 0
+    count, offset = hdr["bodyparts"]
+    for i in range(count):
+        _, nummodels, _, modelindex = BODYPART.unpack_from(data, offset + i * BODYPART.size)
+        if nummodels < 1:
+            continue
+        m = MODEL.unpack_from(data, modelindex)
+        nummesh, meshindex, numverts, vertinfo, vertindex, numnorms, norminfo, normindex = m[3:11]
+        vbone = np.frombuffer(data, np.uint8, numverts, vertinfo)
+        v = np.frombuffer(data, '<f4', numverts * 3, vertindex).reshape(-1, 3)
+        nbone = np.frombuffer(data, np.uint8, numnorms, norminfo)
+        nv = np.frombuffer(data, '<f4', numnorms * 3, normindex).reshape(-1, 3)
+        verts.append(np.einsum('nij,nj->ni', bones[vbone, :, :3], v) + bones[vbone, :, 3])
+        norms.append(np.einsum('nij,nj->ni', bones[nbone, :, :3], nv))
+        for j in range(nummesh):
+            _, triindex, skinref, _, _ = MESH.unpack_from(data, meshindex + j * MESH.size)
+            tris = mesh_triangles(data, triindex)
+            tris[..., 0] += nverts
+            tris[..., 1] += nnorms
+            corners.append(tris)
+            texture_ids.append(np.full(len(tris), skins[skinref] if skinref < len(skins) else 0))
+        nverts += numverts
+        nnorms += numnorms
+    if not corners or not sum(len(c) for c in corners):
+        return None
+    return np.vstack(verts), np.vstack(norms), np.vstack(corners), np.concatenate(texture_ids)
+
+
+def view_basis(name):
+    # v_*: vista en primera persona (desde atrás, hacia +X); resto: 3/4 de frente, algo desde arriba
+    import numpy as np
+
+    if os.path.basename(name).lower().startswith("v_"):
+        yaw, pitch = math.pi, 0.0
+    else:
+        yaw, pitch = math.radians(35), math.radians(12)
+    right = np.array([-math.sin(yaw), math.cos(yaw), 0.0])
+    up = np.array([-math.sin(pitch) * math.cos(yaw), -math.sin(pitch) * math.sin(yaw), math.cos(pitch)])
+    toward = np.array([math.cos(pitch) * math.cos(yaw), math.cos(pitch) * math.sin(yaw), math.sin(pitch)])
+    return right, up, toward
+
+
+def rasterize(screen, depth, shade, uv, tex_ids, textures, size):
+    # Z-buffer vectorizado: cada triángulo aporta los píxeles de su caja, se filtran por
+    # baricéntricas y por lote gana el más cercano (orden por profundidad + np.unique)
+    import numpy as np
+
+    offsets = np.cumsum([0] + [w * h for w, h, _, _ in textures])
+    widths = np.array([w for w, _, _, _ in textures] + [1])
+    heights = np.array([h for _, h, _, _ in textures] + [1])
+    rgb = np.vstack([t[2] for t in textures] + [np.full((1, 3), 160, np.uint8)]).astype(np.float32)
+    alpha = np.concatenate([t[3] for t in textures] + [np.ones(1, bool)])
+    # Referencias a texturas inexistentes usan el último texel (gris)
+    tex_ids = np.where((tex_ids >= 0) & (tex_ids < len(textures)), tex_ids, len(textures))
+
+    xs, ys = screen[..., 0], screen[..., 1]
+    d = (ys[:, 1] - ys[:, 2]) * (xs[:, 0] - xs[:, 2]) + (xs[:, 2] - xs[:, 1]) * (ys[:, 0] - ys[:, 2])
+    keep = np.abs(d) > 1e-9
+    x0 = np.clip(np.floor(xs.min(1)), 0, size - 1).astype(np.int64)
+    x1 = np.clip(np.floor(xs.max(1)), 0, size - 1).astype(np.int64)
+    y0 = np.clip(np.floor(ys.min(1)), 0, size - 1).astype(np.int64)
+    y1 = np.clip(np.floor(ys.max(1)), 0, size - 1).astype(np.int64)
+    w, h = x1 - x0 + 1, y1 - y0 + 1
+    area = np.where(keep, w * h, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a0, b0 = (ys[:, 1] - ys[:, 2]) / d, (xs[:, 2] - xs[:, 1]) / d
+        a1, b1 = (ys[:, 2] - ys[:, 0]) / d, (xs[:, 0] - xs[:, 2]) / d
+
+    zbuf = np.full(size * size, -np.inf)
+    color = np.tile(np.array(BACKGROUND, np.float32), (size * size, 1))
+    tris = np.flatnonzero(area)
+    total = np.cumsum(area[tris])
+    cuts = np.searchsorted(total, np.arange(CHUNK_PIXELS, total[-1] if len(total) else 0, CHUNK_PIXELS))
+    for part in np.split(tris, cuts):
+        if not len(part):
+            continue
+        t = np.repeat(part, area[part])
+        local = np.arange(len(t)) - np.repeat(np.cumsum(area[part]) - area[part], area[part])
+        px = x0[t] + local % w[t]
+        py = y0[t] + local // w[t]
+        dx, dy = px + 0.5 - xs[t, 2], py + 0.5 - ys[t, 2]
+        l0 = a0[t] * dx + b0[t] * dy
+        l1 = a1[t] * dx + b1[t] * dy
+        l2 = 1.0 - l0 - l1
+        inside = (l0 >= -1e-6) & (l1 >= -1e-6) & (l2 >= -1e-6)
+        t, px, py, l0, l1, l2 = t[inside], px[inside], py[inside], l0[inside], l1[inside], l2[inside]
+        bary = np.stack([l0, l1, l2], axis=1)
+        z = np.einsum('ij,ij->i', bary, depth[t])
+        s = np.einsum('ij,ij->i', bary, uv[t, :, 0])
+        v = np.einsum('ij,ij->i', bary, uv[t, :, 1])
+        tex = tex_ids[t]
+        texel = offsets[tex] + np.mod(np.floor(v).astype(np.int64), heights[tex]) * widths[tex] + np.mod(
+            np.floor(s).astype(np.int64), widths[tex]
+        )
+        visible = alpha[texel]
+        pixel = (py * size + px)[visible]
+        z, t, bary, texel = z[visible], t[visible], bary[visible], texel[visible]
+        order = np.argsort(-z, kind='stable')
+        pixel, first = np.unique(pixel[order], return_index=True)
+        pick = order[first]
+        closer = z[pick] > zbuf[pixel]
+        pixel, pick = pixel[closer], pick[closer]
+        zbuf[pixel] = z[pick]
+        light = np.einsum('ij,ij->i', bary[pick], shade[t[pick]])
+        color[pixel] = rgb[texel[pick]] * light[:, None]
+    return np.clip(color, 0, 255).reshape(size, size, 3)
+
+
+def render_mdl(path, size=THUMB):
+    # Miniatura RGB (size x size, uint8) o None si el archivo no tiene geometría
+    import numpy as np
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    hdr = read_studio(data)
+    textures, skins = load_textures(data)
+    if not textures:
+        tpath = external_textures(path)
+        if tpath:
+            with open(tpath, 'rb') as f:
+                textures, skins = load_textures(f.read())
+    geometry = load_geometry(data, hdr, bone_transforms(data, hdr), skins)
+    if geometry is None:
+        return None
+    verts, norms, corners, tex_ids = geometry
+
+    right, up, toward = view_basis(path)
+    scale_size = size * SUPERSAMPLE
+    used = np.unique(corners[..., 0])
+    sx, sy = verts @ right, -(verts @ up)
+    lo = np.array([sx[used].min(), sy[used].min()])
+    hi = np.array([sx[used].max(), sy[used].max()])
+    scale = scale_size * (1 - 2 * MARGIN) / max(float((hi - lo).max()), 1e-6)
+    center = (lo + hi) / 2
+    screen = np.stack([(sx - center[0]) * scale, (sy - center[1]) * scale], axis=1) + scale_size / 2
+
+    light_dir = np.array(LIGHT) / np.linalg.norm(LIGHT)
+    light_dir = light_dir[0] * toward + light_dir[1] * right + light_dir[2] * up
+    lengths = np.linalg.norm(norms, axis=1, keepdims=True)
+    shade = AMBIENT + (1 - AMBIENT) * np.clip((norms / np.maximum(lengths, 1e-9)) @ light_dir, 0, 1)
+
+    image = rasterize(
+        screen[corners[..., 0]],
+        (verts @ toward)[corners[..., 0]],
+        shade[corners[..., 1]],
+        corners[..., 2:].astype(np.float64),
+        tex_ids,
+        textures,
+        scale_size,
+    )
+    image = image.reshape(size, SUPERSAMPLE, size, SUPERSAMPLE, 3).mean(axis=(1, 3))
+    return image.round().astype(np.uint8)
+
+
+def cache_key(path, size):
+    h = hashlib.sha1(f"{RENDER_VERSION}:{size}:{SUPERSAMPLE}".encode())
+    with open(path, 'rb') as f:
+        sources = [path]
+        if read_studio(f.read(STUDIO_HDR.size + 8))["textures"][0] == 0:
+            sources.append(external_textures(path))
+    for source in filter(None, sources):
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+    return h.hexdigest()
+
+
+def placeholder(png_path, mdl_path, version):
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (200, 200), BACKGROUND)
+    draw = ImageDraw.Draw(img)
+    draw.text((10, 10), f"MDL v{version}", fill=(200, 200, 255))
+    draw.text((10, 30), os.path.basename(mdl_path), fill=(200, 200, 0))
+    img.save(png_path, "PNG")
+
+
+def mdl2png(mdl_path, png_path, size=THUMB, cache_dir=CACHE_DIR):
+    # PIL solo se importa al renderizar; parse_*_header no lo necesita
+    from PIL import Image, ImageDraw
+
     try:
-        os.makedirs(os.path.dirname(png_path), exist_ok=True)
+        os.makedirs(os.path.dirname(png_path) or ".", exist_ok=True)
 
         with open(mdl_path, 'rb') as f:
             header = parse_mdl_header(f)
 
-        # Placeholder preview con info
-        img = Image.new("RGB", (200, 200), (30, 30, 40))
-        draw = ImageDraw.Draw(img)
-        draw.text((10, 10), f"MDL v{header['version']}", fill=(200, 200, 255))
-        draw.text((10, 30), os.path.basename(mdl_path), fill=(200, 200, 0))
-        img.save(png_path, "PNG")
+        cached = None
+        if cache_dir:
+            cached = os.path.join(cache_dir, cache_key(mdl_path, size) + ".png")
+            if os.path.exists(cached):
+                # Copiar solo si cambió: preview_atlas reempaqueta por tamaño/mtime
+                if not (os.path.exists(png_path) and filecmp.cmp(cached, png_path, shallow=False)):
+                    shutil.copyfile(cached, png_path)
+                return "cached"
+
+        image = render_mdl(mdl_path, size)
+        if image is None:  # solo texturas o sin bodyparts: placeholder con info
+            placeholder(png_path, mdl_path, header["version"])
+            return True
+        Image.fromarray(image, "RGB").save(png_path, "PNG")
+        if cached:
+            os.makedirs(cache_dir, exist_ok=True)
+            shutil.copyfile(png_path, cached + ".tmp")
+            os.replace(cached + ".tmp", cached)
         return True
 
     except Exception as e:
-        os.makedirs(os.path.dirname(png_path), exist_ok=True)
+        os.makedirs(os.path.dirname(png_path) or ".", exist_ok=True)
         img = Image.new("RGB", (200, 200), (40, 0, 0))
         draw = ImageDraw.Draw(img)
         draw.text((10, 90), f"MDL Error", fill=(255, 255, 255))
@@ -34,8 +374,50 @@ def mdl2png(mdl_path, png_path):
         img.save(png_path, "PNG")
         return False
 
+
+def is_model_file(path):
+    # Se omiten <nombre>T.mdl (texturas) y <nombre>NN.mdl (grupos de secuencias, IDSQ)
+    stem = os.path.splitext(path)[0]
+    if stem[-1:] in ("T", "t") and os.path.exists(stem[:-1] + ".mdl"):
+        return False
+    with open(path, 'rb') as f:
+        return f.read(4) != b'IDSQ'
+
+
+def render_batch(models_dir, out_dir, size=THUMB, cache_dir=CACHE_DIR):
+    # Todo un árbol models/ en un solo proceso; la salida replica las rutas relativas
+    counts = {"rendered": 0, "cached": 0, "failed": 0, "skipped": 0}
+    start = time.perf_counter()
+    for dirpath, _, names in os.walk(models_dir):
+        for name in sorted(names):
+            if not name.lower().endswith(".mdl"):
+                continue
+            path = os.path.join(dirpath, name)
+            if not is_model_file(path):
+                counts["skipped"] += 1
+                continue
+            rel = os.path.relpath(path, models_dir)
+            result = mdl2png(path, os.path.join(out_dir, os.path.splitext(rel)[0] + ".png"), size, cache_dir)
+            counts["cached" if result == "cached" else "rendered" if result else "failed"] += 1
+    counts["seconds"] = round(time.perf_counter() - start, 3)
+    return counts
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Miniaturas de modelos MDL (render por software con NumPy)")
+    parser.add_argument("input", help="Archivo .mdl (o directorio con --batch)")
+    parser.add_argument("output", help="PNG de salida (o directorio con --batch)")
+    parser.add_argument("--batch", action="store_true", help="Renderiza todos los .mdl bajo input")
+    parser.add_argument("--size", type=int, default=THUMB, help="Lado de la miniatura en píxeles")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Caché de renders por hash del archivo")
+    parser.add_argument("--no-cache", action="store_true", help="Renderiza siempre, sin leer ni escribir la caché")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    if len(sys.argv) != 2 and len(sys.argv) != 3:
-        print("Usage: mdl2png.py <input.mdl> <output.png>")
-        sys.exit(1)
-    mdl2png(sys.argv[1], sys.argv[2])
+    args = parse_args()
+    cache_dir = None if args.no_cache else args.cache_dir
+    if args.batch:
+        print(json.dumps(render_batch(args.input, args.output, args.size, cache_dir)))
+    else:
+        mdl2png(args.input, args.output, args.size, cache_dir)
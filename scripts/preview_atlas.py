@@ -0,0 +1,160 @@
+import sys, os, json, argparse
+
+ATLAS_DIR = "atlas"
+INDEX_NAME = "atlas.json"
+KIND_EXTENSIONS = {"sprites": ".spr", "models": ".mdl", "sounds": ".wav"}
+PADDING = 1
+# Si las miniaturas borradas o cambiadas superan esta fracción del área se reempaqueta todo
+MAX_WASTE = 0.35
+
+
+def scan_previews(previews_dir):
+    # Miniaturas generadas por spr2png/mdl2png/wav2waveform, indexadas por asset
+    found = {}
+    for kind, ext in KIND_EXTENSIONS.items():
+        base = os.path.join(previews_dir, kind)
+        for dirpath, _, names in os.walk(base):
+            for name in names:
+                if not name.lower().endswith(".png"):
+                    continue
+                path = os.path.join(dirpath, name)
+                rel = os.path.relpath(path, previews_dir).replace(os.sep, "/")
+                asset = rel.split("/", 1)[1][:-4] + ext
+                st = os.stat(path)
+                found[asset] = {"preview": rel, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    return found
+
+
+def thumb_size(w, h, thumb):
+    scale = min(1.0, thumb / max(w, h))
+    return max(1, round(w * scale)), max(1, round(h * scale))
+
+
+class ShelfSheet:
+    # Estantes: filas de altura fija que se llenan de izquierda a derecha
+    def __init__(self, size, shelves=None):
+        self.size = size
+        self.shelves = [list(s) for s in (shelves or [])]  # [y, alto, x_usado]
+
+    def place(self, w, h):
+        w, h = w + PADDING, h + PADDING
+        best = None
+        for shelf in self.shelves:
+            y, sh, used = shelf
+            if h <= sh and used + w <= self.size and (best is None or sh < best[1]):
+                best = shelf
+        if best is not None:
+            x = best[2]
+            best[2] += w
+            return x, best[0]
+        top = sum(s[1] for s in self.shelves)
+        if top + h > self.size or w > self.size:
+            return None
+        self.shelves.append([top, h, w])
+        return 0, top
+
+
+def build_atlas(previews_dir, thumb=128, sheet_size=2048, repack=False):
+    from PIL import Image
+
+    out_dir = os.path.join(previews_dir, ATLAS_DIR)
+    index_path = os.path.join(out_dir, INDEX_NAME)
+    previous = None
+    if not repack and os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        if previous.get("thumb") != thumb or previous.get("sheet_size") != sheet_size:
+            previous = None
+
+    found = scan_previews(previews_dir)
+    entries, sheets, images, dirty = {}, [], [], set()
+
+    if previous:
+        old_entries = previous.get("entries", {})
+        kept = {a: e for a, e in old_entries.items()
+                if a in found and e["size"] == found[a]["size"] and e["mtime_ns"] == found[a]["mtime_ns"]}
+        old_area = sum(e["w"] * e["h"] for e in old_entries.values())
+        kept_area = sum(e["w"] * e["h"] for e in kept.values())
+        loaded = []
+        if old_area and 1 - kept_area / old_area <= MAX_WASTE:
+            for sheet in previous["sheets"]:
+                path = os.path.join(out_dir, sheet["file"])
+                if not os.path.exists(path):
+                    loaded = []
+                    break
+                img = Image.open(path).convert("RGB")
+                if img.size != (sheet_size, sheet_size):
+                    loaded = []
+                    break
+                loaded.append(img)
+        if loaded:  # si no, demasiados huecos u hojas perdidas: reempaquetar desde cero
+            sheets = [ShelfSheet(sheet_size, sheet["shelves"]) for sheet in previous["sheets"]]
+            images = loaded
+            # Borra las miniaturas que cambiaron o desaparecieron
+            for asset, e in old_entries.items():
+                if asset not in kept:
+                    images[e["sheet"]].paste((0, 0, 0), (e["x"], e["y"], e["x"] + e["w"], e["y"] + e["h"]))
+                    dirty.add(e["sheet"])
+            entries.update(kept)
+
+    pending = []
+    for asset, info in found.items():
+        if asset in entries:
+            continue
+        with Image.open(os.path.join(previews_dir, info["preview"])) as img:
+            w, h = thumb_size(img.width, img.height, thumb)
+            pending.append((asset, info, img.convert("RGB").resize((w, h), Image.LANCZOS)))
+    # Por pack y de más alto a más bajo: los estantes quedan llenos y cada pack contiguo
+    pending.sort(key=lambda p: (p[0].split("/", 1)[0], -p[2].height, p[0]))
+
+    for asset, info, img in pending:
+        for i, sheet in enumerate(sheets):
+            pos = sheet.place(img.width, img.height)
+            if pos:
+                break
+        else:
+            sheets.append(ShelfSheet(sheet_size))
+            images.append(Image.new("RGB", (sheet_size, sheet_size)))
+            i, pos = len(sheets) - 1, sheets[-1].place(img.width, img.height)
+        images[i].paste(img, pos)
+        dirty.add(i)
+        entries[asset] = {"preview": info["preview"], "sheet": i, "x": pos[0], "y": pos[1],
+                          "w": img.width, "h": img.height, "size": info["size"], "mtime_ns": info["mtime_ns"]}
+
+    os.makedirs(out_dir, exist_ok=True)
+    sheet_files = [f"atlas_{i}.png" for i in range(len(sheets))]
+    for i in sorted(dirty):
+        tmp = os.path.join(out_dir, sheet_files[i] + ".tmp")
+        images[i].save(tmp, "PNG")
+        os.replace(tmp, os.path.join(out_dir, sheet_files[i]))
+    for name in os.listdir(out_dir):
+        if name.startswith("atlas_") and name.endswith(".png") and name not in sheet_files:
+            os.remove(os.path.join(out_dir, name))
+
+    index = {
+        "thumb": thumb,
+        "sheet_size": sheet_size,
+        "sheets": [{"file": f, "shelves": s.shelves} for f, s in zip(sheet_files, sheets)],
+        "entries": dict(sorted(entries.items())),
+    }
+    with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    os.replace(index_path + ".tmp", index_path)
+    return {"entries": len(entries), "packed": len(pending), "reused": len(entries) - len(pending),
+            "sheets": len(sheets), "rewritten": len(dirty)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Empaqueta las miniaturas de previews/ en hojas de atlas con índice JSON")
+    parser.add_argument("previews", help="Directorio previews/")
+    parser.add_argument("--thumb", type=int, default=128, help="Lado máximo de cada miniatura")
+    parser.add_argument("--sheet-size", type=int, default=2048, help="Lado de cada hoja")
+    parser.add_argument("--repack", action="store_true", help="Ignora el atlas anterior y reempaqueta todo")
+    args = parser.parse_args(argv)
+
+    print(json.dumps(build_atlas(args.previews, args.thumb, args.sheet_size, args.repack)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
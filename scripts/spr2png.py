@@ -1,5 +1,4 @@
 import sys, os, struct
-from PIL import Image, ImageDraw
 
 def parse_spr_header(f):
     ident = f.read(4)
@@ -21,6 +20,9 @@ def parse_spr_header(f):
     return header
 
 def spr2png(spr_path, png_path):
+    # PIL solo se importa al renderizar; parse_*_header no lo necesita
+    from PIL import Image, ImageDraw
+
     try:
         os.makedirs(os.path.dirname(png_path), exist_ok=True)
         with open(spr_path, "rb") as f:
@@ -1,40 +1,221 @@
-import sys, os, wave, numpy as np
-from PIL import Image, ImageDraw
+import sys, os, struct
 
-def wav2waveform(wav_path, png_path):
-    try:
-        os.makedirs(os.path.dirname(png_path), exist_ok=True)
+def parse_wav_header(f):
+    # Recorre los chunks RIFF con seek: solo lee 'fmt ' y el tamaño de 'data'
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+        raise ValueError("Not a valid WAV file")
+    fmt = None
+    is_float = False
+    data_offset = data_size = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            break
+        cid, size = struct.unpack('<4sI', chunk)
+        if cid == b'fmt ':
+            body = f.read(size + (size & 1))
+            if len(body) < 16:
+                raise ValueError("Truncated WAV fmt chunk")
+            fmt = struct.unpack('<HHIIHH', body[:16])
+            is_float = len(body) >= 26 and body[24:26] == b'\x03\x00'  # subformato de EXTENSIBLE
+        elif cid == b'data':
+            data_offset, data_size = f.tell(), size
+            if fmt:
+                break
+            f.seek(size + (size & 1), 1)
+        else:
+            f.seek(size + (size & 1), 1)
+    if fmt is None or data_offset is None:
+        raise ValueError("WAV without fmt/data chunk")
+    f.seek(0, 2)
+    data_size = min(data_size, f.tell() - data_offset)  # archivos truncados
+    format_tag, channels, rate, _, block_align, bits = fmt
+    frames = data_size // block_align if block_align else 0
+    return {
+        "format": format_tag,
+        "float": format_tag == 3 or is_float,
+        "channels": channels,
+        "rate": rate,
+        "bits": bits,
+        "frames": frames,
+        "duration": frames / rate if rate else 0.0,
+        "data_offset": data_offset,
+        "data_size": data_size,
+    }
+
+def iter_wav_chunks(f, header, chunk_frames=65536, max_frames=None, start_frame=0):
+    # Devuelve bloques float32 (frames x canales) en escala int16, leyendo por trozos
+    import numpy as np
 
-        with wave.open(wav_path, "rb") as w:
-            n_channels = w.getnchannels()
-            sampwidth = w.getsampwidth()
-            framerate = w.getframerate()
-            n_frames = w.getnframes()
-            frames = w.readframes(min(n_frames, 200000))  # limitar para no explotar RAM
-
-        if sampwidth == 1:
-            data = np.frombuffer(frames, dtype=np.uint8).astype(np.int16) - 128
-        elif sampwidth == 2:
-            data = np.frombuffer(frames, dtype=np.int16)
+    fmt, bits, channels = header["format"], header["bits"], header["channels"]
+    width = bits // 8
+    if fmt == 0xFFFE:  # WAVE_FORMAT_EXTENSIBLE: el subformato ya está en "float"
+        fmt = 3 if header["float"] else 1
+    if fmt not in (1, 3) or width not in (1, 2, 3, 4) or channels < 1:
+        raise ValueError(f"Unsupported WAV encoding: format {header['format']}, {bits} bits")
+    start_frame = min(max(0, start_frame), header["frames"])
+    remaining = header["frames"] - start_frame
+    if max_frames is not None:
+        remaining = min(remaining, max_frames)
+    f.seek(header["data_offset"] + start_frame * width * channels)
+    while remaining > 0:
+        n = min(chunk_frames, remaining)
+        raw = f.read(n * width * channels)
+        n = len(raw) // (width * channels)
+        if n == 0:
+            break
+        raw = raw[:n * width * channels]
+        if fmt == 3:
+            data = np.frombuffer(raw, dtype="<f4") * 32767.0
+        elif width == 1:
+            data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) * 256.0
+        elif width == 2:
+            data = np.frombuffer(raw, dtype="<i2").astype(np.float32)
+        elif width == 3:
+            b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            data = ((b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)) << 8 >> 8).astype(np.float32) / 256.0
         else:
-            data = np.frombuffer(frames, dtype=np.int16)
+            data = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 65536.0
+        yield data.astype(np.float32, copy=False).reshape(n, channels)
+        remaining -= n
 
-        if n_channels > 1:
-            data = data.reshape(-1, n_channels).mean(axis=1)
+def read_wav_mono(wav_path, max_frames=None):
+    import numpy as np
 
-        img = Image.new("RGB", (800, 300), (20, 20, 30))
-        draw = ImageDraw.Draw(img)
-        if len(data) > 0:
-            data = data / (np.max(np.abs(data)) or 1)
-            step = max(1, len(data) // 800)
-            for x in range(800):
-                seg = data[x*step:(x+1)*step]
-                if len(seg) == 0: continue
-                vmin, vmax = np.min(seg), np.max(seg)
-                y1 = int((1-vmax)*150)
-                y2 = int((1-vmin)*150)
-                draw.line([(x, y1), (x, y2)], fill=(0,200,255))
-        img.save(png_path, "PNG")
+    with open(wav_path, "rb") as f:
+        header = parse_wav_header(f)
+        chunks = [c.mean(axis=1) for c in iter_wav_chunks(f, header, max_frames=max_frames)]
+    return header, (np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32))
+
+# Pirámide de picos (.peaks), little-endian:
+#   cabecera PEAKS_HEADER: magic, versión, niveles, rate, frames, muestras por bin
+#   del nivel 0, pico absoluto global; luego un uint32 por nivel con su cantidad
+#   de bins y después cada nivel como pares int16 (min, max). El nivel k agrupa
+#   PEAK_BASE * 2**k muestras por bin, así que cualquier zoom se dibuja leyendo
+#   a lo sumo ~2 bins por píxel.
+PEAKS_MAGIC = b'ZPWP'
+PEAKS_HEADER = struct.Struct('<4sHHIIIhh')
+PEAK_BASE = 64
+
+def build_peaks(wav_path):
+    import numpy as np
+
+    with open(wav_path, "rb") as f:
+        header = parse_wav_header(f)
+        mins, maxs = [], []
+        for chunk in iter_wav_chunks(f, header, chunk_frames=PEAK_BASE * 1024):
+            mono = chunk.mean(axis=1)
+            pad = (-len(mono)) % PEAK_BASE
+            if pad:
+                mono = np.concatenate((mono, np.repeat(mono[-1:], pad)))
+            blocks = mono.reshape(-1, PEAK_BASE)
+            mins.append(blocks.min(axis=1))
+            maxs.append(blocks.max(axis=1))
+    lo = np.concatenate(mins) if mins else np.zeros(0, dtype=np.float32)
+    hi = np.concatenate(maxs) if maxs else np.zeros(0, dtype=np.float32)
+    level = np.stack((np.clip(np.rint(lo), -32768, 32767), np.clip(np.rint(hi), -32768, 32767)), 1).astype("<i2")
+    levels = [level]
+    while len(levels[-1]) > 1:
+        prev = levels[-1]
+        if len(prev) % 2:
+            prev = np.concatenate((prev, prev[-1:]))
+        pairs = prev.reshape(-1, 2, 2)
+        levels.append(np.stack((pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)), 1))
+    peak = int(np.abs(level.astype(np.int32)).max()) if len(level) else 0
+    return {"rate": header["rate"], "frames": header["frames"], "base": PEAK_BASE,
+            "peak": min(peak, 32767), "levels": levels}
+
+def write_peaks(peaks, out_path):
+    import numpy as np
+
+    tmp = out_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(PEAKS_HEADER.pack(PEAKS_MAGIC, 1, len(peaks["levels"]), peaks["rate"],
+                                  peaks["frames"], peaks["base"], peaks["peak"], 0))
+        f.write(np.array([len(l) for l in peaks["levels"]], dtype="<u4").tobytes())
+        for level in peaks["levels"]:
+            f.write(level.astype("<i2").tobytes())
+    os.replace(tmp, out_path)
+
+def read_peaks(path):
+    import numpy as np
+
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, _, count, rate, frames, base, peak, _ = PEAKS_HEADER.unpack_from(data, 0)
+    if magic != PEAKS_MAGIC:
+        raise ValueError("Not a waveform peaks file")
+    offset = PEAKS_HEADER.size
+    sizes = np.frombuffer(data, dtype="<u4", count=count, offset=offset)
+    offset += 4 * count
+    levels = []
+    for n in sizes:
+        levels.append(np.frombuffer(data, dtype="<i2", count=int(n) * 2, offset=offset).reshape(-1, 2))
+        offset += int(n) * 4
+    return {"rate": rate, "frames": frames, "base": base, "peak": peak, "levels": levels}
+
+def peak_columns(peaks, width, start=0, end=None, wav_path=None):
+    # (min, max) por columna para el rango de frames [start, end); O(width)
+    import numpy as np
+
+    end = peaks["frames"] if end is None else min(end, peaks["frames"])
+    start = max(0, min(start, end))
+    if end <= start or width <= 0 or not peaks["levels"] or not len(peaks["levels"][0]):
+        return np.zeros(width, dtype=np.float32), np.zeros(width, dtype=np.float32)
+    spp = (end - start) / width
+    edges = start + np.arange(width) * spp
+    if spp < peaks["base"] and wav_path:
+        # Zoom más fino que el nivel 0: se leen solo las muestras visibles (< width * base)
+        with open(wav_path, "rb") as f:
+            header = parse_wav_header(f)
+            chunks = [c.mean(axis=1) for c in iter_wav_chunks(f, header, max_frames=end - start, start_frame=start)]
+        mono = np.concatenate(chunks) if chunks else np.zeros(1, dtype=np.float32)
+        idx = np.minimum((edges - start).astype(np.int64), len(mono) - 1)
+        return np.minimum.reduceat(mono, idx), np.maximum.reduceat(mono, idx)
+    level_no = 0
+    while level_no + 1 < len(peaks["levels"]) and peaks["base"] * 2 ** (level_no + 1) <= spp:
+        level_no += 1
+    level = peaks["levels"][level_no]
+    size = peaks["base"] * 2 ** level_no
+    b0 = int(start // size)
+    b1 = min(len(level), int(np.ceil(end / size)))
+    bins = level[b0:max(b1, b0 + 1)].astype(np.float32)
+    idx = np.minimum((edges // size).astype(np.int64) - b0, len(bins) - 1)
+    # Último bin que toca cada columna (puede ser el primero de la siguiente)
+    last = np.clip(((edges + spp - 1) // size).astype(np.int64) - b0, idx, len(bins) - 1)
+    lo = np.minimum(np.minimum.reduceat(bins[:, 0], idx), bins[last, 0])
+    hi = np.maximum(np.maximum.reduceat(bins[:, 1], idx), bins[last, 1])
+    return lo, hi
+
+def render_peaks(peaks, png_path, width=800, height=300, start=0, end=None, wav_path=None):
+    import numpy as np
+    from PIL import Image
+
+    lo, hi = peak_columns(peaks, width, start, end, wav_path)
+    scale = peaks["peak"] or 1
+    half = height / 2
+    y1 = ((1 - hi / scale) * half).astype(np.int64)
+    y2 = ((1 - lo / scale) * half).astype(np.int64)
+    rows = np.arange(height)[:, None]
+    mask = (rows >= y1[None, :]) & (rows <= y2[None, :])
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+    pixels[:] = (20, 20, 30)
+    pixels[mask] = (0, 200, 255)
+    os.makedirs(os.path.dirname(os.path.abspath(png_path)), exist_ok=True)
+    Image.fromarray(pixels, "RGB").save(png_path, "PNG")
+
+def wav2waveform(wav_path, png_path):
+    # Importes pesados diferidos: el uso incorrecto del CLI no los paga
+    from PIL import Image, ImageDraw
+
+    try:
+        os.makedirs(os.path.dirname(png_path), exist_ok=True)
+
+        # La pirámide queda junto al PNG para redibujar cualquier zoom sin releer el WAV
+        peaks = build_peaks(wav_path)
+        write_peaks(peaks, os.path.splitext(png_path)[0] + ".peaks")
+        render_peaks(peaks, png_path)
         return True
 
     except Exception as e:
@@ -46,7 +227,19 @@ def wav2waveform(wav_path, png_path):
         return False
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: wav2waveform.py <input.wav> <output.png>")
+    args = sys.argv[1:]
+    if len(args) >= 3 and args[0] == "--render":
+        # --render <input.peaks> <output.png> [width height [start end [input.wav]]]
+        nums = [int(a) for a in args[3:7]]
+        width, height = (nums + [800, 300][len(nums):])[:2]
+        start, end = (nums[2], nums[3]) if len(nums) == 4 else (0, None)
+        render_peaks(read_peaks(args[1]), args[2], width, height, start, end, args[7] if len(args) > 7 else None)
+    elif len(args) == 3 and args[0] == "--peaks":
+        write_peaks(build_peaks(args[1]), args[2])
+    elif len(args) == 2:
+        wav2waveform(args[0], args[1])
+    else:
+        print("Usage: wav2waveform.py <input.wav> <output.png>\n"
+              "       wav2waveform.py --peaks <input.wav> <output.peaks>\n"
+              "       wav2waveform.py --render <input.peaks> <output.png> [width height [start end [input.wav]]]")
         sys.exit(1)
-    wav2waveform(sys.argv[1], sys.argv[2])
@@ -0,0 +1,403 @@
+"""Nearest-neighbour index of plugins for dedup and review.
+
+Every dataset row is represented twice: the numeric vector produced by
+``train_baseline.build_feature_columns`` (standardized, then L2-normalized)
+and a TF-IDF vector over its list-column tokens (abilities, register calls,
+resource paths, items). Similarity is the weighted sum of both cosines.
+
+Small corpora are searched exactly with one matrix product per part. Above
+``APPROXIMATE_THRESHOLD`` rows the index also stores an inverted-file
+structure: rows are assigned to k-means lists over a dense embedding (numeric
+part plus a truncated SVD of the TF-IDF part) and a query only rescores the
+rows of its ``nprobe`` closest lists exactly.
+
+The index is persisted as ``index.npz`` (arrays) plus ``index.json``
+(vocabulary, scaling and metadata); loading it needs only NumPy and SciPy.
+From Python, load once with :meth:`SimilarityIndex.load` and call
+:meth:`SimilarityIndex.similar_to_sma` or :meth:`SimilarityIndex.similar_to_file`.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+import train_baseline
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    import numpy as np
+    import pandas as pd
+    from scipy import sparse
+
+ROOT = Path(__file__).resolve().parent
+INDEX_DIR = ROOT / "similarity_index"
+APPROXIMATE_THRESHOLD = 20000
+DEFAULT_NUMERIC_WEIGHT = 0.5
+DEFAULT_NPROBE = 8
+EMBEDDING_COMPONENTS = 64
+
+
+def row_tokens(row: "pd.Series") -> List[str]:
+    """Return the TF-IDF tokens of a processed dataset row."""
+    tokens: List[str] = []
+    for column in train_baseline.LIST_COLUMNS:
+        values = row.get(column)
+        if isinstance(values, list):
+            tokens.extend(f"{column}={value}" for value in values)
+    return tokens
+
+
+def prepare_frame(dataframe: pd.DataFrame) -> pd.DataFrame:
+    return train_baseline.fill_missing_values(train_baseline.ensure_list_columns(dataframe))
+
+
+def feature_matrix(frame: pd.DataFrame, columns: Sequence[str]) -> np.ndarray:
+    """Numeric features aligned to ``columns``.
+
+    ``build_feature_columns`` derives its ability/reg columns from the frame it
+    is given, so the one-hot columns of the stored layout are recomputed here
+    for frames (such as a single query row) that did not produce them.
+    """
+    import numpy as np
+
+    features = train_baseline.build_feature_columns(frame).reindex(columns=list(columns), fill_value=0)
+    for column in columns:
+        for prefix, source in (("ability_", "abilities"), ("reg_", "register_calls")):
+            if column.startswith(prefix):
+                name = column[len(prefix):]
+                features[column] = frame[source].apply(lambda values, name=name: int(name in values))
+    return features.to_numpy(dtype=np.float64)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    import numpy as np
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class SimilarityIndex:
+    """Weighted cosine similarity over numeric features and TF-IDF tokens."""
+
+    def __init__(
+        self,
+        files: Sequence[str],
+        entity_types: Sequence[str],
+        numeric: np.ndarray,
+        tokens: sparse.csr_matrix,
+        meta: Dict[str, object],
+        ivf: Optional[Dict[str, np.ndarray]] = None,
+    ) -> None:
+        import numpy as np
+
+        self.files = list(files)
+        self.entity_types = list(entity_types)
+        self.numeric = numeric
+        self.tokens = tokens
+        self.meta = meta
+        self.ivf = ivf
+        self._positions = {name: position for position, name in enumerate(self.files)}
+        self._vocabulary: Dict[str, int] = meta["vocabulary"]  # type: ignore[assignment]
+        self._idf = np.asarray(meta["idf"], dtype=np.float32)
+        self._mean = np.asarray(meta["mean"], dtype=np.float64)
+        self._scale = np.asarray(meta["scale"], dtype=np.float64)
+
+    # ------------------------------------------------------------------ build
+    @classmethod
+    def build(
+        cls,
+        dataframe: pd.DataFrame,
+        *,
+        numeric_weight: float = DEFAULT_NUMERIC_WEIGHT,
+        approximate: Optional[bool] = None,
+    ) -> "SimilarityIndex":
+        import numpy as np
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        frame = prepare_frame(dataframe)
+        feature_columns = list(train_baseline.build_feature_columns(frame).columns)
+        raw = feature_matrix(frame, feature_columns)
+        mean = raw.mean(axis=0)
+        scale = raw.std(axis=0)
+        scale[scale == 0] = 1.0
+
+        vectorizer = TfidfVectorizer(analyzer=lambda tokens: tokens, sublinear_tf=True, dtype=np.float32)
+        tokens = vectorizer.fit_transform(row_tokens(row) for _, row in frame.iterrows()).tocsr()
+        meta: Dict[str, object] = {
+            "feature_columns": feature_columns,
+            "mean": mean.tolist(),
+            "scale": scale.tolist(),
+            "vocabulary": {token: int(index) for token, index in vectorizer.vocabulary_.items()},
+            "idf": vectorizer.idf_.tolist(),
+            "numeric_weight": numeric_weight,
+        }
+        numeric = _normalize_rows((raw - mean) / scale).astype(np.float32)
+        index = cls(
+            frame["file"].astype(str).tolist(),
+            frame["entity_type"].astype(str).tolist() if "entity_type" in frame else ["unknown"] * len(frame),
+            numeric,
+            tokens,
+            meta,
+        )
+        if approximate is None:
+            approximate = len(frame) >= APPROXIMATE_THRESHOLD
+        if approximate:
+            index._build_ivf()
+        return index
+
+    def _build_ivf(self) -> None:
+        import numpy as np
+        from sklearn.cluster import MiniBatchKMeans
+        from sklearn.decomposition import TruncatedSVD
+
+        components = min(EMBEDDING_COMPONENTS, max(1, self.tokens.shape[1] - 1))
+        svd = TruncatedSVD(n_components=components, random_state=train_baseline.RANDOM_SEED)
+        svd.fit(self.tokens)
+        projection = svd.components_.T.astype(np.float32)
+        embedding = self._embed(self.numeric, self.tokens, projection)
+        n_lists = max(1, int(math.sqrt(len(self.files))))
+        kmeans = MiniBatchKMeans(
+            n_clusters=n_lists, random_state=train_baseline.RANDOM_SEED, n_init=3, batch_size=4096
+        ).fit(embedding)
+        assignments = kmeans.labels_.astype(np.int32)
+        order = np.argsort(assignments, kind="stable").astype(np.int32)
+        offsets = np.searchsorted(assignments[order], np.arange(n_lists + 1)).astype(np.int64)
+        self.ivf = {
+            "projection": projection,
+            "centroids": kmeans.cluster_centers_.astype(np.float32),
+            "order": order,
+            "offsets": offsets,
+        }
+
+    def _embed(self, numeric: np.ndarray, tokens: sparse.csr_matrix, projection: np.ndarray) -> np.ndarray:
+        import numpy as np
+
+        weight = float(self.meta["numeric_weight"])
+        reduced = _normalize_rows(np.asarray(tokens @ projection))
+        return np.hstack([math.sqrt(weight) * numeric, math.sqrt(1.0 - weight) * reduced]).astype(np.float32)
+
+    # ---------------------------------------------------------- persistence
+    def save(self, directory: Path = INDEX_DIR) -> None:
+        import numpy as np
+
+        directory.mkdir(parents=True, exist_ok=True)
+        arrays = {
+            "numeric": self.numeric,
+            "tokens_data": self.tokens.data,
+            "tokens_indices": self.tokens.indices,
+            "tokens_indptr": self.tokens.indptr,
+            "tokens_shape": np.asarray(self.tokens.shape),
+        }
+        if self.ivf is not None:
+            arrays.update({f"ivf_{name}": value for name, value in self.ivf.items()})
+        tmp_arrays = directory / "index.npz.tmp"
+        with tmp_arrays.open("wb") as handle:
+            np.savez(handle, **arrays)
+        tmp_arrays.replace(directory / "index.npz")
+        meta = dict(self.meta, files=self.files, entity_types=self.entity_types)
+        tmp_meta = directory / "index.json.tmp"
+        tmp_meta.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        tmp_meta.replace(directory / "index.json")
+
+    @classmethod
+    def load(cls, directory: Path = INDEX_DIR) -> "SimilarityIndex":
+        import numpy as np
+        from scipy import sparse
+
+        meta = json.loads((directory / "index.json").read_text(encoding="utf-8"))
+        with np.load(directory / "index.npz", allow_pickle=False) as arrays:
+            tokens = sparse.csr_matrix(
+                (arrays["tokens_data"], arrays["tokens_indices"], arrays["tokens_indptr"]),
+                shape=tuple(arrays["tokens_shape"]),
+            )
+            ivf = {
+                name[len("ivf_"):]: arrays[name] for name in arrays.files if name.startswith("ivf_")
+            } or None
+            numeric = arrays["numeric"]
+        files = meta.pop("files")
+        entity_types = meta.pop("entity_types")
+        return cls(files, entity_types, numeric, tokens, meta, ivf)
+
+    # ---------------------------------------------------------------- query
+    def vectorize(self, dataframe: pd.DataFrame) -> tuple[np.ndarray, sparse.csr_matrix]:
+        """Project raw dataset rows into the index space."""
+        import numpy as np
+        from scipy import sparse
+
+        frame = prepare_frame(dataframe)
+        raw = feature_matrix(frame, self.meta["feature_columns"])  # type: ignore[arg-type]
+        numeric = _normalize_rows((raw - self._mean) / self._scale).astype(np.float32)
+
+        rows, cols, values = [], [], []
+        for position, (_, row) in enumerate(frame.iterrows()):
+            counts: Dict[int, int] = {}
+            for token in row_tokens(row):
+                column = self._vocabulary.get(token)
+                if column is not None:
+                    counts[column] = counts.get(column, 0) + 1
+            for column, count in counts.items():
+                rows.append(position)
+                cols.append(column)
+                values.append((1.0 + math.log(count)) * self._idf[column])
+        tokens = sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float32), (rows, cols)),
+            shape=(len(frame), len(self._idf)),
+        )
+        norms = np.sqrt(np.asarray(tokens.multiply(tokens).sum(axis=1))).ravel()
+        norms[norms == 0] = 1.0
+        tokens = sparse.diags(1.0 / norms).astype(np.float32) @ tokens
+        return numeric, tokens.tocsr()
+
+    def _candidates(self, numeric: np.ndarray, tokens: sparse.csr_matrix, nprobe: int) -> Optional[np.ndarray]:
+        import numpy as np
+
+        if self.ivf is None:
+            return None
+        embedding = self._embed(numeric, tokens, self.ivf["projection"])[0]
+        distances = ((self.ivf["centroids"] - embedding) ** 2).sum(axis=1)
+        lists = np.argsort(distances)[:nprobe]
+        offsets, order = self.ivf["offsets"], self.ivf["order"]
+        return np.concatenate([order[offsets[lst]:offsets[lst + 1]] for lst in lists])
+
+    def search(
+        self,
+        numeric: np.ndarray,
+        tokens: sparse.csr_matrix,
+        k: int = 10,
+        *,
+        exclude: Optional[str] = None,
+        nprobe: int = DEFAULT_NPROBE,
+    ) -> List[Dict[str, object]]:
+        """Top-``k`` rows for one vectorized query (first row of the inputs)."""
+        import numpy as np
+
+        weight = float(self.meta["numeric_weight"])
+        candidates = self._candidates(numeric[:1], tokens[:1], nprobe)
+        base_numeric = self.numeric if candidates is None else self.numeric[candidates]
+        base_tokens = self.tokens if candidates is None else self.tokens[candidates]
+        scores = weight * (base_numeric @ numeric[0]) + (1.0 - weight) * np.asarray(
+            (base_tokens @ tokens[0].T).todense()
+        ).ravel()
+        positions = np.arange(len(scores)) if candidates is None else candidates
+        if exclude is not None and exclude in self._positions:
+            scores = np.where(positions == self._positions[exclude], -np.inf, scores)
+        top = min(k, len(scores))
+        best = np.argpartition(-scores, top - 1)[:top] if top else np.array([], dtype=int)
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [
+            {
+                "file": self.files[positions[index]],
+                "entity_type": self.entity_types[positions[index]],
+                "score": round(float(scores[index]), 6),
+            }
+            for index in best
+            if np.isfinite(scores[index])
+        ]
+
+    def similar_to_file(self, file: str, k: int = 10, **kwargs) -> List[Dict[str, object]]:
+        """Neighbours of a row already in the index, excluding itself."""
+        import numpy as np
+
+        position = self._positions[file]
+        return self.search(
+            self.numeric[position:position + 1].astype(np.float32),
+            self.tokens[position:position + 1],
+            k,
+            exclude=file,
+            **kwargs,
+        )
+
+    def similar_to_sma(self, path: Path, k: int = 10, **kwargs) -> List[Dict[str, object]]:
+        """Neighbours of a ``.sma`` that need not be part of the dataset."""
+        import pandas as pd
+
+        import dataset_builder
+
+        path = Path(path).resolve()
+        if not path.is_file():
+            raise FileNotFoundError(f"No such .sma file or dataset row: {path}")
+        record = dataset_builder.parse_sma_file(path, logging.getLogger("similarity_index"), path.parent)
+        if record is None:
+            raise ValueError(f"Could not read {path}")
+        numeric, tokens = self.vectorize(pd.DataFrame([record.as_dict()]))
+        return self.search(numeric, tokens, k, **kwargs)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build or query the similar-plugins index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Build the index from the dataset.")
+    build.add_argument("--dataset-path", type=Path, default=None, help="Dataset file or partitioned directory.")
+    build.add_argument("--index-dir", type=Path, default=INDEX_DIR, help="Where the index is written.")
+    build.add_argument(
+        "--numeric-weight",
+        type=float,
+        default=DEFAULT_NUMERIC_WEIGHT,
+        help="Weight of the numeric-feature cosine (the TF-IDF cosine gets the rest).",
+    )
+    mode = build.add_mutually_exclusive_group()
+    mode.add_argument("--approximate", dest="approximate", action="store_true", default=None,
+                      help="Always store the inverted-file index.")
+    mode.add_argument("--exact", dest="approximate", action="store_false",
+                      help="Never store the inverted-file index.")
+
+    query = subparsers.add_parser("query", help="Find the plugins most similar to a .sma or dataset row.")
+    query.add_argument("target", help="Path to a .sma file, or the 'file' value of a dataset row.")
+    query.add_argument("-k", type=int, default=10, help="Number of neighbours.")
+    query.add_argument("--index-dir", type=Path, default=INDEX_DIR, help="Index location.")
+    query.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE, help="Lists scanned by the approximate index.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    train_baseline.setup_logging()
+    args = parse_args(argv)
+
+    if args.command == "build":
+        namespace = argparse.Namespace(dataset_path=args.dataset_path, no_parquet=False)
+        try:
+            dataset_path = train_baseline.detect_dataset_path(namespace)
+        except FileNotFoundError as exc:
+            logging.error("%s", exc)
+            return 1
+        dataframe = train_baseline.read_dataset(dataset_path)
+        start = time.perf_counter()
+        index = SimilarityIndex.build(
+            dataframe, numeric_weight=args.numeric_weight, approximate=args.approximate
+        )
+        index.save(args.index_dir)
+        logging.info(
+            "Indexed %d rows (%s) in %.2fs at %s",
+            len(index.files),
+            "approximate" if index.ivf is not None else "exact",
+            time.perf_counter() - start,
+            args.index_dir,
+        )
+        return 0
+
+    index = SimilarityIndex.load(args.index_dir)
+    start = time.perf_counter()
+    if args.target in index.files:
+        results = index.similar_to_file(args.target, args.k, nprobe=args.nprobe)
+    else:
+        try:
+            results = index.similar_to_sma(Path(args.target), args.k, nprobe=args.nprobe)
+        except (FileNotFoundError, ValueError) as exc:
+            logging.error("%s", exc)
+            return 1
+    elapsed_ms = (time.perf_counter() - start) * 1000.0
+    json.dump({"target": args.target, "query_ms": round(elapsed_ms, 2), "results": results},
+              sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+"""Out-of-core alternative to ``train_baseline.py`` for very large datasets.
+
+Records are streamed in fixed-size batches from the Parquet dataset (a file
+or the pack-partitioned directory), a JSONL file or a CSV export. Each row is
+turned into a dict of tokens (list-column values, name keywords and
+log-scaled numeric columns) and hashed into a fixed-width sparse space with
+``FeatureHasher``, so no vocabulary is kept in memory. The model is an
+incremental linear classifier (``SGDClassifier``) or naive Bayes
+(``MultinomialNB``) trained with ``partial_fit``.
+
+Rows are assigned to the held-out stream by a stable hash of their
+``cluster_id`` (falling back to ``file``), so near-duplicates never straddle
+the split. Evaluation accumulates a confusion matrix instead of keeping
+predictions, so memory depends on the batch size and hash width only.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence
+
+from train_baseline import (
+    EXPECTED_STATS,
+    LIST_COLUMNS,
+    NAME_KEYWORDS,
+    PATH_COLUMNS,
+    RANDOM_SEED,
+    RESULTS_DIR,
+    normalise_paths,
+    parse_list_cell,
+    sanitise_token,
+    setup_logging,
+)
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    from sklearn.feature_extraction import FeatureHasher
+
+NUMERIC_COLUMNS = [
+    "line_count",
+    "resource_count",
+    "register_count",
+    "ability_count",
+] + EXPECTED_STATS
+LABEL_COLUMN = "entity_type"
+DEFAULT_BATCH_SIZE = 1024
+DEFAULT_N_FEATURES = 2**18
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Train an entity-type classifier out of core with feature hashing and partial_fit."
+    )
+    parser.add_argument(
+        "--dataset-path",
+        type=Path,
+        default=None,
+        help="Parquet file or directory, JSONL or CSV dataset (defaults to dataset.parquet/dataset.csv).",
+    )
+    parser.add_argument(
+        "--model",
+        choices=("sgd", "nb"),
+        default="sgd",
+        help="Incremental model: logistic-loss SGD or multinomial naive Bayes.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Rows per streamed batch.",
+    )
+    parser.add_argument(
+        "--n-features",
+        type=int,
+        default=DEFAULT_N_FEATURES,
+        help="Width of the hashed feature space.",
+    )
+    parser.add_argument(
+        "--epochs",
+        type=int,
+        default=5,
+        help="Passes over the training stream.",
+    )
+    parser.add_argument(
+        "--test-percent",
+        type=int,
+        default=20,
+        help="Percentage of hash buckets routed to the held-out stream.",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Stop streaming after this many rows (for debugging).",
+    )
+    return parser.parse_args(argv)
+
+
+def detect_dataset_path(path: Optional[Path]) -> Path:
+    if path is not None:
+        if not path.exists():
+            raise FileNotFoundError(f"Dataset not found at {path!s}")
+        return path
+    for candidate in (Path("dataset.parquet"), Path("dataset.csv")):
+        if candidate.exists():
+            return candidate
+    raise FileNotFoundError(
+        "No dataset found. Expected dataset.parquet or dataset.csv in the project root."
+    )
+
+
+def iter_records(path: Path, batch_size: int, columns: Optional[Sequence[str]] = None) -> Iterator[List[dict]]:
+    """Yield lists of at most ``batch_size`` row dicts without loading the dataset."""
+    suffix = path.suffix.lower()
+    if path.is_dir() or suffix == ".parquet":
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(
+            path,
+            format="parquet",
+            partitioning="hive" if path.is_dir() else None,
+            exclude_invalid_files=True,
+        )
+        wanted = None
+        if columns is not None:
+            wanted = [column for column in columns if column in dataset.schema.names]
+        for batch in dataset.to_batches(columns=wanted, batch_size=batch_size):
+            if batch.num_rows:
+                yield batch.to_pylist()
+    elif suffix in (".jsonl", ".ndjson"):
+        rows: List[dict] = []
+        with path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                if line.strip():
+                    rows.append(json.loads(line))
+                if len(rows) >= batch_size:
+                    yield rows
+                    rows = []
+        if rows:
+            yield rows
+    else:
+        import pandas as pd
+
+        for chunk in pd.read_csv(path, chunksize=batch_size, usecols=lambda name: columns is None or name in columns):
+            yield chunk.astype(object).where(chunk.notna(), None).to_dict(orient="records")
+
+
+def limited(batches: Iterator[List[dict]], limit: Optional[int]) -> Iterator[List[dict]]:
+    if limit is None:
+        yield from batches
+        return
+    remaining = limit
+    for rows in batches:
+        if remaining <= 0:
+            return
+        yield rows[:remaining]
+        remaining -= len(rows)
+
+
+def is_held_out(row: dict, test_percent: int) -> bool:
+    """Route a row to the held-out stream by a stable hash of its group."""
+    group = row.get("cluster_id")
+    if group is None or (isinstance(group, float) and math.isnan(group)):
+        group = row.get("file", "")
+    return zlib.crc32(str(group).encode("utf-8")) % 100 < test_percent
+
+
+def row_tokens(row: dict, non_negative: bool) -> Dict[str, float]:
+    """Map a raw dataset row to the hashed model's token dict."""
+    tokens: Dict[str, float] = {}
+    for column in LIST_COLUMNS:
+        values = parse_list_cell(row.get(column))
+        if column in PATH_COLUMNS:
+            values = normalise_paths(values)
+        elif column in ("abilities", "register_calls"):
+            values = [sanitise_token(value) for value in values]
+        for value in values:
+            tokens[f"{column}={value}"] = 1.0
+        tokens[f"{column}#count"] = math.log1p(len(values))
+
+    for column in NUMERIC_COLUMNS:
+        value = row.get(column)
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            continue
+        if math.isnan(number):
+            continue
+        scaled = math.copysign(math.log1p(abs(number)), number)
+        tokens[column] = abs(scaled) if non_negative else scaled
+
+    name = str(row.get("entity_name") or "").lower()
+    for keyword in NAME_KEYWORDS:
+        if keyword in name:
+            tokens[f"name_contains_{keyword}"] = 1.0
+    return tokens
+
+
+def label_of(row: dict) -> str:
+    label = row.get(LABEL_COLUMN)
+    return "unknown" if label is None or label == "" else str(label)
+
+
+def scan_classes(path: Path, batch_size: int, limit: Optional[int]) -> List[str]:
+    """First pass over the label column only; ``partial_fit`` needs every class up front."""
+    classes: set = set()
+    for rows in limited(iter_records(path, batch_size, [LABEL_COLUMN]), limit):
+        classes.update(label_of(row) for row in rows)
+    return sorted(classes)
+
+
+def build_model(kind: str):
+    if kind == "nb":
+        from sklearn.naive_bayes import MultinomialNB
+
+        return MultinomialNB(alpha=0.1)
+    from sklearn.linear_model import SGDClassifier
+
+    return SGDClassifier(loss="log_loss", alpha=1e-4, random_state=RANDOM_SEED)
+
+
+def transform(hasher: FeatureHasher, rows: Sequence[dict], non_negative: bool):
+    return hasher.transform(row_tokens(row, non_negative) for row in rows)
+
+
+def train_stream(args: argparse.Namespace, dataset_path: Path, classes: Sequence[str]):
+    """Fit the incremental model over ``args.epochs`` passes of the training stream."""
+    import numpy as np
+    from sklearn.feature_extraction import FeatureHasher
+
+    non_negative = args.model == "nb"
+    hasher = FeatureHasher(
+        n_features=args.n_features, input_type="dict", alternate_sign=not non_negative
+    )
+    model = build_model(args.model)
+    rng = np.random.default_rng(RANDOM_SEED)
+    class_array = np.array(classes)
+    trained_rows = 0
+    for epoch in range(args.epochs):
+        epoch_rows = 0
+        for rows in limited(iter_records(dataset_path, args.batch_size), args.limit):
+            train_rows = [row for row in rows if not is_held_out(row, args.test_percent)]
+            if not train_rows:
+                continue
+            order = rng.permutation(len(train_rows))
+            train_rows = [train_rows[index] for index in order]
+            X = transform(hasher, train_rows, non_negative)
+            y = np.array([label_of(row) for row in train_rows])
+            model.partial_fit(X, y, classes=class_array)
+            epoch_rows += len(train_rows)
+        logging.info("Epoch %d/%d: streamed %d training rows", epoch + 1, args.epochs, epoch_rows)
+        trained_rows = epoch_rows
+    return hasher, model, trained_rows
+
+
+def evaluate_stream(args: argparse.Namespace, dataset_path: Path, hasher, model) -> dict:
+    """Score the held-out stream, keeping only a confusion matrix in memory."""
+    non_negative = args.model == "nb"
+    confusion: Counter = Counter()
+    for rows in limited(iter_records(dataset_path, args.batch_size), args.limit):
+        test_rows = [row for row in rows if is_held_out(row, args.test_percent)]
+        if not test_rows:
+            continue
+        predictions = model.predict(transform(hasher, test_rows, non_negative))
+        confusion.update(zip((label_of(row) for row in test_rows), predictions))
+    return metrics_from_confusion(confusion)
+
+
+def metrics_from_confusion(confusion: Counter) -> dict:
+    total = sum(confusion.values())
+    labels = sorted({label for pair in confusion for label in pair})
+    report: Dict[str, dict] = {}
+    for label in labels:
+        true_positive = confusion[(label, label)]
+        predicted = sum(count for (_, pred), count in confusion.items() if pred == label)
+        support = sum(count for (true, _), count in confusion.items() if true == label)
+        precision = true_positive / predicted if predicted else 0.0
+        recall = true_positive / support if support else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        report[label] = {"precision": precision, "recall": recall, "f1-score": f1, "support": support}
+    supported = [entry for entry in report.values() if entry["support"]]
+    return {
+        "test_rows": total,
+        "accuracy": sum(confusion[(label, label)] for label in labels) / total if total else None,
+        "macro_f1": sum(entry["f1-score"] for entry in supported) / len(supported) if supported else None,
+        "classification_report": report,
+        "confusion": [
+            {"true": true, "predicted": str(pred), "count": count}
+            for (true, pred), count in sorted(confusion.items())
+        ],
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Streaming training workflow."""
+    setup_logging()
+    args = parse_args(argv)
+
+    try:
+        dataset_path = detect_dataset_path(args.dataset_path)
+    except FileNotFoundError as exc:
+        logging.error("%s", exc)
+        return
+    logging.info("Streaming dataset from %s in batches of %d rows", dataset_path, args.batch_size)
+
+    classes = scan_classes(dataset_path, args.batch_size, args.limit)
+    if len(classes) < 2:
+        logging.error("Need at least two entity types to train; found %s", classes)
+        return
+    logging.info("Found %d entity types: %s", len(classes), ", ".join(classes))
+
+    hasher, model, trained_rows = train_stream(args, dataset_path, classes)
+    if trained_rows == 0:
+        logging.error("Training stream is empty; lower --test-percent or add data.")
+        return
+    metrics = evaluate_stream(args, dataset_path, hasher, model)
+    metrics.update(
+        {
+            "model": args.model,
+            "train_rows": trained_rows,
+            "epochs": args.epochs,
+            "n_features": args.n_features,
+            "batch_size": args.batch_size,
+            "classes": list(classes),
+        }
+    )
+    if metrics["accuracy"] is not None:
+        logging.info(
+            "Held-out accuracy: %.4f | macro F1: %.4f (%d rows)",
+            metrics["accuracy"],
+            metrics["macro_f1"],
+            metrics["test_rows"],
+        )
+    else:
+        logging.warning("Held-out stream is empty; no metrics computed.")
+
+    import joblib
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    metrics_path = RESULTS_DIR / "streaming_metrics.json"
+    with metrics_path.open("w", encoding="utf-8") as handle:
+        json.dump(metrics, handle, indent=2)
+    logging.info("Saved metrics to %s", metrics_path)
+    model_path = RESULTS_DIR / "streaming_model.pkl"
+    joblib.dump({"hasher": hasher, "model": model, "non_negative": args.model == "nb"}, model_path)
+    logging.info("Saved trained model to %s", model_path)
+
+
+if __name__ == "__main__":
+    main()
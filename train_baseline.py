@@ -1,29 +1,31 @@
-"""Train a RandomForest baseline model for entity classification."""
+"""Train a RandomForest baseline model for entity classification.
+
+Heavy third-party libraries (pandas, NumPy, scikit-learn, joblib and the
+plotting stack) are imported inside the functions that use them so that
+``--help`` and early failures such as a missing dataset stay fast.
+"""
 from __future__ import annotations
 
 import argparse
 import ast
 import json
 import logging
+import math
 import re
 import shutil
+import time
+import warnings
 from collections import Counter
+from itertools import product
 from pathlib import Path
-from typing import Iterable, List, Sequence
-
-import joblib
-import numpy as np
-import pandas as pd
-import seaborn as sns
-from matplotlib import pyplot as plt
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import (
-    accuracy_score,
-    classification_report,
-    confusion_matrix,
-    f1_score,
-)
-from sklearn.model_selection import StratifiedKFold, cross_val_score, train_test_split
+from typing import TYPE_CHECKING, Iterable, List, Optional, Sequence
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    import numpy as np
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+
+    from result_cache import ResultCache
 
 RESULTS_DIR = Path("results")
 LIST_COLUMNS = [
@@ -58,6 +60,11 @@ NAME_KEYWORDS = [
     "guardian",
 ]
 RANDOM_SEED = 42
+SEARCH_GRID = {
+    "n_estimators": [50, 100, 200, 400],
+    "max_depth": [None, 10, 20],
+    "max_features": ["sqrt", "log2", None],
+}
 
 
 def parse_args() -> argparse.Namespace:
@@ -90,6 +97,51 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Delete the results directory after finishing execution.",
     )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="Run a hyperparameter search over n_estimators, max_depth and max_features.",
+    )
+    parser.add_argument(
+        "--n-jobs",
+        type=int,
+        default=-1,
+        help="Total number of CPU cores to use (-1 uses all available cores).",
+    )
+    parser.add_argument(
+        "--early-stopping-tol",
+        type=float,
+        default=0.001,
+        help="Stop growing a search configuration when mean CV accuracy improves less than this.",
+    )
+    parser.add_argument(
+        "--no-group-split",
+        action="store_true",
+        help="Ignore the dataset's cluster_id column and split rows independently.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always retrain instead of reusing cached runs and CV folds.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=Path("results_cache"),
+        help="Directory of the content-addressed training cache.",
+    )
+    parser.add_argument(
+        "--cache-max-age-days",
+        type=float,
+        default=30.0,
+        help="Evict cache entries not used for this many days.",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=512.0,
+        help="Evict the oldest cache entries once the cache exceeds this size.",
+    )
     return parser.parse_args()
 
 
@@ -127,7 +179,17 @@ def detect_dataset_path(args: argparse.Namespace) -> Path:
 
 
 def read_dataset(path: Path, force_csv: bool = False) -> pd.DataFrame:
-    """Read a dataset from CSV or Parquet based on file extension."""
+    """Read a dataset from CSV or Parquet based on file extension.
+
+    A directory is read as the pack-partitioned Parquet dataset written by
+    ``dataset_builder.py --merge``; the partition key becomes a ``pack`` column.
+    """
+    import pandas as pd
+
+    if path.is_dir():
+        logging.info("Loading partitioned Parquet dataset from directory: %s", path)
+        return pd.read_parquet(path)
+
     suffix = path.suffix.lower()
     if suffix == ".parquet" and not force_csv:
         logging.info("Loading dataset from Parquet: %s", path)
@@ -138,12 +200,18 @@ def read_dataset(path: Path, force_csv: bool = False) -> pd.DataFrame:
 
 
 def parse_list_cell(value: object) -> List[str]:
-    """Convert a dataset cell into a list of strings."""
-    if isinstance(value, list):
+    """Convert a dataset cell into a list of strings.
+
+    Parquet list cells arrive as NumPy arrays; they are converted with
+    ``tolist`` so they are read like the lists the CSV cells parse into.
+    """
+    if hasattr(value, "tolist"):
+        value = value.tolist()
+    if isinstance(value, (list, tuple)):
         return [str(item).strip() for item in value if str(item).strip()]
     if value is None:
         return []
-    if isinstance(value, float) and np.isnan(value):
+    if isinstance(value, float) and math.isnan(value):
         return []
     if isinstance(value, str):
         cleaned = value.strip()
@@ -182,6 +250,8 @@ def sanitise_token(value: str) -> str:
 
 def ensure_list_columns(df: pd.DataFrame) -> pd.DataFrame:
     """Ensure that expected list-like columns exist and are properly formatted."""
+    import pandas as pd
+
     df = df.copy()
     for column in LIST_COLUMNS:
         if column not in df.columns:
@@ -207,6 +277,8 @@ def ensure_list_columns(df: pd.DataFrame) -> pd.DataFrame:
 
 def fill_missing_values(df: pd.DataFrame) -> pd.DataFrame:
     """Fill missing numeric and textual values with sensible defaults."""
+    import pandas as pd
+
     df = df.copy()
 
     for column in EXPECTED_STATS:
@@ -241,6 +313,8 @@ def fill_missing_values(df: pd.DataFrame) -> pd.DataFrame:
 
 def build_feature_columns(df: pd.DataFrame) -> pd.DataFrame:
     """Create model-ready feature columns from the processed dataset."""
+    import pandas as pd
+
     df = df.copy()
 
     df["ability_count"] = df["abilities"].apply(len)
@@ -332,10 +406,230 @@ def export_debug_dataset(features: pd.DataFrame, labels: pd.Series) -> None:
     logging.info("Exported debug dataset to %s", debug_path)
 
 
+def resolve_parallelism(n_jobs: int, n_tasks: int) -> tuple[int, int]:
+    """Split a core budget between outer tasks and inner estimator threads.
+
+    The outer level runs ``n_tasks`` independent jobs (CV folds or search
+    configurations) and each job gets ``inner`` cores for its own forest, so
+    ``outer * inner`` never exceeds the requested budget.
+    """
+    import joblib
+
+    total = joblib.effective_n_jobs(n_jobs)
+    outer = max(1, min(total, n_tasks))
+    inner = max(1, total // outer)
+    return outer, inner
+
+
+def _grow_search_configuration(
+    X: np.ndarray,
+    y: np.ndarray,
+    folds: Sequence[tuple[np.ndarray, np.ndarray]],
+    max_depth: Optional[int],
+    max_features: Optional[str],
+    n_estimators_grid: Sequence[int],
+    inner_jobs: int,
+    tol: float,
+) -> List[dict]:
+    """Grow one forest per fold with ``warm_start`` and score each tree count.
+
+    Larger tree counts extend the forests fitted for smaller ones instead of
+    starting from scratch. Growth stops early once the mean fold accuracy
+    improves by less than ``tol``.
+    """
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+
+    models = [
+        RandomForestClassifier(
+            n_estimators=0,
+            max_depth=max_depth,
+            max_features=max_features,
+            random_state=RANDOM_SEED,
+            class_weight="balanced",
+            warm_start=True,
+            n_jobs=inner_jobs,
+        )
+        for _ in folds
+    ]
+    fit_seconds = [0.0 for _ in folds]
+    rows: List[dict] = []
+    best_mean: Optional[float] = None
+
+    for n_estimators in sorted(n_estimators_grid):
+        fold_scores: List[float] = []
+        score_seconds = 0.0
+        for index, (train_idx, val_idx) in enumerate(folds):
+            model = models[index]
+            model.set_params(n_estimators=n_estimators)
+            start = time.perf_counter()
+            with warnings.catch_warnings():
+                # The data never changes between warm starts, so the
+                # class_weight/warm_start warning does not apply here.
+                warnings.simplefilter("ignore", UserWarning)
+                model.fit(X[train_idx], y[train_idx])
+            fit_seconds[index] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            fold_scores.append(float(model.score(X[val_idx], y[val_idx])))
+            score_seconds += time.perf_counter() - start
+
+        mean_score = float(np.mean(fold_scores))
+        improved = best_mean is None or mean_score - best_mean >= tol
+        rows.append(
+            {
+                "max_depth": max_depth,
+                "max_features": max_features,
+                "n_estimators": n_estimators,
+                "cv_scores": fold_scores,
+                "cv_mean": mean_score,
+                "cv_std": float(np.std(fold_scores)),
+                "fit_seconds": float(sum(fit_seconds)),
+                "score_seconds": score_seconds,
+                "early_stopped": False,
+            }
+        )
+        if not improved:
+            rows[-1]["early_stopped"] = True
+            break
+        best_mean = mean_score
+
+    return rows
+
+
+def search_hyperparameters(
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    folds: Sequence[tuple[np.ndarray, np.ndarray]],
+    *,
+    n_jobs: int = -1,
+    tol: float = 0.001,
+    grid: Optional[dict] = None,
+    cache: Optional[ResultCache] = None,
+) -> tuple[dict, pd.DataFrame]:
+    """Search ``SEARCH_GRID`` reusing the same CV folds for every configuration.
+
+    Returns the best parameters and the full timing/score table, one row per
+    evaluated (max_depth, max_features, n_estimators) combination, ranked so
+    that the best configuration comes first. With a ``cache``, configurations
+    already evaluated on the same fold rows are not grown again.
+    """
+    import joblib
+    import numpy as np
+    import pandas as pd
+
+    grid = grid or SEARCH_GRID
+    configurations = list(product(grid["max_depth"], grid["max_features"]))
+    outer_jobs, inner_jobs = resolve_parallelism(n_jobs, len(configurations))
+    logging.info(
+        "Searching %d configurations over %d folds (%d outer x %d inner jobs)",
+        len(configurations),
+        len(folds),
+        outer_jobs,
+        inner_jobs,
+    )
+
+    # A single contiguous array is shared (memory-mapped) by every worker.
+    X = np.ascontiguousarray(X_train.to_numpy(dtype=np.float32))
+    y = y_train.to_numpy()
+
+    def grow(positions: Sequence[int]) -> List[List[dict]]:
+        return joblib.Parallel(n_jobs=outer_jobs)(
+            joblib.delayed(_grow_search_configuration)(
+                X,
+                y,
+                folds,
+                *configurations[position],
+                grid["n_estimators"],
+                inner_jobs,
+                tol,
+            )
+            for position in positions
+        )
+
+    if cache is None:
+        results = grow(range(len(configurations)))
+    else:
+        from result_cache import row_fingerprints
+
+        keys = cache.search_keys(
+            row_fingerprints(X_train, y_train),
+            list(X_train.columns),
+            folds,
+            configurations,
+            {"n_estimators": sorted(grid["n_estimators"]), "tol": tol, "random_state": RANDOM_SEED},
+        )
+        results = cache.cached_map(keys, grow, label="Search configurations")
+
+    table = pd.DataFrame([row for rows in results for row in rows])
+    table = table.sort_values(
+        ["cv_mean", "n_estimators", "fit_seconds"], ascending=[False, True, True]
+    ).reset_index(drop=True)
+    best = table.iloc[0]
+    best_params = {
+        "n_estimators": int(best["n_estimators"]),
+        "max_depth": None if pd.isna(best["max_depth"]) else int(best["max_depth"]),
+        "max_features": best["max_features"],
+    }
+    logging.info(
+        "Best configuration: %s (cv_mean=%.4f)", best_params, float(best["cv_mean"])
+    )
+    return best_params, table
+
+
+def group_aware_split(
+    features: pd.DataFrame,
+    labels: pd.Series,
+    groups: pd.Series,
+    n_splits: int = 5,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Hold out roughly ``1 / n_splits`` of the rows without splitting groups.
+
+    Near-duplicate scripts share a ``cluster_id``; keeping each cluster on one
+    side of the split prevents copies of a plugin from leaking into the test set.
+    """
+    from sklearn.model_selection import StratifiedGroupKFold
+
+    splitter = StratifiedGroupKFold(
+        n_splits=n_splits, shuffle=True, random_state=RANDOM_SEED
+    )
+    return next(splitter.split(features, labels, groups))
+
+
 def train_and_evaluate(
-    features: pd.DataFrame, labels: pd.Series
+    features: pd.DataFrame,
+    labels: pd.Series,
+    *,
+    groups: Optional[pd.Series] = None,
+    search: bool = False,
+    n_jobs: int = -1,
+    early_stopping_tol: float = 0.001,
+    cache: Optional[ResultCache] = None,
 ) -> tuple[RandomForestClassifier, dict]:
-    """Train the RandomForest model and evaluate it on a hold-out set."""
+    """Train the RandomForest model and evaluate it on a hold-out set.
+
+    With ``search`` enabled the estimator parameters come from
+    :func:`search_hyperparameters` and the metrics include the full search
+    table under ``"search_results"``. When ``groups`` is given (the dataset's
+    ``cluster_id``), both the hold-out split and the CV folds keep every group
+    on a single side. A ``cache`` supplies the scores of folds (or search
+    configurations) that were already evaluated on identical rows.
+    """
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import (
+        accuracy_score,
+        classification_report,
+        confusion_matrix,
+        f1_score,
+    )
+    from sklearn.model_selection import (
+        StratifiedGroupKFold,
+        StratifiedKFold,
+        cross_val_score,
+        train_test_split,
+    )
+
     target_counts = labels.value_counts()
     insufficient_mask = target_counts < 2
     if insufficient_mask.any():
@@ -349,18 +643,32 @@ def train_and_evaluate(
         mask = labels.isin(valid_labels)
         features = features.loc[mask]
         labels = labels.loc[mask]
+        if groups is not None:
+            groups = groups.loc[mask]
         target_counts = labels.value_counts()
 
     if labels.nunique() < 2:
         raise ValueError("Need at least two classes with sufficient samples for training.")
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        features,
-        labels,
-        test_size=0.2,
-        random_state=RANDOM_SEED,
-        stratify=labels,
-    )
+    groups_train: Optional[pd.Series] = None
+    if groups is not None:
+        train_idx, test_idx = group_aware_split(features, labels, groups)
+        X_train, X_test = features.iloc[train_idx], features.iloc[test_idx]
+        y_train, y_test = labels.iloc[train_idx], labels.iloc[test_idx]
+        groups_train = groups.iloc[train_idx]
+        logging.info(
+            "Group-aware split: %d clusters in train, %d in test",
+            groups_train.nunique(),
+            groups.iloc[test_idx].nunique(),
+        )
+    else:
+        X_train, X_test, y_train, y_test = train_test_split(
+            features,
+            labels,
+            test_size=0.2,
+            random_state=RANDOM_SEED,
+            stratify=labels,
+        )
 
     min_class_train = y_train.value_counts().min()
     cv_splits = 5
@@ -373,23 +681,44 @@ def train_and_evaluate(
             )
         cv_splits = adjusted
 
+    params: dict = {"n_estimators": 200, "max_depth": None, "max_features": "sqrt"}
+    search_table: Optional[pd.DataFrame] = None
     cv_scores: List[float] = []
     if cv_splits >= 2:
-        cv = StratifiedKFold(n_splits=cv_splits, shuffle=True, random_state=RANDOM_SEED)
-        cv_scores = cross_val_score(
-            RandomForestClassifier(
-                n_estimators=200,
-                max_depth=None,
+        if groups_train is not None:
+            cv = StratifiedGroupKFold(
+                n_splits=cv_splits, shuffle=True, random_state=RANDOM_SEED
+            )
+            folds = list(cv.split(X_train, y_train, groups_train))
+        else:
+            cv = StratifiedKFold(n_splits=cv_splits, shuffle=True, random_state=RANDOM_SEED)
+            folds = list(cv.split(X_train, y_train))
+        if search:
+            params, search_table = search_hyperparameters(
+                X_train, y_train, folds, n_jobs=n_jobs, tol=early_stopping_tol, cache=cache
+            )
+            cv_scores = list(search_table.iloc[0]["cv_scores"])
+        else:
+            outer_jobs, inner_jobs = resolve_parallelism(n_jobs, len(folds))
+            estimator = RandomForestClassifier(
+                **params,
                 random_state=RANDOM_SEED,
                 class_weight="balanced",
-                n_jobs=-1,
-            ),
-            X_train,
-            y_train,
-            scoring="accuracy",
-            cv=cv,
-            n_jobs=-1,
-        ).tolist()
+                n_jobs=inner_jobs,
+            )
+            if cache is not None:
+                cv_scores = cache.cross_val_scores(
+                    estimator, X_train, y_train, folds, n_jobs=outer_jobs
+                )
+            else:
+                cv_scores = cross_val_score(
+                    estimator,
+                    X_train,
+                    y_train,
+                    scoring="accuracy",
+                    cv=folds,
+                    n_jobs=outer_jobs,
+                ).tolist()
         logging.info(
             "Cross-validation accuracy scores (n=%d): %s", cv_splits, cv_scores
         )
@@ -397,11 +726,10 @@ def train_and_evaluate(
         logging.warning("Skipping cross-validation due to insufficient samples.")
 
     model = RandomForestClassifier(
-        n_estimators=200,
-        max_depth=None,
+        **params,
         random_state=RANDOM_SEED,
         class_weight="balanced",
-        n_jobs=-1,
+        n_jobs=n_jobs,
     )
     model.fit(X_train, y_train)
     y_pred = model.predict(X_test)
@@ -424,7 +752,12 @@ def train_and_evaluate(
         "cv_mean": float(np.mean(cv_scores)) if cv_scores else None,
         "cv_std": float(np.std(cv_scores)) if cv_scores else None,
         "feature_columns": list(features.columns),
+        "model_params": params,
     }
+    if search_table is not None:
+        metrics["search_results"] = search_table.astype(object).where(
+            search_table.notna(), None
+        ).to_dict(orient="records")
 
     return model, metrics
 
@@ -438,16 +771,36 @@ def save_metrics(metrics: dict) -> None:
     logging.info("Saved metrics to %s", metrics_path)
 
 
+def save_search_results(search_results: Sequence[dict]) -> None:
+    """Save the hyperparameter search table to the results directory."""
+    import pandas as pd
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    search_path = RESULTS_DIR / "search_results.csv"
+    pd.DataFrame(list(search_results)).to_csv(search_path, index=False)
+    logging.info("Saved hyperparameter search table to %s", search_path)
+
+
 def save_model(model: RandomForestClassifier) -> None:
-    """Persist the trained model using joblib."""
+    """Persist the trained model using joblib, plus its NumPy-only export."""
+    import joblib
+
+    from forest_export import export_forest
+
     RESULTS_DIR.mkdir(parents=True, exist_ok=True)
     model_path = RESULTS_DIR / "randomforest_model.pkl"
     joblib.dump(model, model_path)
     logging.info("Saved trained model to %s", model_path)
+    forest_path = export_forest(model, RESULTS_DIR / "randomforest_model.npz")
+    logging.info("Saved NumPy forest export to %s", forest_path)
 
 
 def plot_feature_importance(model: RandomForestClassifier, features: Sequence[str]) -> None:
     """Generate and store a feature importance plot for the trained model."""
+    import numpy as np
+    import seaborn as sns
+    from matplotlib import pyplot as plt
+
     if not hasattr(model, "feature_importances_"):
         logging.warning("Model does not provide feature importances; skipping plot.")
         return
@@ -490,6 +843,39 @@ def main() -> None:
         logging.error("%s", exc)
         return
 
+    cache: Optional[ResultCache] = None
+    run_key: Optional[str] = None
+    started = time.time()
+    if not args.no_cache:
+        from result_cache import ResultCache
+
+        cache = ResultCache(
+            args.cache_dir, max_age_days=args.cache_max_age_days, max_mb=args.cache_max_mb
+        )
+        here = Path(__file__).resolve().parent
+        run_key = cache.run_key(
+            dataset_path,
+            [here / "train_baseline.py", here / "forest_export.py"],
+            {
+                "seed": RANDOM_SEED,
+                "grid": SEARCH_GRID,
+                "no_parquet": args.no_parquet,
+                "limit": args.limit if args.limit is not None and args.limit > 0 else None,
+                "export_debug": args.export_debug,
+                "search": args.search,
+                "early_stopping_tol": args.early_stopping_tol if args.search else None,
+                "group_split": not args.no_group_split,
+            },
+        )
+        restored = cache.restore_run(run_key, RESULTS_DIR)
+        if restored is not None:
+            logging.info(
+                "Cache hit %s: restored %s to %s", run_key[:12], ", ".join(restored), RESULTS_DIR
+            )
+            if args.cleanup:
+                cleanup_results()
+            return
+
     try:
         dataframe = read_dataset(dataset_path, force_csv=args.no_parquet)
     except Exception as exc:  # pylint: disable=broad-except
@@ -518,12 +904,24 @@ def main() -> None:
         return
 
     labels = dataframe["entity_type"].fillna("unknown")
+    groups = None
+    if "cluster_id" in dataframe.columns and not args.no_group_split:
+        groups = dataframe["cluster_id"]
+        logging.info("Using cluster_id for a group-aware train/test split.")
 
     if args.export_debug:
         export_debug_dataset(features, labels)
 
     try:
-        model, metrics = train_and_evaluate(features, labels)
+        model, metrics = train_and_evaluate(
+            features,
+            labels,
+            groups=groups,
+            search=args.search,
+            n_jobs=args.n_jobs,
+            early_stopping_tol=args.early_stopping_tol,
+            cache=cache,
+        )
     except ValueError as exc:
         logging.error("Training failed: %s", exc)
         return
@@ -532,9 +930,18 @@ def main() -> None:
         return
 
     save_metrics(metrics)
+    if "search_results" in metrics:
+        save_search_results(metrics["search_results"])
     save_model(model)
     plot_feature_importance(model, features.columns)
 
+    if cache is not None and run_key is not None:
+        stored = cache.store_run(run_key, RESULTS_DIR, started)
+        logging.info("Cached %d artifacts under %s", len(stored), cache.runs_dir / run_key)
+        evicted = cache.evict()
+        if evicted["evicted"]:
+            logging.info("Evicted %d old cache entries", evicted["evicted"])
+
     if args.cleanup:
         cleanup_results()
 